@@ -0,0 +1,313 @@
+import asyncio
+import contextvars
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, RequestAborted
+from django.core.handlers.asgi import ASGIRequest
+from django.core.handlers.exception import response_for_exception
+from django.db import OperationalError, close_old_connections
+from django.http import HttpResponseBadRequest
+from django.urls import Resolver404, get_resolver, set_script_prefix
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from . import instrumentation, throttling
+from .db import replicas
+
+ASYNC_DB_THREADS = getattr(settings, 'ASYNC_DB_THREADS', 8)
+
+# потоки, в которых выполняется код с обращениями к БД:
+# их число ограничивает одновременные запросы к БД (и соединения),
+# а не число обслуживаемых запросов
+db_executor = ThreadPoolExecutor(
+    max_workers=ASYNC_DB_THREADS,
+    thread_name_prefix='db',
+)
+
+
+def in_db_thread(function, args, kwargs):
+    close_old_connections()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def database(function, *args, **kwargs):
+    """
+    Выполняет синхронный код с обращениями к БД (ORM, кэш, авторизация)
+    в пуле db_executor, не блокируя цикл событий; контекстные переменные
+    (например, выбранная реплика) передаются в поток
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        db_executor,
+        context.run,
+        partial(in_db_thread, function, args, kwargs),
+    )
+
+
+class AsyncReadMixin:
+    """
+    Чтение (list, retrieve) как нативное асинхронное представление
+    для ReadApplication: аутентификация с проверкой разрешений
+    и построение ответа (кэш, запросы, сериализация) выполняются
+    двумя переходами в пул потоков БД, рендеринг JSON — в цикле событий.
+    Ожидающий своей очереди запрос занимает корутину, а не процесс
+    или поток. Ответ совпадает с ответом синхронного dispatch.
+    """
+    async_actions = ('list', 'retrieve')
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await database(self.initial, request, *args, **kwargs)
+            handler = getattr(self, self.action)
+            response = await database(handler, request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs,
+        )
+        if self.response.accepted_renderer.format == 'json':
+            self.response.render()
+        else:
+            await database(self.response.render)
+        return self.response
+
+
+# middleware, работу которых ReadApplication выполняет сама:
+# замеры, ограничение частоты запросов и выбор реплики
+NATIVE_MIDDLEWARE = (
+    'api.instrumentation.TimingMiddleware',
+    'api.throttling.ThrottleMiddleware',
+    'api.db.replicas.ReplicaMiddleware',
+)
+
+
+def load_middleware():
+    """
+    Экземпляры middleware из settings.MIDDLEWARE, кроме NATIVE_MIDDLEWARE,
+    в порядке настроек или None, если среди них есть middleware
+    не на хуках MiddlewareMixin (со своим __call__): такой цепочке
+    асинхронный путь не равнозначен
+    """
+    instances = []
+    for path in settings.MIDDLEWARE:
+        if path in NATIVE_MIDDLEWARE:
+            continue
+        middleware = import_string(path)
+        if (
+            not issubclass(middleware, MiddlewareMixin)
+                or middleware.__call__ is not MiddlewareMixin.__call__):
+            return None
+        try:
+            instances.append(middleware())
+        except MiddlewareNotUsed:
+            continue
+    return instances
+
+
+async def read_body(receive):
+    body_file = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b',
+    )
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body_file.close()
+            raise RequestAborted()
+        body_file.write(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    body_file.seek(0)
+    return body_file
+
+
+async def send_response(response, send):
+    headers = [
+        (name.encode('latin1'), value.encode('latin1'))
+        for name, value in response.items()
+    ] + [
+        (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+        for cookie in response.cookies.values()
+    ]
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': headers,
+    })
+    if response.streaming:
+        for chunk in response:
+            await send({
+                'type': 'http.response.body', 'body': chunk,
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body'})
+    else:
+        await send({'type': 'http.response.body', 'body': response.content})
+    response.close()
+
+
+class ReadApplication:
+    """
+    ASGI-приложение: GET-запросы к представлениям с AsyncReadMixin
+    обслуживаются асинхронно, остальные передаются Django (handler).
+    Хуки middleware из settings.MIDDLEWARE (process_request, process_view,
+    process_exception, process_response) выполняются на асинхронном пути
+    в том же порядке, что и в синхронной цепочке, а работа NATIVE_MIDDLEWARE
+    (реплика, замеры, ограничение частоты) делается здесь же. Если
+    в настройках есть middleware без хуков, все запросы идут в Django.
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.middleware = load_middleware()
+
+    async def __call__(self, scope, receive, send):
+        match = None if self.middleware is None else self.resolve(scope)
+        if match is None:
+            return await self.handler(scope, receive, send)
+        try:
+            body_file = await read_body(receive)
+        except RequestAborted:
+            return
+        set_script_prefix(
+            settings.FORCE_SCRIPT_NAME or scope.get('root_path', ''),
+        )
+        timing, token = instrumentation.start()
+        try:
+            request = ASGIRequest(scope, body_file)
+        except UnicodeDecodeError:
+            instrumentation.current.reset(token)
+            return await send_response(HttpResponseBadRequest(), send)
+        request.resolver_match = match
+        instrumentation.set_view(timing, request, match.func)
+        response = await self.get_response(request, match)
+        instrumentation.finish(timing, token, request, response)
+        await send_response(response, send)
+
+    async def get_response(self, request, match):
+        """
+        Ответ с хуками middleware: как BaseHandler с цепочкой
+        MiddlewareMixin вокруг асинхронного представления
+        """
+        try:
+            entered, response = await database(
+                self.before_view, request, match,
+            )
+            if response is None:
+                try:
+                    response = await self.call_view(
+                        match.func, request, match.args, match.kwargs,
+                    )
+                except Exception as exc:
+                    response = await database(
+                        self.process_exception, request, exc,
+                    )
+            return await database(
+                self.process_response, request, response, entered,
+            )
+        except Exception as exc:
+            return await database(response_for_exception, request, exc)
+
+    def before_view(self, request, match):
+        """
+        process_request, затем ограничение частоты и process_view:
+        число пройденных middleware и ответ, если один из хуков его вернул
+        """
+        for index, middleware in enumerate(self.middleware):
+            hook = getattr(middleware, 'process_request', None)
+            response = hook and hook(request)
+            if response is not None:
+                return index + 1, response
+        response = (
+            throttling.check(request, match)
+            or self.process_view(request, match)
+        )
+        return len(self.middleware), response
+
+    def process_view(self, request, match):
+        for middleware in self.middleware:
+            hook = getattr(middleware, 'process_view', None)
+            response = hook and hook(
+                request, match.func, match.args, match.kwargs,
+            )
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exc):
+        for middleware in reversed(self.middleware):
+            hook = getattr(middleware, 'process_exception', None)
+            response = hook and hook(request, exc)
+            if response is not None:
+                return response
+        return response_for_exception(request, exc)
+
+    def process_response(self, request, response, entered):
+        for middleware in reversed(self.middleware[:entered]):
+            hook = getattr(middleware, 'process_response', None)
+            if hook:
+                response = hook(request, response)
+        return response
+
+    def resolve(self, scope):
+        """
+        ResolverMatch представления для асинхронного пути или None
+        """
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return None
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        try:
+            match = get_resolver().resolve(path)
+        except Resolver404:
+            return None
+        cls = getattr(match.func, 'cls', None)
+        actions = getattr(match.func, 'actions', None)
+        if (
+            cls is None or actions is None
+                or not issubclass(cls, AsyncReadMixin)
+                or actions.get('get') not in cls.async_actions):
+            return None
+        return match
+
+    async def call_view(self, func, request, args, kwargs):
+        """
+        То же, что ViewSetMixin.as_view(), но с adispatch; реплика
+        для чтения выбирается как в ReplicaMiddleware, при ошибке БД
+        на ней запрос один раз повторяется с primary
+        """
+        alias = await database(replicas.choose, request)
+        if alias is not None:
+            try:
+                return await self.dispatch(func, request, args, kwargs, alias)
+            except OperationalError:
+                replicas.mark_down(alias)
+        return await self.dispatch(func, request, args, kwargs, None)
+
+    async def dispatch(self, func, request, args, kwargs, alias):
+        view = func.cls(**func.initkwargs)
+        view.action_map = func.actions
+        for method, action in func.actions.items():
+            setattr(view, method, getattr(view, action))
+        if hasattr(view, 'get') and not hasattr(view, 'head'):
+            view.head = view.get
+        view.request = request
+        view.args = args
+        view.kwargs = kwargs
+        token = replicas.activate(alias)
+        try:
+            return await view.adispatch(request, *args, **kwargs)
+        finally:
+            replicas.deactivate(token)
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+    'ALIAS': None,
+    **getattr(settings, 'USER_CACHE', {}),
+}
+
+# поля, которые нужны аутентификации и проверкам прав;
+# остальные (в том числе хэш пароля) не кэшируются и отложены
+AUTH_FIELDS = (
+    'id', 'username', 'email', 'role',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+class UserCache:
+    """
+    Ограниченный по размеру кэш строк пользователей с временем жизни
+    (вытесняются давно не использованные) или, при заданном ALIAS,
+    общий для процессов кэш Django вместо него: сброс записи после
+    смены роли или блокировки тогда виден всем воркерам сразу.
+    Хранятся значения полей AUTH_FIELDS, каждый запрос получает
+    свой экземпляр User.
+    """
+    def __init__(self, max_size, timeout, alias=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.alias = alias
+        self.lock = threading.Lock()
+        self.rows = OrderedDict()
+
+    def key(self, user_id):
+        return f'user:{user_id}'
+
+    def get(self, user_id):
+        if self.alias:
+            row = caches[self.alias].get(self.key(user_id))
+            return None if row is None else self.build(row)
+        with self.lock:
+            item = self.rows.get(user_id)
+            if item is not None:
+                expires, row = item
+                if expires > time.monotonic():
+                    self.rows.move_to_end(user_id)
+                    return self.build(row)
+                del self.rows[user_id]
+        return None
+
+    def set(self, user):
+        row = tuple(getattr(user, name) for name in AUTH_FIELDS)
+        if self.alias:
+            caches[self.alias].set(self.key(user.pk), row, self.timeout)
+        else:
+            self.remember(user.pk, row)
+
+    def remember(self, user_id, row):
+        with self.lock:
+            self.rows[user_id] = (time.monotonic() + self.timeout, row)
+            self.rows.move_to_end(user_id)
+            while len(self.rows) > self.max_size:
+                self.rows.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.rows.pop(user_id, None)
+        if self.alias:
+            caches[self.alias].delete(self.key(user_id))
+
+    def clear(self):
+        with self.lock:
+            self.rows.clear()
+
+    def build(self, row):
+        return User.from_db(DEFAULT_DB_ALIAS, AUTH_FIELDS, row)
+
+
+user_cache = UserCache(
+    USER_CACHE['MAX_SIZE'],
+    USER_CACHE['TIMEOUT'],
+    USER_CACHE['ALIAS'],
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, которая берет пользователя из user_cache
+    и обращается к БД только при промахе.
+    При сохранении или удалении пользователя запись сбрасывается (signals).
+    """
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = None if user_id is None else user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+        elif not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive',
+            )
+        return user
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from . import cache, changes, search
+from .models import Category, ChangeLog, Genre, Title
+from .serializers import TitleBulkSerializer
+
+MAX_ITEMS = 1000
+
+# сообщение SlugRelatedField, как при создании тайтла по одному
+DOES_NOT_EXIST = 'Object with slug={value} does not exist.'
+
+
+def get_max_items():
+    return getattr(settings, 'BULK_MAX_ITEMS', MAX_ITEMS)
+
+
+def validate(items):
+    """
+    Проверка полей каждого элемента одним экземпляром сериализатора:
+    проверенные данные и ошибки (None, если ошибок нет) по элементам
+    """
+    child = TitleBulkSerializer()
+    validated, errors = [], []
+    for item in items:
+        try:
+            validated.append(child.run_validation(item))
+            errors.append(None)
+        except serializers.ValidationError as error:
+            validated.append(None)
+            errors.append(error.detail)
+    return validated, errors
+
+
+def resolve_slugs(validated, errors):
+    """
+    id категорий и жанров всех элементов двумя запросами;
+    элементы с неизвестными слагами переводятся в ошибки
+    """
+    items = [data for data in validated if data is not None]
+    categories = dict(Category.objects.filter(
+        slug__in={data['category'] for data in items},
+    ).values_list('slug', 'pk'))
+    genres = dict(Genre.objects.filter(
+        slug__in={slug for data in items for slug in data['genre']},
+    ).values_list('slug', 'pk'))
+    for index, data in enumerate(validated):
+        if data is None:
+            continue
+        item_errors = {}
+        if data['category'] not in categories:
+            item_errors['category'] = [
+                DOES_NOT_EXIST.format(value=data['category']),
+            ]
+        missing = [slug for slug in data['genre'] if slug not in genres]
+        if missing:
+            item_errors['genre'] = [
+                DOES_NOT_EXIST.format(value=slug) for slug in missing
+            ]
+        if item_errors:
+            validated[index] = None
+            errors[index] = item_errors
+    return categories, genres
+
+
+def insert_titles(titles):
+    """
+    Вставка пачками с получением id. SQLite не возвращает id из
+    bulk_create, но пока транзакция держит блокировку записи,
+    вставленные строки — последние по возрастающему id
+    """
+    Title.objects.bulk_create(titles)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return
+    ids = Title.objects.order_by('-pk').values_list(
+        'pk', flat=True,
+    )[:len(titles)]
+    for title, pk in zip(titles, reversed(list(ids))):
+        title.pk = pk
+
+
+def create_titles(items):
+    """
+    Создает тайтлы из элементов в формате TitleSerializer_post:
+    слаги — двумя запросами, тайтлы, их жанры и записи журнала
+    изменений — пачками bulk_create.
+    Результат по каждому элементу в порядке items: id или ошибки
+    """
+    validated, errors = validate(items)
+    categories, genres = resolve_slugs(validated, errors)
+    created = [
+        (Title(
+            name=data['name'],
+            year=data['year'],
+            description=data.get('description'),
+            category_id=categories[data['category']],
+        ), data)
+        for data in validated if data is not None
+    ]
+    if created:
+        through = Title.genre.through
+        with transaction.atomic():
+            insert_titles([title for title, _ in created])
+            through.objects.bulk_create(
+                through(title_id=title.pk, genre_id=genres[slug])
+                for title, data in created
+                for slug in dict.fromkeys(data['genre'])
+            )
+            search.index_many(title for title, _ in created)
+            changes.record_many(
+                (title for title, _ in created), ChangeLog.Action.CREATED,
+            )
+            cache.bump('titles')
+    ids = iter(title.pk for title, _ in created)
+    return [
+        {'errors': error} if error else {'id': next(ids)}
+        for error in errors
+    ]
@@ -0,0 +1,175 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .db import replicas
+
+RESPONSE_CACHE_ALIAS = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def get_cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def new_version():
+    """
+    Начальная версия области: время в наносекундах, чтобы после вытеснения
+    ключа версии из кэша она не совпала ни с одной из прежних
+    """
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """
+    Текущие версии областей одним обращением к кэшу
+    """
+    cache = get_cache()
+    keys = [f'scope:{scope}' for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """
+    Делает недействительными все ответы, сохраненные для областей scopes.
+    Внутри транзакции версии меняются еще раз после ее фиксации, иначе
+    параллельный запрос успеет сохранить в кэш не измененные данные
+    под новой версией.
+    """
+    def bump_versions():
+        cache = get_cache()
+        for scope in set(scopes):
+            key = f'scope:{scope}'
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, new_version(), timeout=None)
+
+    bump_versions()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump_versions)
+
+
+def get_role(request):
+    user = request.user
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_superuser:
+        return 'admin'
+    return user.role
+
+
+def response_digest(request, scopes):
+    """
+    Отпечаток ответа без его вычисления: меняется вместе с версией
+    любой из областей, поэтому служит и ключом кэша, и ETag.
+    Учитывает базу чтения: ответ, прочитанный с отстающей реплики,
+    не отдается пользователю, закрепленному за primary после записи
+    """
+    query = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    source = repr((
+        request.path,
+        query,
+        get_role(request),
+        get_versions(scopes),
+        request.accepted_media_type,
+        replicas.current_alias.get() or DEFAULT_DB_ALIAS,
+    ))
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return etag in etags or '*' in etags
+
+
+def record(name, outcome):
+    with _stats_lock:
+        _stats[(name, outcome)] += 1
+
+
+def get_stats():
+    """
+    Счетчики попаданий и промахов по эндпоинтам текущего процесса
+    """
+    with _stats_lock:
+        items = list(_stats.items())
+    stats = {}
+    for (name, outcome), count in items:
+        stats.setdefault(
+            name, {'hit': 0, 'miss': 0, 'not_modified': 0},
+        )[outcome] = count
+    return stats
+
+
+class CachedListMixin:
+    """
+    Кэширует ответы list по пути, параметрам запроса, роли пользователя
+    и версиям областей из get_cache_scopes().
+    Записи, затрагивающие данные области, меняют ее версию (см. signals),
+    и сохраненные ответы перестают находиться, а затем вытесняются.
+    Тот же отпечаток отдается в ETag: на If-None-Match с ним
+    отвечаем 304 без обращения к БД и сериализаторам.
+    """
+    cache_timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        name = f'{self.basename}-{self.action}'
+        digest = response_digest(request, self.get_cache_scopes())
+        etag = f'"{digest}"'
+        if etag_matches(request, etag):
+            record(name, 'not_modified')
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag},
+            )
+        key = f'response:{digest}'
+        data = get_cache().get(key)
+        if data is not None:
+            record(name, 'hit')
+            return Response(data, headers={'X-Cache': 'HIT', 'ETag': etag})
+        record(name, 'miss')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            get_cache().set(key, response.data, self.cache_timeout)
+            response['ETag'] = etag
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedResponseMixin(CachedListMixin):
+    """
+    То же для list и retrieve
+    """
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs,
+        )
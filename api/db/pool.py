@@ -0,0 +1,274 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+
+from django.db.utils import OperationalError
+
+POOL = {
+    'MAX_SIZE': 10,
+    'MAX_OVERFLOW': 10,
+    'TIMEOUT': 30,
+    'RECYCLE': 3600,
+    'CHECK_INTERVAL': 10,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Пул открытых соединений процесса: до max_size соединений хранятся
+    между запросами, еще max_overflow открываются при пиковой нагрузке
+    и закрываются после возврата. Когда заняты все, запрос ждет
+    освобождения не дольше timeout секунд. Соединение, простоявшее
+    дольше check_interval, перед выдачей проверяется (check),
+    старше recycle секунд — закрывается.
+    """
+    def __init__(self, connect, check, max_size, max_overflow, timeout,
+                 recycle=None, check_interval=0):
+        self.connect = connect
+        self.check = check
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.check_interval = check_interval
+        self.condition = threading.Condition()
+        # (соединение, время открытия, время возврата)
+        self.idle = deque()
+        self.opened = {}
+        self.size = 0
+        self.pid = os.getpid()
+        self.counters = Counter()
+        self.wait_max = 0
+
+    def acquire(self):
+        started = time.monotonic()
+        while True:
+            connection, times = self.checkout(started)
+            if connection is None:
+                return self.open()
+            if self.usable(connection, *times):
+                self.count('reused')
+                return connection
+            self.discard(connection)
+
+    def checkout(self, started):
+        """
+        Свободное соединение из пула или (None, None), если можно открыть
+        новое; ждет освобождения, когда открыто max_size + max_overflow
+        """
+        with self.condition:
+            self.after_fork()
+            self.counters['checkouts'] += 1
+            waited = False
+            while not self.idle and self.size >= (
+                    self.max_size + self.max_overflow):
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Connection pool exhausted: {self.size} connections '
+                        f'in use, waited {self.timeout} s'
+                    )
+                waited = True
+                self.condition.wait(remaining)
+            if waited:
+                wait = time.monotonic() - started
+                self.counters['waits'] += 1
+                self.counters['wait_ms'] += wait * 1000
+                self.wait_max = max(self.wait_max, wait)
+            if self.idle:
+                connection, created, released = self.idle.pop()
+                self.opened[id(connection)] = created
+                return connection, (created, released)
+            self.size += 1
+            return None, None
+
+    def open(self):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.counters['created'] += 1
+            self.opened[id(connection)] = time.monotonic()
+        return connection
+
+    def usable(self, connection, created, released):
+        now = time.monotonic()
+        if self.recycle is not None and now - created > self.recycle:
+            self.count('recycled')
+            return False
+        if now - released < self.check_interval:
+            return True
+        self.count('checks')
+        if self.check(connection):
+            return True
+        self.count('failed_checks')
+        return False
+
+    def count(self, name):
+        with self.condition:
+            self.counters[name] += 1
+
+    def release(self, connection, reusable=True):
+        with self.condition:
+            if os.getpid() != self.pid:
+                return
+            created = self.opened.pop(id(connection), None)
+            if created is not None:
+                if reusable and self.size <= self.max_size:
+                    self.idle.append((connection, created, time.monotonic()))
+                    self.condition.notify()
+                    return
+                self.size -= 1
+                self.counters['closed'] += 1
+                self.condition.notify()
+        self.close(connection)
+
+    def discard(self, connection):
+        with self.condition:
+            self.opened.pop(id(connection), None)
+            self.size -= 1
+            self.counters['closed'] += 1
+            self.condition.notify()
+        self.close(connection)
+
+    def close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def after_fork(self):
+        """
+        Соединения, унаследованные от родительского процесса,
+        не используются и не закрываются (они принадлежат родителю)
+        """
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.idle.clear()
+            self.opened.clear()
+            self.size = 0
+
+    def get_stats(self):
+        with self.condition:
+            counters = dict(self.counters)
+            idle = len(self.idle)
+            size = self.size
+            wait_max = self.wait_max
+        checkouts = counters.get('checkouts', 0)
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'overflow': max(0, size - self.max_size),
+            'max_size': self.max_size,
+            'max_overflow': self.max_overflow,
+            'saturation': size / (self.max_size + self.max_overflow),
+            'checkouts': checkouts,
+            'created': counters.get('created', 0),
+            'reused': counters.get('reused', 0),
+            'reuse_ratio': (
+                counters.get('reused', 0) / checkouts if checkouts else None
+            ),
+            'closed': counters.get('closed', 0),
+            'checks': counters.get('checks', 0),
+            'failed_checks': counters.get('failed_checks', 0),
+            'recycled': counters.get('recycled', 0),
+            'waits': counters.get('waits', 0),
+            'wait_ms_total': counters.get('wait_ms', 0),
+            'wait_ms_max': wait_max * 1000,
+            'timeouts': counters.get('timeouts', 0),
+        }
+
+
+def get_pool(alias, settings_dict, connect, check):
+    """
+    Пул для базы alias, создается при первом соединении
+    """
+    with _pools_lock:
+        if alias not in _pools:
+            options = {**POOL, **settings_dict.get('POOL', {})}
+            _pools[alias] = ConnectionPool(
+                connect,
+                check,
+                max_size=options['MAX_SIZE'],
+                max_overflow=options['MAX_OVERFLOW'],
+                timeout=options['TIMEOUT'],
+                recycle=options['RECYCLE'],
+                check_interval=options['CHECK_INTERVAL'],
+            )
+        return _pools[alias]
+
+
+def get_stats():
+    """
+    Метрики пулов текущего процесса по базам
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.get_stats() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Берет соединения из ConnectionPool вместо открытия нового на каждый
+    запрос и возвращает их в пул вместо закрытия.
+    Совместимо с CONN_MAX_AGE: Django держит соединение в потоке
+    до истечения срока, после чего оно возвращается в пул.
+    Пул выключается настройкой 'POOL': {'MAX_SIZE': 0}.
+    """
+    def pool_enabled(self):
+        return {**POOL, **self.settings_dict.get('POOL', {})}['MAX_SIZE'] > 0
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        if not self.pool_enabled():
+            return connect(conn_params)
+        pool = get_pool(
+            self.alias,
+            self.settings_dict,
+            lambda: connect(conn_params),
+            self.check_pooled_connection,
+        )
+        return pool.acquire()
+
+    def check_pooled_connection(self, connection):
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None or not self.pool_enabled():
+            return super()._close()
+        with _pools_lock:
+            pool = _pools.get(self.alias)
+        if pool is None:
+            return super()._close()
+        # закрытое внутри atomic соединение остается у Django до отката
+        reusable = not self.in_atomic_block and (
+            not self.errors_occurred or self.is_usable()
+        )
+        if reusable:
+            try:
+                self.connection.rollback()
+            except Exception:
+                reusable = False
+        pool.release(self.connection, reusable)
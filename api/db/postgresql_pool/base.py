@@ -0,0 +1,9 @@
+from django.db.backends.postgresql import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений (настройки в DATABASES[...]['POOL'])
+    """
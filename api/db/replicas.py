@@ -0,0 +1,214 @@
+import contextvars
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.http import HttpResponse
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+REPLICAS = {
+    'ALIASES': [],
+    # round_robin или least_loaded
+    'SELECTION': 'round_robin',
+    # сколько секунд после записи читать данные пользователя с primary
+    'PIN_SECONDS': 5,
+    # сколько секунд не использовать недоступную реплику
+    'RETRY_SECONDS': 30,
+    # сколько секунд после успешной проверки не проверять реплику снова
+    'CHECK_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+}
+
+# реплика для чтения в текущем запросе, None — primary (default)
+current_alias = contextvars.ContextVar('current_alias', default=None)
+
+_lock = threading.Lock()
+_in_flight = {}
+_down_until = {}
+_up_until = {}
+_turn = itertools.count()
+
+
+def get_options():
+    return {**REPLICAS, **getattr(settings, 'REPLICAS', {})}
+
+
+def available(alias, options):
+    """
+    Реплика не помечена недоступной и к ней можно подключиться.
+    Подключение проверяется не чаще раза в CHECK_SECONDS, при ошибке
+    реплика помечается недоступной на RETRY_SECONDS
+    """
+    now = time.monotonic()
+    with _lock:
+        if _down_until.get(alias, 0) > now:
+            return False
+        if _up_until.get(alias, 0) > now:
+            return True
+    try:
+        connections[alias].ensure_connection()
+    except OperationalError:
+        mark_down(alias, options)
+        return False
+    with _lock:
+        _up_until[alias] = now + options['CHECK_SECONDS']
+    return True
+
+
+def mark_down(alias, options=None):
+    options = options or get_options()
+    with _lock:
+        _down_until[alias] = time.monotonic() + options['RETRY_SECONDS']
+        _up_until.pop(alias, None)
+
+
+def candidates(options):
+    """
+    Реплики в порядке выбора: по кругу или по числу запросов в работе
+    """
+    aliases = list(options['ALIASES'])
+    start = next(_turn) % len(aliases)
+    aliases = aliases[start:] + aliases[:start]
+    if options['SELECTION'] == 'least_loaded':
+        with _lock:
+            aliases.sort(key=lambda alias: _in_flight.get(alias, 0))
+    return aliases
+
+
+def choose(request):
+    """
+    Реплика для чтения в запросе или None, если читать нужно с primary:
+    небезопасный метод, недавняя запись пользователя или нет доступных
+    реплик
+    """
+    options = get_options()
+    if not options['ALIASES'] or request.method not in SAFE_METHODS:
+        return None
+    user_id = get_user_id(request)
+    if user_id is not None and caches[options['CACHE_ALIAS']].get(
+            pin_key(user_id)):
+        return None
+    for alias in candidates(options):
+        if available(alias, options):
+            return alias
+    return None
+
+
+def activate(alias):
+    if alias is not None:
+        with _lock:
+            _in_flight[alias] = _in_flight.get(alias, 0) + 1
+    return current_alias.set(alias)
+
+
+def deactivate(token):
+    alias = current_alias.get()
+    current_alias.reset(token)
+    if alias is not None:
+        with _lock:
+            _in_flight[alias] -= 1
+
+
+def pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def get_user_id(request):
+    """
+    id пользователя из JWT без обращения к БД
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1]).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+def pin_after_write(request, response):
+    """
+    После успешной записи пользователь читает с primary PIN_SECONDS
+    секунд, чтобы видеть свои изменения, пока реплики догоняют primary
+    """
+    options = get_options()
+    if (
+        not options['ALIASES'] or request.method in SAFE_METHODS
+            or response.status_code >= 400):
+        return
+    user_id = get_user_id(request)
+    if user_id is not None:
+        caches[options['CACHE_ALIAS']].set(
+            pin_key(user_id), True, options['PIN_SECONDS'],
+        )
+
+
+def get_stats():
+    with _lock:
+        now = time.monotonic()
+        return {
+            alias: {
+                'in_flight': _in_flight.get(alias, 0),
+                'down': _down_until.get(alias, 0) > now,
+            }
+            for alias in get_options()['ALIASES']
+        }
+
+
+class ReplicaRouter:
+    """
+    Чтения в безопасных запросах идут на реплику, выбранную
+    ReplicaMiddleware, остальные чтения и все записи — на primary
+    """
+    def db_for_read(self, model, **hints):
+        return current_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaMiddleware:
+    """
+    Выбирает реплику для чтения на время запроса, после записи
+    закрепляет пользователя за primary, а при ошибке БД на реплике
+    помечает ее недоступной и один раз повторяет запрос с primary
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        alias = choose(request)
+        response = self.read(request, alias)
+        if alias is not None and getattr(request, 'replica_failed', False):
+            response = self.read(request, None)
+        pin_after_write(request, response)
+        return response
+
+    def read(self, request, alias):
+        token = activate(alias)
+        try:
+            return self.get_response(request)
+        finally:
+            deactivate(token)
+
+    def process_exception(self, request, exception):
+        alias = current_alias.get()
+        if alias is not None and isinstance(exception, OperationalError):
+            mark_down(alias)
+            request.replica_failed = True
+            # заменяется ответом повтора с primary в __call__
+            return HttpResponse(status=503)
+        return None
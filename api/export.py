@@ -0,0 +1,87 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Review, Title
+
+# имя выгрузки: модель и поля values(), без экземпляров моделей
+EXPORTS = {
+    'titles': (Title, (
+        'id', 'name', 'year', 'description', 'category__slug',
+        'rating_sum', 'rating_count',
+    )),
+    'reviews': (Review, (
+        'id', 'title_id', 'author__username', 'text', 'score', 'pub_date',
+        'comments_count',
+    )),
+    'comments': (Comment, (
+        'id', 'review_id', 'author__username', 'text', 'pub_date',
+    )),
+}
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    Файлоподобный объект для csv.writer: возвращает записанную строку
+    """
+    def write(self, value):
+        return value
+
+
+def rows(name, chunk_size=CHUNK_SIZE):
+    """
+    Плоские строки выгрузки. iterator() читает их пачками
+    (на PostgreSQL через серверный курсор), память не растет
+    с размером таблицы
+    """
+    model, fields = EXPORTS[name]
+    return model.objects.order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size,
+    )
+
+
+def ndjson_lines(name, chunk_size=CHUNK_SIZE):
+    _, fields = EXPORTS[name]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows(name, chunk_size):
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def csv_lines(name, chunk_size=CHUNK_SIZE):
+    _, fields = EXPORTS[name]
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows(name, chunk_size):
+        yield writer.writerow(row)
+
+
+def lines(name, fmt, chunk_size=CHUNK_SIZE):
+    if fmt == 'csv':
+        return csv_lines(name, chunk_size)
+    return ndjson_lines(name, chunk_size)
+
+
+def encoded_chunks(lines, size=64 * 1024):
+    """
+    Склеивает строки в блоки около size байт: отдавать по строке
+    на каждую запись слишком дорого для WSGI-сервера
+    """
+    buffer = []
+    buffered = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield b''.join(buffer)
@@ -1,6 +1,8 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 
 from .models import Title
+from .search import search
 
 
 class TitleFilter(filters.FilterSet):
@@ -18,7 +20,7 @@ class TitleFilter(filters.FilterSet):
     )
     name = filters.CharFilter(
         field_name='name',
-        lookup_expr='contains',
+        method='filter_name',
     )
 
     class Meta:
@@ -28,3 +30,18 @@ class TitleFilter(filters.FilterSet):
             'genre', 'category',
             'year', 'name',
         )
+
+    def filter_name(self, queryset, name, value):
+        return search(queryset, value, field=name)
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Поиск по первому из search_fields через триграммный индекс,
+    результаты упорядочены по релевантности
+    """
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search(queryset, query, field=view.search_fields[0])
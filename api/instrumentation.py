@@ -0,0 +1,186 @@
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import metrics
+
+INSTRUMENTATION = {
+    # заголовок Server-Timing раскрывает число и время запросов к БД,
+    # поэтому включается явно (для отладки и нагрузочных тестов)
+    'SERVER_TIMING': False,
+    'SLOW_REQUEST_MS': 500,
+    # доля медленных запросов, которые пишутся в лог вместе с SQL
+    'SLOW_SAMPLE_RATE': 1.0,
+    'MAX_SAMPLED_QUERIES': 50,
+}
+
+logger = logging.getLogger('api.slow_requests')
+
+# замеры текущего запроса, None — вне запроса
+current = contextvars.ContextVar('request_timing', default=None)
+
+
+def get_options():
+    return {**INSTRUMENTATION, **getattr(settings, 'INSTRUMENTATION', {})}
+
+
+class Timing:
+    """
+    Замеры одного запроса, в секундах
+    """
+    __slots__ = (
+        'started', 'endpoint', 'action', 'db', 'db_queries', 'serializer',
+        'render', 'queries', 'max_queries',
+    )
+
+    def __init__(self, max_queries):
+        self.started = time.perf_counter()
+        self.endpoint = 'unresolved'
+        self.action = None
+        self.db = 0
+        self.db_queries = 0
+        self.serializer = 0
+        self.render = 0
+        self.queries = []
+        self.max_queries = max_queries
+
+
+@contextmanager
+def measure(name):
+    """
+    Добавляет время выполнения блока к замеру name текущего запроса
+    """
+    timing = current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(
+            timing, name,
+            getattr(timing, name) + time.perf_counter() - started,
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper для всех соединений (подключается в signals):
+    число и время запросов, текст первых MAX_SAMPLED_QUERIES из них
+    """
+    timing = current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timing.db += elapsed
+        timing.db_queries += 1
+        if len(timing.queries) < timing.max_queries:
+            timing.queries.append((sql, elapsed))
+
+
+def timed_serializer(serializer):
+    """
+    Время to_representation сериализатора DRF (и вложенных в него)
+    учитывается как время сериализации
+    """
+    to_representation = serializer.to_representation
+
+    def timed(instance):
+        with measure('serializer'):
+            return to_representation(instance)
+
+    serializer.to_representation = timed
+    return serializer
+
+
+class InstrumentedViewMixin:
+    """
+    Замер сериализации для представлений на сериализаторах DRF
+    """
+    def get_serializer(self, *args, **kwargs):
+        return timed_serializer(super().get_serializer(*args, **kwargs))
+
+
+def start():
+    timing = Timing(get_options()['MAX_SAMPLED_QUERIES'])
+    return timing, current.set(timing)
+
+
+def set_view(timing, request, view_func):
+    match = request.resolver_match
+    if match is not None:
+        timing.endpoint = match.view_name
+    actions = getattr(view_func, 'actions', None)
+    method = request.method.lower()
+    timing.action = actions.get(method, method) if actions else method
+
+
+def finish(timing, token, request, response):
+    """
+    Записывает замеры в гистограммы, заголовок Server-Timing
+    и, для медленных запросов, в лог
+    """
+    current.reset(token)
+    total = time.perf_counter() - timing.started
+    labels = (timing.endpoint, timing.action or request.method.lower())
+    metrics.REQUEST_SECONDS.observe(labels, total)
+    metrics.DB_SECONDS.observe(labels, timing.db)
+    metrics.DB_QUERIES.observe(labels, timing.db_queries)
+    metrics.SERIALIZER_SECONDS.observe(labels, timing.serializer)
+    metrics.RENDER_SECONDS.observe(labels, timing.render)
+    options = get_options()
+    if options['SERVER_TIMING']:
+        response['Server-Timing'] = (
+            f'total;dur={total * 1000:.2f}, '
+            f'db;dur={timing.db * 1000:.2f};'
+            f'desc="{timing.db_queries} queries", '
+            f'serializer;dur={timing.serializer * 1000:.2f}, '
+            f'render;dur={timing.render * 1000:.2f}'
+        )
+    if (
+        total * 1000 >= options['SLOW_REQUEST_MS']
+            and random.random() < options['SLOW_SAMPLE_RATE']):
+        logger.warning(
+            'Slow request %s %s (%s, %s): %.1f ms, db %.1f ms in %d queries, '
+            'serializer %.1f ms, render %.1f ms\n%s',
+            request.method, request.get_full_path(), timing.endpoint,
+            labels[1], total * 1000, timing.db * 1000, timing.db_queries,
+            timing.serializer * 1000, timing.render * 1000,
+            '\n'.join(
+                f'{elapsed * 1000:.1f} ms: {sql}'
+                for sql, elapsed in timing.queries
+            ),
+        )
+
+
+class TimingMiddleware:
+    """
+    Время запроса, запросов к БД, сериализации и рендеринга по эндпоинтам
+    и действиям: гистограммы для /metrics и заголовок Server-Timing
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing, token = start()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            current.reset(token)
+            raise
+        finish(timing, token, request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = current.get()
+        if timing is not None:
+            set_view(timing, request, view_func)
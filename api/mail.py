@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 30)
+
+
+def enqueue(to, subject, body):
+    """
+    Ставит письмо в очередь, отправка не блокирует запрос
+    """
+    return EmailOutbox.objects.create(to=to, subject=subject, body=body)
+
+
+def retry_delay(attempts):
+    """
+    Экспоненциальная задержка перед следующей попыткой
+    """
+    return timedelta(seconds=RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def postpone(letter, error, now):
+    letter.attempts += 1
+    letter.last_error = repr(error)
+    letter.next_attempt_at = now + retry_delay(letter.attempts)
+
+
+def send(letter, connection, now):
+    message = EmailMessage(
+        subject=letter.subject,
+        body=letter.body,
+        from_email=settings.EMAIL_YAMDB,
+        to=[letter.to],
+        connection=connection,
+    )
+    try:
+        message.send()
+    except Exception as error:
+        postpone(letter, error, now)
+    else:
+        letter.attempts += 1
+        letter.sent_at = timezone.now()
+        letter.last_error = ''
+
+
+def deliver_batch(connection=None, batch_size=BATCH_SIZE):
+    """
+    Отправляет пачку готовых к отправке писем через одно соединение
+    с почтовым сервером. Строки блокируются с SKIP LOCKED, поэтому
+    несколько процессов могут разбирать очередь одновременно.
+    Возвращает число обработанных писем.
+    """
+    connection = connection or get_connection()
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+                sent_at=None,
+                attempts__lt=MAX_ATTEMPTS,
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        if not batch:
+            return 0
+        try:
+            connection.open()
+        except Exception as error:
+            for letter in batch:
+                postpone(letter, error, now)
+        else:
+            for letter in batch:
+                send(letter, connection, now)
+        EmailOutbox.objects.bulk_update(
+            batch,
+            ['attempts', 'sent_at', 'next_attempt_at', 'last_error'],
+        )
+    return len(batch)
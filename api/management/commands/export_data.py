@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from api import export
+
+
+class Command(BaseCommand):
+    """
+    Потоковая выгрузка тайтлов, ревью или комментариев в NDJSON или CSV
+    """
+    help = 'Stream titles, reviews or comments as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(export.EXPORTS))
+        parser.add_argument(
+            '--format',
+            choices=sorted(export.CONTENT_TYPES),
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write, stdout by default',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        lines = export.lines(
+            options['name'], options['format'], options['chunk_size'],
+        )
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
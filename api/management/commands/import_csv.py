@@ -0,0 +1,270 @@
+import csv
+import io
+import os
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from api import cache
+from api.models import Category, Comment, Genre, Review, Title, User
+
+
+class IdSet:
+    """
+    Множество целых id в виде битовой карты: 1 бит на id,
+    десятки миллионов ревью занимают единицы мегабайт
+    """
+    def __init__(self):
+        self.bits = bytearray()
+
+    def add(self, value):
+        byte = value >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        self.bits[byte] |= 1 << (value & 7)
+
+    def __contains__(self, value):
+        byte = value >> 3
+        return (
+            0 <= byte < len(self.bits)
+            and bool(self.bits[byte] & (1 << (value & 7)))
+        )
+
+
+def user_row(row):
+    return {
+        'id': int(row['id']),
+        'username': row['username'],
+        'email': row['email'],
+        'role': row['role'] or User.RoleList.USER,
+        'bio': row.get('description') or '',
+        'first_name': row.get('first_name') or '',
+        'last_name': row.get('last_name') or '',
+        'password': make_password(None),
+    }
+
+
+# файл, модель, преобразование строки CSV в поля модели,
+# внешние ключи: поле модели -> модель, id которой должен быть загружен
+TABLES = (
+    ('users.csv', User, user_row, {}),
+    ('category.csv', Category, lambda row: {
+        'id': int(row['id']),
+        'name': row['name'],
+        'slug': row['slug'],
+    }, {}),
+    ('genre.csv', Genre, lambda row: {
+        'id': int(row['id']),
+        'name': row['name'],
+        'slug': row['slug'],
+    }, {}),
+    ('titles.csv', Title, lambda row: {
+        'id': int(row['id']),
+        'name': row['name'],
+        'year': int(row['year']),
+        'category_id': int(row['category']) if row['category'] else None,
+    }, {'category_id': Category}),
+    ('genre_title.csv', Title.genre.through, lambda row: {
+        'id': int(row['id']),
+        'title_id': int(row['title_id']),
+        'genre_id': int(row['genre_id']),
+    }, {'title_id': Title, 'genre_id': Genre}),
+    ('review.csv', Review, lambda row: {
+        'id': int(row['id']),
+        'title_id': int(row['title_id']),
+        'author_id': int(row['author']),
+        'text': row['text'],
+        'score': int(row['score']),
+        'pub_date': parse_datetime(row['pub_date']),
+    }, {'title_id': Title, 'author_id': User}),
+    ('comments.csv', Comment, lambda row: {
+        'id': int(row['id']),
+        'review_id': int(row['review_id']),
+        'author_id': int(row['author']),
+        'text': row['text'],
+        'pub_date': parse_datetime(row['pub_date']),
+    }, {'review_id': Review, 'author_id': User}),
+)
+
+
+@contextmanager
+def keep_auto_now(model):
+    """
+    bulk_create подставляет текущее время в поля auto_now_add,
+    а при импорте нужны даты из файла
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    """
+    Загрузка данных из CSV каталога data/.
+    Файлы читаются построчно, внешние ключи проверяются по битовым картам
+    уже загруженных id, строки вставляются пачками через bulk_create
+    или COPY (PostgreSQL), каждая таблица в своей транзакции.
+    После загрузки сбрасываются последовательности и пересчитываются
+    производные данные.
+    """
+    help = 'Import data/*.csv using batched inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'data'),
+            help='Directory with CSV files',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per INSERT or COPY',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use bulk_create even on PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        self.loaded = {}
+        for filename, model, convert, foreign_keys in TABLES:
+            path = os.path.join(options['path'], filename)
+            if not os.path.exists(path):
+                raise CommandError(f'{path} not found')
+            with transaction.atomic():
+                created, skipped = self.import_table(
+                    path, model, convert, foreign_keys,
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'{filename}: {created} rows imported, {skipped} skipped'
+            ))
+        self.reset_sequences()
+        self.rebuild_derived()
+
+    def import_table(self, path, model, convert, foreign_keys):
+        ids = self.loaded[model] = IdSet()
+        created = skipped = 0
+        batch = []
+        with open(path, encoding='utf-8', newline='') as csv_file:
+            for row in csv.DictReader(csv_file):
+                values = convert(row)
+                if any(
+                    values[field] is not None
+                    and values[field] not in self.loaded[parent]
+                    for field, parent in foreign_keys.items()
+                ):
+                    skipped += 1
+                    continue
+                batch.append(values)
+                if len(batch) >= self.batch_size:
+                    inserted = self.insert(model, batch, ids)
+                    created += inserted
+                    skipped += len(batch) - inserted
+                    batch = []
+        inserted = self.insert(model, batch, ids)
+        return created + inserted, skipped + len(batch) - inserted
+
+    def insert(self, model, batch, ids):
+        """
+        Вставляет пачку, пропуская строки, нарушающие уникальность
+        (например, второе ревью автора на тот же тайтл), и добавляет
+        в ids id действительно вставленных строк
+        """
+        if not batch:
+            return 0
+        objs = [model(**values) for values in batch]
+        if self.use_copy:
+            inserted = self.copy(model, objs)
+        else:
+            with keep_auto_now(model):
+                model.objects.bulk_create(
+                    objs,
+                    batch_size=self.batch_size,
+                    ignore_conflicts=True,
+                )
+            batch_ids = {obj.pk for obj in objs}
+            inserted = [
+                pk for pk in model.objects.filter(
+                    pk__gte=min(batch_ids),
+                    pk__lte=max(batch_ids),
+                ).values_list('pk', flat=True)
+                if pk in batch_ids
+            ]
+        for pk in inserted:
+            ids.add(pk)
+        return len(inserted)
+
+    def copy(self, model, objs):
+        """
+        COPY пачки во временную таблицу и перенос в основную
+        с ON CONFLICT DO NOTHING
+        """
+        fields = model._meta.concrete_fields
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objs:
+            writer.writerow([
+                r'\N' if value is None else value
+                for value in (
+                    field.get_db_prep_save(
+                        getattr(obj, field.attname), connection,
+                    )
+                    for field in fields
+                )
+            ])
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        table = quote(model._meta.db_table)
+        staging = quote(f'import_{model._meta.db_table}')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS {staging} '
+                f'(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                f"COPY {staging} ({columns}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM {staging} '
+                f'ON CONFLICT DO NOTHING '
+                f'RETURNING {quote(model._meta.pk.column)}'
+            )
+            inserted = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'TRUNCATE {staging}')
+        return inserted
+
+    def reset_sequences(self):
+        models = [model for _, model, _, _ in TABLES]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def rebuild_derived(self):
+        call_command('rebuild_ratings', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+        cache.get_cache().clear()
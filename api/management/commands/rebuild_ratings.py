@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models import SCORE_FIELDS, SCORES, Comment, Review, Title
+
+
+BATCH_SIZE = 500
+
+
+def rated(row):
+    """
+    Тайтл с гистограммой из строки группировки и суммой, числом
+    и средней оценок по ней
+    """
+    title = Title(pk=row['title'])
+    histogram = [row[name] for name in SCORE_FIELDS]
+    for name, count in zip(SCORE_FIELDS, histogram):
+        setattr(title, name, count)
+    title.rating_count = sum(histogram)
+    title.rating_sum = sum(
+        score * count for score, count in zip(SCORES, histogram)
+    )
+    title.rating_avg = title.rating_sum / title.rating_count
+    return title
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает с нуля сохраненные рейтинги (гистограмму, сумму, число
+    и среднее оценок) всех тайтлов по таблице Review
+    и счетчики комментариев ревью по таблице Comment
+    """
+    help = 'Rebuild stored title ratings and review comment counts'
+
+    def handle(self, *args, **options):
+        # гистограммы всех тайтлов одним запросом с группировкой
+        histograms = Review.objects.filter(
+            title__isnull=False,
+        ).order_by().values('title').annotate(**{
+            name: Count('id', filter=Q(score=score))
+            for score, name in zip(SCORES, SCORE_FIELDS)
+        })
+        with transaction.atomic():
+            updated = Title.objects.update(
+                rating_sum=0,
+                rating_count=0,
+                rating_avg=None,
+                **{name: 0 for name in SCORE_FIELDS},
+            )
+            Title.objects.bulk_update(
+                (rated(row) for row in histograms.iterator()),
+                ['rating_sum', 'rating_count', 'rating_avg', *SCORE_FIELDS],
+                batch_size=BATCH_SIZE,
+            )
+            comments = Comment.objects.filter(
+                review=OuterRef('pk'),
+            ).order_by().values('review')
+            counted = Review.objects.update(
+                comments_count=Coalesce(
+                    Subquery(
+                        comments.annotate(total=Count('id')).values('total'),
+                        output_field=IntegerField(),
+                    ),
+                    0,
+                ),
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Ratings rebuilt for {updated} titles')
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Comment counts rebuilt for {counted} reviews')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import search
+from api.models import Category, Genre, Title
+
+
+class Command(BaseCommand):
+    """
+    Строит заново триграммный индекс названий
+    """
+    help = 'Rebuild trigram search index for titles, categories and genres'
+
+    def handle(self, *args, **options):
+        for model in (Title, Category, Genre):
+            with transaction.atomic():
+                search.rebuild(model)
+            self.stdout.write(
+                self.style.SUCCESS(f'{model._meta.model_name} indexed')
+            )
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from api import mail
+
+
+class Command(BaseCommand):
+    """
+    Фоновая отправка писем из очереди EmailOutbox
+    """
+    help = 'Deliver queued emails in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=mail.BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=getattr(settings, 'EMAIL_OUTBOX_POLL_INTERVAL', 1),
+            help='Seconds to sleep when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        try:
+            while True:
+                sent = mail.deliver_batch(connection, options['batch_size'])
+                if sent:
+                    self.stdout.write(f'{sent} emails processed')
+                    continue
+                if options['once']:
+                    return
+                connection.close()
+                time.sleep(options['interval'])
+        finally:
+            connection.close()
@@ -0,0 +1,172 @@
+import bisect
+import threading
+
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def format_labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'),
+        )
+        for name, value in zip(names, values)
+    )
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Гистограмма Prometheus с фиксированными корзинами: observe
+    находит корзину двоичным поиском и увеличивает один счетчик,
+    накопленные значения считаются только при выдаче метрик
+    """
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # значения меток -> [счетчики корзин (+Inf последний), сумма]
+        self.series = {}
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [
+                    [0] * (len(self.buckets) + 1), 0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self):
+        with self.lock:
+            series = {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self.series.items()
+            }
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = format_labels(self.labelnames, labels)
+            separator = ',' if label_text else ''
+            cumulative = 0
+            bounds = [format_value(bound) for bound in self.buckets]
+            for bound, count in zip(bounds + ['+Inf'], counts):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket{{{label_text}{separator}'
+                    f'le="{bound}"}} {cumulative}'
+                )
+            yield f'{self.name}_sum{{{label_text}}} {format_value(total)}'
+            yield f'{self.name}_count{{{label_text}}} {cumulative}'
+
+
+def metric(name, documentation, samples, kind='gauge'):
+    """
+    Строки метрики из [(имена меток, значения меток, значение)]
+    """
+    yield f'# HELP {name} {documentation}'
+    yield f'# TYPE {name} {kind}'
+    for names, values, value in samples:
+        if value is None:
+            continue
+        label_text = format_labels(names, values)
+        yield f'{name}{{{label_text}}} {format_value(value)}'
+
+
+LABELS = ('endpoint', 'action')
+
+REQUEST_SECONDS = Histogram(
+    'yamdb_request_duration_seconds',
+    'Request wall time.',
+    LABELS, TIME_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    'yamdb_request_db_seconds',
+    'Total time of database queries per request.',
+    LABELS, TIME_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'yamdb_request_db_queries',
+    'Database queries per request.',
+    LABELS, COUNT_BUCKETS,
+)
+SERIALIZER_SECONDS = Histogram(
+    'yamdb_request_serializer_seconds',
+    'Serializer time per request.',
+    LABELS, TIME_BUCKETS,
+)
+RENDER_SECONDS = Histogram(
+    'yamdb_request_render_seconds',
+    'Response rendering time per request.',
+    LABELS, TIME_BUCKETS,
+)
+HISTOGRAMS = (
+    REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, SERIALIZER_SECONDS,
+    RENDER_SECONDS,
+)
+
+
+def render():
+    """
+    Все метрики процесса в текстовом формате Prometheus
+    """
+    from . import cache, throttling
+    from .db import pool
+
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.collect())
+    lines.extend(metric(
+        'yamdb_response_cache_requests_total',
+        'Response cache lookups by outcome.',
+        [
+            (('endpoint', 'outcome'), (name, outcome), count)
+            for name, outcomes in sorted(cache.get_stats().items())
+            for outcome, count in sorted(outcomes.items())
+        ],
+        kind='counter',
+    ))
+    lines.extend(metric(
+        'yamdb_throttled_requests_total',
+        'Requests rejected by rate limiting rules.',
+        [
+            (('rule',), (name,), count)
+            for name, count in sorted(throttling.get_stats().items())
+        ],
+        kind='counter',
+    ))
+    pools = pool.get_stats()
+    for key in ('size', 'in_use', 'idle', 'saturation', 'reuse_ratio'):
+        lines.extend(metric(
+            f'yamdb_db_pool_{key}',
+            f'Database connection pool {key.replace("_", " ")}.',
+            [(('alias',), (alias,), stats[key])
+             for alias, stats in sorted(pools.items())],
+        ))
+    for key in ('checkouts', 'created', 'reused', 'waits', 'timeouts'):
+        lines.extend(metric(
+            f'yamdb_db_pool_{key}_total',
+            f'Database connection pool {key}.',
+            [(('alias',), (alias,), stats[key])
+             for alias, stats in sorted(pools.items())],
+            kind='counter',
+        ))
+    lines.extend(metric(
+        'yamdb_db_pool_wait_seconds_total',
+        'Time spent waiting for a free pooled connection.',
+        [(('alias',), (alias,), stats['wait_ms_total'] / 1000)
+         for alias, stats in sorted(pools.items())],
+        kind='counter',
+    ))
+    return '\n'.join(lines) + '\n'
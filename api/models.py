@@ -1,10 +1,42 @@
-from django.contrib.auth.models import AbstractUser
+from itertools import accumulate
+from math import sqrt
+
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+class ChangeBatchQuerySet(models.QuerySet):
+    """
+    Удаление с каскадом пишет журнал изменений одним bulk_create
+    """
+    def delete(self):
+        from .changes import batch
+
+        with batch(self.db):
+            return super().delete()
 
 
-class User(AbstractUser):
+class ChangeBatchMixin:
+    """
+    То же для удаления экземпляра
+    """
+    def delete(self, using=None, keep_parents=False):
+        from .changes import batch
+
+        using = using or router.db_for_write(type(self), instance=self)
+        with batch(using):
+            return super().delete(using=using, keep_parents=keep_parents)
+
+
+class ChangeBatchUserManager(UserManager.from_queryset(ChangeBatchQuerySet)):
+    pass
+
+
+class User(ChangeBatchMixin, AbstractUser):
     """
     Модель пользователя с добавленными полями
     и переопределенным email, требуется как уникальное,
@@ -23,6 +55,8 @@ class User(AbstractUser):
     )
     bio = models.TextField(default='')
 
+    objects = ChangeBatchUserManager()
+
     @property
     def is_admin(self):
         return (
@@ -65,9 +99,39 @@ class Genre(models.Model):
     slug = models.SlugField(max_length=200, unique=True)
 
 
-class Title(models.Model):
+class StoredCountersMixin:
+    """
+    Счетчики counter_fields меняет только UPDATE с F() в signals:
+    при сохранении существующей строки они не записываются, иначе
+    загруженный раньше экземпляр затер бы параллельные изменения
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                ]
+            kwargs['update_fields'] = [
+                name for name in update_fields
+                if name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+# оценки ревью и поля гистограммы оценок тайтла
+SCORES = range(1, 11)
+SCORE_FIELDS = tuple(f'score_{score}' for score in SCORES)
+
+
+class Title(ChangeBatchMixin, StoredCountersMixin, models.Model):
     """Модель Title"""
 
+    objects = ChangeBatchQuerySet.as_manager()
+
     name = models.TextField('name')
     category = models.ForeignKey(
         Category,
@@ -81,15 +145,138 @@ class Title(models.Model):
     )
     description = models.TextField('description', null=True)
     year = models.PositiveIntegerField('year')
+    rating_sum = models.PositiveIntegerField(
+        'sum of review scores',
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        'number of review scores',
+        default=0,
+        editable=False,
+    )
+    # rating_sum / rating_count, хранится для сортировки по индексу
+    rating_avg = models.FloatField(
+        'average review score',
+        null=True,
+        editable=False,
+    )
+
+    # гистограмма оценок: число ревью с каждой оценкой
+    score_1 = models.PositiveIntegerField(
+        'reviews with score 1',
+        default=0,
+        editable=False,
+    )
+    score_2 = models.PositiveIntegerField(
+        'reviews with score 2',
+        default=0,
+        editable=False,
+    )
+    score_3 = models.PositiveIntegerField(
+        'reviews with score 3',
+        default=0,
+        editable=False,
+    )
+    score_4 = models.PositiveIntegerField(
+        'reviews with score 4',
+        default=0,
+        editable=False,
+    )
+    score_5 = models.PositiveIntegerField(
+        'reviews with score 5',
+        default=0,
+        editable=False,
+    )
+    score_6 = models.PositiveIntegerField(
+        'reviews with score 6',
+        default=0,
+        editable=False,
+    )
+    score_7 = models.PositiveIntegerField(
+        'reviews with score 7',
+        default=0,
+        editable=False,
+    )
+    score_8 = models.PositiveIntegerField(
+        'reviews with score 8',
+        default=0,
+        editable=False,
+    )
+    score_9 = models.PositiveIntegerField(
+        'reviews with score 9',
+        default=0,
+        editable=False,
+    )
+    score_10 = models.PositiveIntegerField(
+        'reviews with score 10',
+        default=0,
+        editable=False,
+    )
+
+    @property
+    def rating(self):
+        """
+        Средняя оценка по сохраненным сумме и количеству оценок,
+        None если отзывов еще нет
+        """
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    counter_fields = (
+        'rating_sum', 'rating_count', 'rating_avg', *SCORE_FIELDS,
+    )
 
     def correct_year(self, year):
         if year > 2020:
             raise ValidationError('Год указан некорректно')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['year']),
+            models.Index(fields=['category', 'year']),
+            # /titles/top/: просмотр индекса в обратном порядке
+            models.Index(fields=['rating_avg', 'id']),
+            models.Index(fields=['category', 'rating_avg', 'id']),
+        ]
 
-class Review(models.Model):
+
+def score_stats(histogram):
+    """
+    Число оценок, средняя, медиана и стандартное отклонение
+    по гистограмме (значения SCORE_FIELDS)
+    """
+    count = sum(histogram)
+    stats = {
+        'reviews_count': count,
+        'rating': None,
+        'median': None,
+        'stddev': None,
+        'histogram': dict(zip(SCORES, histogram)),
+    }
+    if not count:
+        return stats
+    mean = sum(score * n for score, n in zip(SCORES, histogram)) / count
+
+    def nth(position):
+        for score, seen in zip(SCORES, accumulate(histogram)):
+            if seen > position:
+                return score
+
+    stats['rating'] = mean
+    stats['median'] = (nth((count - 1) // 2) + nth(count // 2)) / 2
+    stats['stddev'] = sqrt(sum(
+        n * (score - mean) ** 2 for score, n in zip(SCORES, histogram)
+    ) / count)
+    return stats
+
+
+class Review(ChangeBatchMixin, StoredCountersMixin, models.Model):
     """Создание модели Review"""
 
+    objects = ChangeBatchQuerySet.as_manager()
+
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -118,11 +305,56 @@ class Review(models.Model):
         'Date of publication',
         auto_now_add=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'number of comments',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('comments_count',)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает оценку и тайтл, с которыми ревью загружено из БД,
+        чтобы при изменении скорректировать рейтинг тайтла на разницу
+        """
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating()
+        return instance
 
+    def remember_rating(self):
+        self._rated = (
+            self.__dict__.get('title_id'),
+            self.__dict__.get('score'),
+        )
 
-class Comment(models.Model):
+    def save(self, *args, **kwargs):
+        """
+        Сохранение и пересчет рейтинга тайтла (в post_save)
+        выполняются в одной транзакции
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self.remember_rating()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'author'],
+                name='unique_review_author',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id']),
+        ]
+
+
+class Comment(ChangeBatchMixin, models.Model):
     """Создание модели Comment"""
 
+    objects = ChangeBatchQuerySet.as_manager()
+
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
@@ -141,3 +373,88 @@ class Comment(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает ревью, с которым комментарий загружен из БД,
+        чтобы при переносе скорректировать счетчики обоих ревью
+        """
+        instance = super().from_db(db, field_names, values)
+        instance.remember_review()
+        return instance
+
+    def remember_review(self):
+        self._counted = self.__dict__.get('review_id')
+
+    def save(self, *args, **kwargs):
+        """
+        Сохранение и изменение счетчика комментариев ревью (в post_save)
+        выполняются в одной транзакции
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self.remember_review()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id']),
+        ]
+
+
+class SearchTrigram(models.Model):
+    """
+    Триграммный индекс названий тайтлов, категорий и жанров:
+    по строке на каждую триграмму названия объекта
+    """
+    kind = models.CharField(max_length=16)
+    object_id = models.PositiveIntegerField()
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'trigram', 'object_id']),
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+
+class EmailOutbox(models.Model):
+    """
+    Очередь писем: запрос только добавляет строку,
+    отправляет фоновый процесс send_outbox
+    """
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(sent_at=None),
+                name='outbox_pending_idx',
+            ),
+        ]
+
+
+class ChangeLog(models.Model):
+    """
+    Журнал изменений тайтлов, ревью и комментариев: строка на каждое
+    сохранение или удаление (signals), id — номер изменения
+    для /changes/?since=
+    """
+    class Action(models.TextChoices):
+        CREATED = 'created'
+        UPDATED = 'updated'
+        DELETED = 'deleted'
+
+    kind = models.CharField(max_length=16)
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=16, choices=Action.choices)
+    # время БД, а не сервера приложения (см. api.changes.read)
+    changed_at = models.DateTimeField(default=Now)
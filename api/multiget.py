@@ -0,0 +1,73 @@
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .instrumentation import measure
+from .row_serializers import get_row_serializer
+
+MAX_IDS = 100
+
+# элемент ответа на месте id, которого нет (или он не виден в этом списке)
+NOT_FOUND = 'Not found.'
+
+
+def get_max_ids():
+    return getattr(settings, 'MULTI_GET_MAX_IDS', MAX_IDS)
+
+
+def parse_ids(value):
+    """
+    '3,1,2' -> [3, 1, 2]; ValidationError для пустого списка,
+    не чисел и списка длиннее MULTI_GET_MAX_IDS
+    """
+    try:
+        ids = [int(item) for item in value.split(',')]
+    except ValueError:
+        ids = []
+    if not ids or min(ids) < 1:
+        raise ValidationError({'ids': [
+            'Expected a comma-separated list of integer ids.',
+        ]})
+    max_ids = get_max_ids()
+    if len(ids) > max_ids:
+        raise ValidationError({'ids': [
+            f'Too many ids, the maximum is {max_ids}.',
+        ]})
+    return ids
+
+
+class MultiGetMixin:
+    """
+    list с параметром ?ids=3,1,2 отдает объекты с этими id одним
+    запросом (со связанными объектами, как в list) вместо отдельного
+    retrieve на каждый: результаты в порядке ids, на месте ненайденных —
+    {"id": ..., "detail": "Not found."}. Фильтры и ограничения
+    get_queryset() действуют как в list, пагинации нет.
+    Ставится перед RowSerializerMixin.
+    """
+    multi_get_param = 'ids'
+
+    def list(self, request, *args, **kwargs):
+        value = request.query_params.get(self.multi_get_param)
+        if value is None:
+            return super().list(request, *args, **kwargs)
+        ids = parse_ids(value)
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            pk__in=set(ids),
+        )
+        if getattr(self, 'use_row_serializer', lambda: False)():
+            row_serializer = get_row_serializer(self.get_serializer_class())
+            rows = row_serializer.values(queryset)
+            with measure('serializer'):
+                items = row_serializer.to_representation(rows)
+        else:
+            items = self.get_serializer(queryset, many=True).data
+        found = {item['id']: item for item in items}
+        results = [
+            found.get(pk) or {'id': pk, 'detail': NOT_FOUND} for pk in ids
+        ]
+        return Response({
+            'count': len(results),
+            'not_found': sum(pk not in found for pk in ids),
+            'results': results,
+        })
@@ -0,0 +1,118 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetOrPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация по номеру страницы (по умолчанию)
+    с размером страницы, выбираемым клиентом в пределах max_page_size.
+    При наличии параметра cursor (в том числе пустого, для первой страницы)
+    включается пагинация по ключу keyset_ordering без COUNT(*) и OFFSET:
+    следующая страница выбирается условием WHERE по значениям ключа
+    последней записи предыдущей страницы.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    keyset_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_page = None
+        if (
+            self.keyset_ordering
+                and self.cursor_query_param in request.query_params):
+            return self.paginate_keyset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_page is None:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_cursor_link(),
+            'results': data,
+        })
+
+    def paginate_keyset(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.keyset_ordering)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param],
+            queryset.model,
+        )
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position))
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.keyset_page = rows[:page_size]
+        return self.keyset_page
+
+    def keyset_filter(self, position):
+        """
+        Условие «строго после position» в порядке keyset_ordering:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        equal = {}
+        for ordering, value in zip(self.keyset_ordering, position):
+            field = ordering.lstrip('-')
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+        last = self.keyset_page[-1]
+        position = []
+        for ordering in self.keyset_ordering:
+            field = ordering.lstrip('-')
+            value = last[field] if isinstance(last, dict) else getattr(
+                last, field,
+            )
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            position.append(value)
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(position).encode(),
+        ).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor,
+        )
+
+    def decode_cursor(self, cursor, model):
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(position) != len(self.keyset_ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(ordering.lstrip('-')).to_python(value)
+                for ordering, value in zip(self.keyset_ordering, position)
+            ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class TitlePagination(KeysetOrPageNumberPagination):
+    keyset_ordering = ('id',)
+
+
+class PublicationPagination(KeysetOrPageNumberPagination):
+    """
+    Для ревью и комментариев: от новых к старым
+    """
+    keyset_ordering = ('-pub_date', '-id')
@@ -19,7 +19,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         return (
-            (obj.author == request.user)
-            or request.method in permissions.SAFE_METHODS
+            request.method in permissions.SAFE_METHODS
+            or (obj.author == request.user)
             or request.user.is_moderator
         )
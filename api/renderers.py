@@ -0,0 +1,55 @@
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+from .instrumentation import measure
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class TimedRendererMixin:
+    """
+    Время рендеринга учитывается в замерах запроса (instrumentation)
+    """
+    def render(self, *args, **kwargs):
+        with measure('render'):
+            return super().render(*args, **kwargs)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson (зависимость из requirements.txt).
+    Для компактного вывода результат побайтно совпадает с JSONRenderer,
+    в остальных случаях (отступы, ensure_ascii) используется JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii
+                or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS,
+            )
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028',
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class TimedJSONRenderer(TimedRendererMixin, FastJSONRenderer):
+    pass
+
+
+class TimedBrowsableAPIRenderer(TimedRendererMixin, BrowsableAPIRenderer):
+    pass
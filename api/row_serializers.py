@@ -0,0 +1,214 @@
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField, SlugRelatedField
+from rest_framework.response import Response
+
+from .instrumentation import measure
+from .models import Title
+
+# поля-свойства модели: колонки values() и вычисление значения по ним
+COMPUTED = {
+    (Title, 'rating'): (
+        ('rating_sum', 'rating_count'),
+        lambda rating_sum, rating_count: (
+            rating_sum / rating_count if rating_count else None
+        ),
+    ),
+}
+
+
+def identity(value):
+    return value
+
+
+def nullable(convert):
+    def to_representation(value):
+        return None if value is None else convert(value)
+    return to_representation
+
+
+def converted(get, convert):
+    def to_representation(row):
+        return convert(get(row))
+    return to_representation
+
+
+def nested(marker, steps):
+    def to_representation(row):
+        if marker(row) is None:
+            return None
+        return {key: get(row) for key, get in steps}
+    return to_representation
+
+
+def computed(getters, compute):
+    def to_representation(row):
+        return compute(*(get(row) for get in getters))
+    return to_representation
+
+
+class RowSerializer:
+    """
+    Сериализатор строк values(), скомпилированный из сериализатора DRF
+    только для чтения: на каждое поле заранее выбраны колонка values()
+    и функция преобразования, поэтому результат совпадает с выводом
+    исходного сериализатора без создания экземпляров моделей.
+    Вложенные many=True сериализаторы читаются одним запросом на страницу.
+    """
+    def __init__(self, serializer_class, prefix=''):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.columns = []
+        self.steps = []
+        self.many = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            self.compile_field(name, field, prefix)
+
+    def column(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+        return path
+
+    def compile_field(self, name, field, prefix):
+        source = field.source.replace('.', '__')
+        if isinstance(field, serializers.ListSerializer):
+            child = RowSerializer(type(field.child), prefix=f'{source}__')
+            self.many.append((name, source, child))
+            self.steps.append((name, None))
+        elif isinstance(field, serializers.BaseSerializer):
+            child = RowSerializer(type(field), prefix=f'{prefix}{source}__')
+            marker = itemgetter(self.column(f'{prefix}{source}'))
+            for path in child.columns:
+                self.column(path)
+            self.steps.append((name, nested(marker, child.steps)))
+        elif (self.model, field.source) in COMPUTED:
+            paths, compute = COMPUTED[(self.model, field.source)]
+            getters = [itemgetter(self.column(f'{prefix}{path}'))
+                       for path in paths]
+            self.steps.append((name, computed(getters, compute)))
+        else:
+            if isinstance(field, SlugRelatedField):
+                path = f'{prefix}{source}__{field.slug_field}'
+                convert = identity
+            elif isinstance(field, PrimaryKeyRelatedField):
+                path = f'{prefix}{source}'
+                convert = identity
+            elif isinstance(field, (serializers.CharField,
+                                    serializers.IntegerField)):
+                path = f'{prefix}{source}'
+                convert = identity
+            else:
+                path = f'{prefix}{source}'
+                convert = nullable(field.to_representation)
+            get = itemgetter(self.column(path))
+            if convert is not identity:
+                get = converted(get, convert)
+            self.steps.append((name, get))
+
+    def values(self, queryset):
+        """
+        queryset с нужными колонками; для many=True полей нужен еще pk
+        """
+        columns = list(self.columns)
+        if self.many and 'pk' not in columns:
+            columns.append('pk')
+        return queryset.values(*columns)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        nested = {
+            name: self.load_many(source, child, rows)
+            for name, source, child in self.many
+        }
+        return [
+            {
+                key: nested[key].get(row['pk'], [])
+                if get is None else get(row)
+                for key, get in self.steps
+            }
+            for row in rows
+        ]
+
+    def load_many(self, source, child, rows):
+        """
+        Значения many-to-many поля для всех строк страницы одним запросом,
+        в порядке первичного ключа связанной модели
+        """
+        ids = [row['pk'] for row in rows]
+        if not ids:
+            return {}
+        related = self.model.objects.filter(
+            pk__in=ids,
+            **{f'{source}__isnull': False},
+        ).order_by(f'{source}__pk').values('pk', *child.columns)
+        nested = {}
+        for row in related:
+            nested.setdefault(row['pk'], []).append(
+                {key: get(row) for key, get in child.steps}
+            )
+        return nested
+
+
+_compiled = {}
+
+
+def get_row_serializer(serializer_class):
+    if serializer_class not in _compiled:
+        _compiled[serializer_class] = RowSerializer(serializer_class)
+    return _compiled[serializer_class]
+
+
+class RowSerializerMixin:
+    """
+    list и retrieve без экземпляров моделей и сериализаторов DRF:
+    строки values() преобразуются скомпилированным RowSerializer.
+    Отключается настройкой FAST_READ_SERIALIZATION = False.
+    Объектные разрешения для безопасных методов не смотрят на объект,
+    поэтому retrieve проверяет их на строке values().
+    """
+    def use_row_serializer(self):
+        return getattr(settings, 'FAST_READ_SERIALIZATION', True)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_row_serializer():
+            return super().list(request, *args, **kwargs)
+        row_serializer = get_row_serializer(self.get_serializer_class())
+        queryset = row_serializer.values(
+            self.filter_queryset(self.get_queryset()),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with measure('serializer'):
+                data = row_serializer.to_representation(page)
+            return self.get_paginated_response(data)
+        with measure('serializer'):
+            data = row_serializer.to_representation(queryset)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_row_serializer():
+            return super().retrieve(request, *args, **kwargs)
+        row_serializer = get_row_serializer(self.get_serializer_class())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = row_serializer.values(
+            self.filter_queryset(self.get_queryset()),
+        )
+        # как get_object_or_404: значение не того типа — это 404
+        try:
+            row = queryset.filter(**{
+                self.lookup_field: self.kwargs[lookup_url_kwarg],
+            }).first()
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if row is None:
+            raise Http404
+        self.check_object_permissions(request, row)
+        with measure('serializer'):
+            data = row_serializer.to_representation([row])[0]
+        return Response(data)
@@ -0,0 +1,113 @@
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.functions import Length, Lower
+
+from .models import SearchTrigram
+
+MIN_QUERY_LENGTH = 3
+
+
+def trigrams(text):
+    """
+    Множество триграмм строки без учета регистра
+    """
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def index(instance, field='name'):
+    """
+    Переиндексирует название объекта
+    """
+    kind = instance._meta.model_name
+    unindex(instance)
+    SearchTrigram.objects.bulk_create(
+        SearchTrigram(kind=kind, object_id=instance.pk, trigram=trigram)
+        for trigram in trigrams(getattr(instance, field) or '')
+    )
+
+
+def index_many(objects, field='name'):
+    """
+    Индекс новых объектов одной модели одной пачкой вставок
+    """
+    SearchTrigram.objects.bulk_create(
+        SearchTrigram(
+            kind=obj._meta.model_name, object_id=obj.pk, trigram=trigram,
+        )
+        for obj in objects
+        for trigram in trigrams(getattr(obj, field) or '')
+    )
+
+
+def unindex(instance):
+    SearchTrigram.objects.filter(
+        kind=instance._meta.model_name,
+        object_id=instance.pk,
+    ).delete()
+
+
+def rebuild(model, field='name', batch_size=1000):
+    """
+    Строит индекс модели заново
+    """
+    kind = model._meta.model_name
+    SearchTrigram.objects.filter(kind=kind).delete()
+    batch = []
+    rows = model.objects.values_list('pk', field).iterator(
+        chunk_size=batch_size,
+    )
+    for pk, text in rows:
+        batch.extend(
+            SearchTrigram(kind=kind, object_id=pk, trigram=trigram)
+            for trigram in trigrams(text or '')
+        )
+        if len(batch) >= batch_size:
+            SearchTrigram.objects.bulk_create(batch)
+            batch = []
+    SearchTrigram.objects.bulk_create(batch)
+
+
+def lower(text):
+    return None if text is None else text.lower()
+
+
+def enable_unicode_lower(connection):
+    """
+    LOWER() в SQLite меняет регистр только латиницы: заменяется
+    на str.lower, как в trigrams и PostgreSQL
+    """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'LOWER', 1, lower, deterministic=True,
+        )
+
+
+def search(queryset, query, field='name'):
+    """
+    Объекты queryset, в поле field которых встречается подстрока query
+    без учета регистра (в том числе не латиницы: сравнивается LOWER).
+    Кандидаты выбираются по индексу: у них есть все триграммы запроса,
+    затем проверяется точное вхождение. Сортировка по релевантности:
+    сначала совпадения с начала названия, затем более короткие названия.
+    Запросы короче трех символов выполняются без индекса.
+    """
+    grams = trigrams(query)
+    if len(query) >= MIN_QUERY_LENGTH:
+        candidates = SearchTrigram.objects.filter(
+            kind=queryset.model._meta.model_name,
+            trigram__in=grams,
+        ).values('object_id').annotate(
+            matched=Count('id'),
+        ).filter(matched=len(grams)).values('object_id')
+        queryset = queryset.filter(pk__in=candidates)
+    query = query.lower()
+    return queryset.annotate(
+        search_text=Lower(field),
+    ).filter(search_text__contains=query).annotate(
+        search_prefix=Case(
+            When(search_text__startswith=query, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        ),
+        search_length=Length(field),
+    ).order_by('search_prefix', 'search_length', 'pk')
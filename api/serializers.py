@@ -1,6 +1,7 @@
-from django.db.models import Avg
+from django.db import IntegrityError
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
 from .models import Category, Comment, Genre, Review, Title, User
@@ -79,7 +80,12 @@ class GenreSerializer(serializers.ModelSerializer):
 
 
 class TitleSerializer_get(serializers.ModelSerializer):
-    rating = serializers.SerializerMethodField()
+    rating = serializers.FloatField(read_only=True)
+    # у каждого ревью есть оценка, число ревью — число оценок
+    reviews_count = serializers.IntegerField(
+        source='rating_count',
+        read_only=True,
+    )
     genre = GenreSerializer(many=True, read_only=True)
     category = CategorySerializer(read_only=True)
 
@@ -89,18 +95,13 @@ class TitleSerializer_get(serializers.ModelSerializer):
             'name',
             'year',
             'rating',
+            'reviews_count',
             'description',
             'genre',
             'category',
         )
         model = Title
 
-    def get_rating(self, obj):
-        rating = obj.reviews.all().aggregate(Avg('score')).get('score__avg')
-        if rating is None:
-            return None
-        return rating
-
 
 class TitleSerializer_post(serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(
@@ -120,11 +121,18 @@ class TitleSerializer_post(serializers.ModelSerializer):
                   'category',
                   )
 
-    def get_rating(self, obj):
-        rating = obj.reviews.all().aggregate(Avg('score')).get('score__avg')
-        if rating is None:
-            return 0
-        return rating
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """
+    Элемент массовой загрузки тайтлов: слаги категории и жанров
+    проверяются сразу для всей загрузки (api.bulk), а не по одному
+    """
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+    class Meta:
+        model = Title
+        fields = ('name', 'year', 'description', 'genre', 'category')
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -136,17 +144,43 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only=True,
     )
 
-    def validate(self, data):
+    def create(self, validated_data):
+        """
+        Вторая оценка автора отклоняется уникальным ограничением БД
+        при вставке, без предварительной проверки: проверка и вставка
+        не атомарны, и параллельные запросы создавали дубликаты
+        """
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            self.assessment_exists(
+                validated_data.get('title'), validated_data.get('author'),
+            )
+            raise
+
+    def update(self, instance, validated_data):
+        """
+        То же при переносе ревью на тайтл, который автор уже оценил
+        """
+        try:
+            return super().update(instance, validated_data)
+        except IntegrityError:
+            self.assessment_exists(
+                validated_data.get('title', instance.title), instance.author,
+                exclude=instance.pk,
+            )
+            raise
+
+    def assessment_exists(self, title, author, exclude=None):
         """
-        проверка на наличие оценки у ревью
+        ValidationError, если у автора уже есть другое ревью на тайтл
         """
-        title = self.context.get('title')
-        request = self.context.get('request')
-        if (
-            request.method != 'PATCH'
-                and Review.objects.filter(title=title, author=request.user,).exists()):
-            raise serializers.ValidationError('Assessment exists!')
-        return data
+        if Review.objects.filter(
+            title=title, author=author,
+        ).exclude(pk=exclude).exists():
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ['Assessment exists!'],
+            })
 
     class Meta:
         model = Review
@@ -0,0 +1,289 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, NullIf
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, changes, instrumentation, search
+from .authentication import user_cache
+from .models import (SCORE_FIELDS, SCORES, Category, ChangeLog, Comment, Genre,
+                     Review, Title, User)
+
+
+def average(rating_sum, rating_count):
+    """
+    Выражение средней оценки, NULL при нуле оценок
+    """
+    return Cast(rating_sum, FloatField()) / NullIf(rating_count, 0)
+
+
+def change_rating(title_id, added=None, removed=None):
+    """
+    Атомарно добавляет к рейтингу тайтла оценку added и убирает removed:
+    сумма, количество, средняя и гистограмма оценок меняются
+    одним UPDATE без чтения строки
+    """
+    if title_id is None or added == removed:
+        return
+    changes = {}
+    for score, delta in ((added, 1), (removed, -1)):
+        if score is not None:
+            name = f'score_{score}'
+            changes[name] = F(name) + delta
+    rating_sum = F('rating_sum') + (added or 0) - (removed or 0)
+    rating_count = (
+        F('rating_count') + (added is not None) - (removed is not None)
+    )
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        # выражения UPDATE видят строку до изменения
+        rating_avg=average(rating_sum, rating_count),
+        **changes,
+    )
+
+
+def recount_rating(title_id):
+    """
+    Полный пересчет рейтинга и гистограммы оценок тайтла по его ревью
+    """
+    totals = Review.objects.filter(title_id=title_id).aggregate(
+        rating_sum=Sum('score'),
+        rating_count=Count('id'),
+        **{
+            name: Count('id', filter=Q(score=score))
+            for score, name in zip(SCORES, SCORE_FIELDS)
+        },
+    )
+    rating_sum = totals.pop('rating_sum') or 0
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=rating_sum,
+        rating_avg=(
+            rating_sum / totals['rating_count']
+            if totals['rating_count'] else None
+        ),
+        **totals,
+    )
+
+
+def change_comments(review_id, delta):
+    """
+    Атомарно изменяет счетчик комментариев ревью одним UPDATE
+    """
+    if review_id is None or not delta:
+        return
+    Review.objects.filter(pk=review_id).update(
+        comments_count=F('comments_count') + delta,
+    )
+
+
+def recount_comments(review_id):
+    """
+    Полный пересчет счетчика комментариев ревью
+    """
+    Review.objects.filter(pk=review_id).update(
+        comments_count=Comment.objects.filter(review_id=review_id).count(),
+    )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """
+    Новая оценка добавляется к рейтингу тайтла,
+    при редактировании учитывается только разница
+    """
+    old_title_id, old_score = getattr(instance, '_rated', (None, None))
+    if created:
+        change_rating(instance.title_id, added=instance.score)
+    elif old_score is None:
+        recount_rating(old_title_id)
+        recount_rating(instance.title_id)
+    elif old_title_id != instance.title_id:
+        change_rating(old_title_id, removed=old_score)
+        change_rating(instance.title_id, added=instance.score)
+    else:
+        change_rating(
+            instance.title_id, added=instance.score, removed=old_score,
+        )
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """
+    Удаленная оценка (в том числе каскадно) вычитается из рейтинга
+    """
+    old_title_id, old_score = getattr(
+        instance, '_rated', (instance.title_id, instance.score),
+    )
+    change_rating(old_title_id, removed=old_score)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """
+    Новый комментарий увеличивает счетчик своего ревью,
+    перенесенный — уменьшает счетчик прежнего
+    """
+    old_review_id = getattr(instance, '_counted', None)
+    if created:
+        change_comments(instance.review_id, 1)
+    elif old_review_id is None:
+        recount_comments(instance.review_id)
+    elif old_review_id != instance.review_id:
+        change_comments(old_review_id, -1)
+        change_comments(instance.review_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """
+    Удаленный (в том числе каскадно) комментарий вычитается из счетчика
+    """
+    change_comments(
+        getattr(instance, '_counted', None) or instance.review_id, -1,
+    )
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def content_saved(sender, instance, created, **kwargs):
+    """
+    Запись в журнал изменений в той же транзакции, что и сохранение
+    """
+    changes.record(
+        instance,
+        ChangeLog.Action.CREATED if created else ChangeLog.Action.UPDATED,
+    )
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def content_deleted(sender, instance, **kwargs):
+    changes.record(instance, ChangeLog.Action.DELETED)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def searchable_saved(sender, instance, **kwargs):
+    """
+    Обновление триграммного индекса названия
+    """
+    search.index(instance)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def searchable_deleted(sender, instance, **kwargs):
+    search.unindex(instance)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    cache.bump('titles', f'title:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        cache.bump('titles', f'title:{instance.pk}')
+    elif pk_set is None:
+        cache.bump('titles', 'taxonomy')
+    else:
+        cache.bump('titles', *(f'title:{pk}' for pk in pk_set))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    cache.bump('categories', 'taxonomy')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    cache.bump('genres', 'taxonomy')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """
+    Ревью меняет свой список и рейтинг тайтла
+    """
+    title_ids = {instance.title_id, getattr(instance, '_rated', (None,))[0]}
+    title_ids.discard(None)
+    cache.bump('titles', *(
+        scope
+        for title_id in title_ids
+        for scope in (f'reviews:{title_id}', f'title:{title_id}')
+    ))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """
+    Комментарий меняет свой список и comments_count в списке ревью;
+    тайтл ревью берется из загруженного ревью, иначе одним запросом
+    """
+    review_ids = {instance.review_id, getattr(instance, '_counted', None)}
+    review_ids.discard(None)
+    if (
+        review_ids == {instance.review_id}
+            and Comment.review.is_cached(instance)):
+        title_ids = {instance.review.title_id}
+    else:
+        title_ids = set(Review.objects.filter(
+            pk__in=review_ids,
+        ).values_list('title_id', flat=True))
+    cache.bump(
+        *(f'comments:{review_id}' for review_id in review_ids),
+        *(f'reviews:{title_id}' for title_id in title_ids),
+    )
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    """
+    Имя пользователя выводится автором в ревью и комментариях
+    """
+    if not created:
+        cache.bump('authors')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_cache_reset(sender, instance, **kwargs):
+    """
+    Роль, is_active и is_superuser читаются из кэша аутентификации,
+    поэтому запись сбрасывается сразу и еще раз после фиксации транзакции
+    """
+    user_cache.delete(instance.pk)
+    transaction.on_commit(lambda: user_cache.delete(instance.pk))
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Замер запросов к БД для инструментирования запросов
+    """
+    if instrumentation.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrumentation.record_query)
+
+
+@receiver(connection_created)
+def unicode_lower(sender, connection, **kwargs):
+    """
+    Поиск сравнивает LOWER() названий: в SQLite он без учета регистра
+    только для латиницы
+    """
+    search.enable_unicode_lower(connection)
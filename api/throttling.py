@@ -0,0 +1,192 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from .db import replicas
+
+THROTTLES = {
+    'ENABLED': True,
+    # заголовок с адресом клиента от прокси (nginx: X-Real-IP),
+    # None — REMOTE_ADDR
+    'IP_HEADER': None,
+    # сколько ведер хранится в процессе, вытесняются давно не использованные
+    'MAX_KEYS': 100000,
+    # правило применяется к запросу, если совпали все заданные условия:
+    # VIEWS — имена URL, ACTIONS — действия viewset, METHODS — методы;
+    # KEY — ip, user или user_or_ip, RATE — '10/min', BURST — емкость
+    'RULES': {},
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+MESSAGE = 'Request was throttled. Expected available in {wait} seconds.'
+
+_stats_lock = threading.Lock()
+_throttled = {}
+
+
+def get_options():
+    return {**THROTTLES, **getattr(settings, 'THROTTLES', {})}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    '10/min' -> (10, 1/6): число запросов и токенов в секунду
+    """
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """
+    Token bucket в памяти процесса: ведро на ключ хранит число токенов
+    и время последнего пополнения, проверка — O(1) под блокировкой.
+    Ограничено MAX_KEYS ведрами, вытесняются давно не использованные:
+    такое ведро почти всегда уже снова полное.
+    """
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def consume(self, key, rate, burst):
+        """
+        Забирает токен из ведра key; 0, если токен был,
+        иначе сколько секунд ждать следующего
+        """
+        return self.consume_all([(key, rate, burst)])[0]
+
+    def consume_all(self, requests):
+        """
+        Забирает по токену из всех ведер requests (key, rate, burst),
+        только если токен есть в каждом: (0, None), иначе ничего
+        не забирает и возвращает (сколько ждать, индекс первого ведра
+        без токена)
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens = []
+            for key, rate, burst in requests:
+                stored, updated = self.buckets.get(key, (burst, now))
+                tokens.append(min(burst, stored + (now - updated) * rate))
+            for index, (_, rate, _) in enumerate(requests):
+                if tokens[index] < 1:
+                    return (1 - tokens[index]) / rate, index
+            for (key, _, _), left in zip(requests, tokens):
+                self.buckets[key] = (left - 1, now)
+                self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return 0, None
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+buckets = LocalBucketStore(get_options()['MAX_KEYS'])
+
+
+def get_ip(request, options):
+    header = options['IP_HEADER']
+    if header and request.META.get(header):
+        return request.META[header].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+def matches(rule, request, match):
+    if 'METHODS' in rule and request.method not in rule['METHODS']:
+        return False
+    if 'VIEWS' in rule and match.view_name not in rule['VIEWS']:
+        return False
+    if 'ACTIONS' in rule:
+        actions = getattr(match.func, 'actions', None) or {}
+        if actions.get(request.method.lower()) not in rule['ACTIONS']:
+            return False
+    return True
+
+
+def get_key(rule, request, options):
+    """
+    Ключ ведра для запроса или None, если правило к нему не относится
+    (KEY=user у анонимного запроса)
+    """
+    if rule['KEY'] in ('user', 'user_or_ip'):
+        user_id = replicas.get_user_id(request)
+        if user_id is not None:
+            return f'user:{user_id}'
+        if rule['KEY'] == 'user':
+            return None
+    return f'ip:{get_ip(request, options)}'
+
+
+def check(request, match):
+    """
+    Ответ 429, если запрос превысил лимит одного из правил, иначе None.
+    Выполняется до аутентификации и сериализации: пользователь берется
+    из JWT без обращения к БД
+    """
+    options = get_options()
+    if (
+        not options['ENABLED'] or match is None
+            or getattr(request, 'throttle_checked', False)):
+        return None
+    # повтор запроса с primary (ReplicaMiddleware) не тратит токены
+    request.throttle_checked = True
+    names, requests = [], []
+    for name, rule in options['RULES'].items():
+        if not matches(rule, request, match):
+            continue
+        key = get_key(rule, request, options)
+        if key is None:
+            continue
+        count, rate = parse_rate(rule['RATE'])
+        names.append(name)
+        requests.append((f'{name}:{key}', rate, rule.get('BURST', count)))
+    if not requests:
+        return None
+    # токены забираются, только если запрос проходит все правила:
+    # отклоненный запрос не расходует лимиты остальных правил
+    wait, rejected = buckets.consume_all(requests)
+    if not wait:
+        return None
+    record(names[rejected])
+    wait = math.ceil(wait)
+    response = JsonResponse({'detail': MESSAGE.format(wait=wait)}, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def record(name):
+    with _stats_lock:
+        _throttled[name] = _throttled.get(name, 0) + 1
+
+
+def get_stats():
+    """
+    Число отклоненных запросов по правилам
+    """
+    with _stats_lock:
+        return dict(_throttled)
+
+
+class ThrottleMiddleware:
+    """
+    Ограничение частоты запросов по правилам THROTTLES: отклоняет запрос
+    ответом 429 до вызова представления
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return check(request, request.resolver_match)
@@ -1,10 +1,11 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
-from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    GetAuthPairToken, GetConfirmCodeView, ReviewViewSet,
-                    TitleViewSet, UserViewSet)
+from .views import (CacheStatsView, CategoryViewSet, ChangeFeedView,
+                    CommentViewSet, DatabasePoolStatsView, ExportView,
+                    GenreViewSet, GetAuthPairToken, GetConfirmCodeView,
+                    ReviewViewSet, TitleViewSet, UserViewSet)
 
 v1_router = DefaultRouter()
 
@@ -42,5 +43,18 @@ authpatterns = [
 
 urlpatterns = [
     path('v1/auth/', include(authpatterns)),
+    path('v1/cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path(
+        'v1/db/pool/stats/',
+        DatabasePoolStatsView.as_view(),
+        name='db_pool_stats',
+    ),
+    path('v1/changes/', ChangeFeedView.as_view(), name='changes'),
+    re_path(
+        r'^v1/export/(?P<name>titles|reviews|comments)'
+        r'\.(?P<fmt>ndjson|csv)$',
+        ExportView.as_view(),
+        name='export',
+    ),
     path('v1/', include(v1_router.urls)),
 ]
@@ -1,21 +1,36 @@
-from django.core.mail import send_mail
-from django.db.models import Avg
+import hmac
+
+from django.db.models import Prefetch
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, mixins, status, views, viewsets
+from rest_framework import mixins, status, views, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly,
                                         )
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.backends import TokenBackend
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from api_yamdb.settings import EMAIL_YAMDB, SIMPLE_JWT
-from .filters import TitleFilter
-from .models import Category, Comment, Genre, Review, Title, User
+from api_yamdb.settings import SIMPLE_JWT
+from . import bulk, changes, export, mail, metrics
+from .aio import AsyncReadMixin
+from .cache import CachedListMixin, CachedResponseMixin, get_stats
+from .db import pool
+from .filters import TitleFilter, TrigramSearchFilter
+from .instrumentation import InstrumentedViewMixin, measure
+from .models import (SCORE_FIELDS, Category, Comment, Genre, Review, Title,
+                     User, score_stats)
+from .multiget import MultiGetMixin
+from .pagination import (KeysetOrPageNumberPagination, PublicationPagination,
+                         TitlePagination,
+                         )
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
+from .row_serializers import RowSerializerMixin, get_row_serializer
 from .serializers import (CategorySerializer, CommentSerializer,
                           EmailSerializer, GenreSerializer,
                           GetAccessParTokenSerializer, ReviewSerializer,
@@ -27,19 +42,15 @@ from .user_action_permissions import IsAdministratorOrSuperUser
 
 def send_mail_to_email(to, subject, body):
     """
-    Отправляет EMAIL по адресу TO:
+    Ставит в очередь EMAIL по адресу TO:
     c темой SUBJECT:
     и телом письма BODY:
+    отправляет его фоновый процесс send_outbox
     """
-    send_mail(
-        subject=subject,
-        message=body,
-        from_email=EMAIL_YAMDB,
-        recipient_list=[to],
-    )
+    mail.enqueue(to, subject, body)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     Для работы с пользователями (чтение, создание, обновление)
     """
@@ -61,8 +72,9 @@ class UserViewSet(viewsets.ModelViewSet):
         Обрабатывает users/me/
         """
         partial = kwargs.pop('partial', True)
+        # в request.user из кэша аутентификации загружены не все поля
         serializer = self.get_serializer(
-            request.user,
+            User.objects.get(pk=request.user.pk),
             data=request.data,
             partial=partial,
         )
@@ -143,22 +155,229 @@ class GetAuthPairToken(GetConfirmCodeView):
         )
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class CacheStatsView(views.APIView):
+    """
+    Счетчики попаданий и промахов кэша ответов
+    """
+    permission_classes = [
+        IsAuthenticated,
+        IsAdministratorOrSuperUser,
+    ]
+
+    def get(self, request):
+        return Response(get_stats())
+
+
+class DatabasePoolStatsView(views.APIView):
+    """
+    Метрики пулов соединений с БД текущего процесса
+    """
+    permission_classes = [
+        IsAuthenticated,
+        IsAdministratorOrSuperUser,
+    ]
+
+    def get(self, request):
+        return Response(pool.get_stats())
+
+
+class ChangeFeedView(views.APIView):
+    """
+    Журнал изменений тайтлов, ревью и комментариев по порядку:
+    ?since=<seq> — номер последнего прочитанного изменения,
+    ?limit= — размер пачки. В ответе next — since для следующего чтения
+    """
+    permission_classes = [
+        IsAuthenticated,
+        IsAdministratorOrSuperUser,
+    ]
+
+    def get_int(self, name, default, minimum, maximum):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            number = minimum - 1
+        if not minimum <= number <= maximum:
+            raise ValidationError({name: [
+                f'Expected an integer from {minimum} to {maximum}.',
+            ]})
+        return number
+
+    def get(self, request):
+        options = changes.get_options()
+        since = self.get_int('since', 0, 0, 2 ** 63 - 1)
+        limit = self.get_int(
+            'limit', options['BATCH_SIZE'], 1, options['MAX_BATCH_SIZE'],
+        )
+        return Response(changes.read(since, limit))
+
+
+def metrics_view(request):
+    """
+    Метрики процесса в формате Prometheus по заголовку
+    Authorization: Bearer <METRICS_TOKEN>; без METRICS_TOKEN закрыты
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token or not hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+class ExportView(views.APIView):
+    """
+    Потоковая выгрузка тайтлов, ревью или комментариев в NDJSON или CSV
+    """
+    permission_classes = [
+        IsAuthenticated,
+        IsAdministratorOrSuperUser,
+    ]
+
+    def get(self, request, name, fmt):
+        response = StreamingHttpResponse(
+            export.encoded_chunks(export.lines(name, fmt)),
+            content_type=export.CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{name}.{fmt}"'
+        )
+        return response
+
+
+class TitleViewSet(AsyncReadMixin, CachedResponseMixin, InstrumentedViewMixin,
+                   MultiGetMixin, RowSerializerMixin, viewsets.ModelViewSet):
     """
     Определяем методы работы с сериализаторами, их
     будет два, в зависимости от метода
     """
-    queryset = Title.objects.annotate(rating=Avg('reviews__score'))
+    queryset = Title.objects.select_related(
+        'category',
+    ).prefetch_related(
+        Prefetch('genre', queryset=Genre.objects.order_by('pk')),
+    )
     permission_classes = [IsAdminOrReadOnly]
-    pagination_class = PageNumberPagination
+    pagination_class = TitlePagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitleFilter
+    async_actions = ('list', 'retrieve', 'top', 'stats')
+    # размер /titles/top/ по умолчанию и наибольший (?limit=)
+    top_limit = 10
+    top_max_limit = 100
 
     def get_serializer_class(self):
-        if self.action == 'retrieve' or self.action == 'list':
+        if self.action in ('retrieve', 'list', 'top'):
             return TitleSerializer_get
         return TitleSerializer_post
 
+    def get_cache_scopes(self):
+        if self.action == 'retrieve':
+            return [f'title:{self.kwargs.get("pk")}', 'taxonomy']
+        if self.action == 'stats':
+            return [f'title:{self.kwargs.get("pk")}']
+        return ['titles', 'taxonomy']
+
+    def get_top_limit(self):
+        value = self.request.query_params.get('limit')
+        if value is None:
+            return self.top_limit
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.top_max_limit:
+            raise ValidationError({'limit': [
+                f'Expected an integer from 1 to {self.top_max_limit}.',
+            ]})
+        return limit
+
+    @action(detail=False)
+    def top(self, request):
+        """
+        Лучшие по средней оценке тайтлы с фильтрами TitleFilter.
+        Средняя оценка хранится в rating_avg и обновляется вместе
+        с рейтингом, поэтому запрос читает индекс по rating_avg
+        (для категории — по category, rating_avg) с конца и
+        останавливается на limit строках
+        """
+        return self.cached_response(self.top_titles, request)
+
+    def top_titles(self, request):
+        limit = self.get_top_limit()
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            rating_avg__isnull=False,
+        ).order_by('-rating_avg', '-id')
+        if not self.use_row_serializer():
+            serializer = self.get_serializer(queryset[:limit], many=True)
+            return Response(serializer.data)
+        row_serializer = get_row_serializer(self.get_serializer_class())
+        rows = row_serializer.values(queryset)[:limit]
+        with measure('serializer'):
+            data = row_serializer.to_representation(rows)
+        return Response(data)
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """
+        Распределение оценок тайтла (число ревью с каждой оценкой),
+        средняя, медиана и стандартное отклонение — по гистограмме,
+        которая хранится в строке тайтла: одно чтение строки
+        """
+        return self.cached_response(self.title_stats, request, pk=pk)
+
+    def title_stats(self, request, pk=None):
+        histogram = None
+        if pk.isdigit():
+            histogram = Title.objects.filter(pk=pk).values_list(
+                *SCORE_FIELDS,
+            ).first()
+        if histogram is None:
+            raise Http404
+        return Response({'id': int(pk), **score_stats(histogram)})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Массовое создание тайтлов: список элементов в формате
+        TitleSerializer_post, в ответе id или ошибки по каждому элементу.
+        201 — созданы все, 207 — часть, 400 — ни одного
+        """
+        items = request.data
+        max_items = bulk.get_max_items()
+        if not isinstance(items, list) or not items:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Expected a non-empty list of titles.',
+                ],
+            })
+        if len(items) > max_items:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Too many titles, the maximum is {max_items}.',
+                ],
+            })
+        results = bulk.create_titles(items)
+        failed = sum('errors' in result for result in results)
+        if not failed:
+            code = status.HTTP_201_CREATED
+        elif failed < len(results):
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {
+                'created': len(results) - failed,
+                'failed': failed,
+                'results': results,
+            },
+            status=code,
+        )
+
 
 class IndividualViewSet(
     viewsets.GenericViewSet,
@@ -172,7 +391,8 @@ class IndividualViewSet(
     pass
 
 
-class CategoryViewSet(IndividualViewSet):
+class CategoryViewSet(AsyncReadMixin, CachedListMixin, InstrumentedViewMixin,
+                      IndividualViewSet):
     """
     применяем класс IndividualViewSet для определения
     необходимых Mixins
@@ -181,13 +401,17 @@ class CategoryViewSet(IndividualViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
-    pagination_class = PageNumberPagination
+    pagination_class = KeysetOrPageNumberPagination
     lookup_field = 'slug'
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [TrigramSearchFilter]
     search_fields = ['name']
 
+    def get_cache_scopes(self):
+        return ['categories']
 
-class GenreViewSet(IndividualViewSet):
+
+class GenreViewSet(AsyncReadMixin, CachedListMixin, InstrumentedViewMixin,
+                   IndividualViewSet):
     """
     применяем класс IndividualViewSet для определения
     необходимых Mixins
@@ -196,79 +420,101 @@ class GenreViewSet(IndividualViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [IsAdminOrReadOnly]
-    pagination_class = PageNumberPagination
+    pagination_class = KeysetOrPageNumberPagination
     lookup_field = 'slug'
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [TrigramSearchFilter]
     search_fields = ['name']
 
+    def get_cache_scopes(self):
+        return ['genres']
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(AsyncReadMixin, CachedResponseMixin, InstrumentedViewMixin,
+                    MultiGetMixin, RowSerializerMixin, viewsets.ModelViewSet):
     """
     Обработка запросов на чтение и запись ревью
     """
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PublicationPagination
     permission_classes = [
         IsOwnerOrReadOnly,
         IsAuthenticatedOrReadOnly,
     ]
     lookup_field = 'pk'
 
+    def get_title(self):
+        """
+        тайтл из url, загружается один раз за запрос
+        """
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title,
+                pk=self.kwargs.get('title_id'),
+            )
+        return self._title
+
+    def get_cache_scopes(self):
+        return [f'reviews:{self.kwargs.get("title_id")}', 'authors']
+
     def get_serializer_context(self):
         """
         получение дополнительных аргументов
         """
         context = super(ReviewViewSet, self).get_serializer_context()
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        context.update({'title': title})
+        context.update({'title': self.get_title()})
         return context
 
     def get_queryset(self):
         """
         получение ревью на тайтл
         """
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return self.get_title().reviews.select_related('author')
 
     def perform_create(self, serializer):
         """
         сохранение нового экземпляра объекта
         """
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(AsyncReadMixin, CachedResponseMixin,
+                     InstrumentedViewMixin, RowSerializerMixin,
+                     viewsets.ModelViewSet):
     """
     Обработка запросов на чтение и запись комментариев
     """
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PublicationPagination
     permission_classes = [
         IsOwnerOrReadOnly,
         IsAuthenticatedOrReadOnly,
     ]
 
+    def get_cache_scopes(self):
+        return [f'comments:{self.kwargs.get("review_id")}', 'authors']
+
+    def get_review(self):
+        """
+        ревью из url, загружается один раз за запрос
+        """
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                pk=self.kwargs.get('review_id'),
+                title=self.kwargs.get('title_id'),
+            )
+        return self._review
+
     def get_queryset(self):
         """
         получение всех комментариев
         """
-        review = get_object_or_404(
-            Review,
-            pk=self.kwargs.get('review_id'),
-            title=self.kwargs.get('title_id'),
-        )
-        return review.comments.all()
+        return self.get_review().comments.select_related('author')
 
     def perform_create(self, serializer):
         """
         сохранение нового экземпляра объекта
         """
-        review = get_object_or_404(
-            Review,
-            pk=self.kwargs.get('review_id'),
-            title=self.kwargs.get('title_id'),
-        )
-        serializer.save(review=review, author=self.request.user)
+        serializer.save(review=self.get_review(), author=self.request.user)
@@ -2,6 +2,8 @@
 ASGI config for YaMDb project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Read endpoints of the API are served by api.aio.ReadApplication as native
+async views, everything else is passed to the Django ASGI handler.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -13,4 +15,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.aio import ReadApplication  # noqa: E402
+
+application = ReadApplication(django_application)
@@ -38,13 +38,16 @@ INSTALLED_APPS = [
     'django_filters',
     'rest_framework',
     'rest_framework.authtoken',
-    'api',
+    'api.apps.ApiConfig',
 ]
 
 AUTH_USER_MODEL = 'api.User'  # новое
 
 MIDDLEWARE = [
+    'api.instrumentation.TimingMiddleware',
+    'api.throttling.ThrottleMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.db.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,15 +82,88 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # api.db.postgresql_pool — PostgreSQL с пулом соединений (POOL)
+        'ENGINE': os.environ.get(
+            'DB_ENGINE', 'django.db.backends.postgresql',
+        ),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('POSTGRES_USER'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # секунды, в течение которых поток держит соединение;
+        # 0 — соединение возвращается в пул после каждого запроса
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            # 0 отключает пул
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)),
+            'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', 3600)),
+            'CHECK_INTERVAL': int(
+                os.environ.get('DB_POOL_CHECK_INTERVAL', 10)
+            ),
+        },
+    }
+}
+
+# реплики для чтения: DB_REPLICA_HOSTS=host1,host2 добавляет базы
+# replica1, replica2 с теми же параметрами, что и default
+for number, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['api.db.replicas.ReplicaRouter']
+
+REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    # round_robin или least_loaded
+    'SELECTION': os.environ.get('DB_REPLICA_SELECTION', 'round_robin'),
+    'PIN_SECONDS': int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5)),
+    'RETRY_SECONDS': int(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30)),
+    'CHECK_SECONDS': int(os.environ.get('DB_REPLICA_CHECK_SECONDS', 5)),
+    # закрепления за primary должны видеть все воркеры (см. CACHES)
+    'CACHE_ALIAS': 'replica_pins',
+}
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.environ.get(
+            'RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000)
+            ),
+        },
+    },
+    # locmem виден только своему процессу: при нескольких воркерах
+    # закрепление после записи действует лишь в воркере, принявшем
+    # запись, поэтому задайте общий кэш (memcached, filebased)
+    'replica_pins': {
+        'BACKEND': os.environ.get(
+            'REPLICA_PIN_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('REPLICA_PIN_CACHE_LOCATION', 'pins'),
+    },
 }
 
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -130,7 +206,11 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.TimedJSONRenderer',
+        'api.renderers.TimedBrowsableAPIRenderer',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -142,6 +222,69 @@ REST_FRAMEWORK = {
     ],
 }
 
+FAST_READ_SERIALIZATION = True
+
+INSTRUMENTATION = {
+    'SERVER_TIMING': os.environ.get('SERVER_TIMING', '0') == '1',
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'SLOW_SAMPLE_RATE': float(os.environ.get('SLOW_SAMPLE_RATE', 1.0)),
+    'MAX_SAMPLED_QUERIES': 50,
+}
+
+# /metrics требует Authorization: Bearer <METRICS_TOKEN>, без токена закрыт
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# потоки для обращений к БД асинхронных представлений (api.aio)
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 8))
+
+# ограничение частоты запросов (api.throttling), ведра — в памяти процесса
+THROTTLES = {
+    'ENABLED': os.environ.get('THROTTLES_ENABLED', '1') == '1',
+    # nginx передает адрес клиента в X-Real-IP
+    'IP_HEADER': os.environ.get('THROTTLE_IP_HEADER', 'HTTP_X_REAL_IP'),
+    'MAX_KEYS': 100000,
+    'RULES': {
+        'auth': {
+            'VIEWS': (
+                'confirmation_code', 'token_obtain_pair', 'token_refresh',
+            ),
+            'KEY': 'ip',
+            'RATE': os.environ.get('THROTTLE_AUTH_RATE', '10/min'),
+            'BURST': 5,
+        },
+        'bulk': {
+            'ACTIONS': ('bulk',),
+            'KEY': 'user',
+            'RATE': '10/min',
+            'BURST': 2,
+        },
+    },
+}
+
+# общий лимит запросов на запись включается явно, например 120/min
+if os.environ.get('THROTTLE_WRITE_RATE'):
+    THROTTLES['RULES']['writes'] = {
+        'METHODS': ('POST', 'PUT', 'PATCH', 'DELETE'),
+        'KEY': 'user_or_ip',
+        'RATE': os.environ['THROTTLE_WRITE_RATE'],
+        'BURST': 30,
+    }
+
+# журнал изменений /api/v1/changes/ (api.changes)
+CHANGE_FEED = {
+    'BATCH_SIZE': 500,
+    'MAX_BATCH_SIZE': 5000,
+    'GAP_TIMEOUT_SECONDS': int(
+        os.environ.get('CHANGE_FEED_GAP_TIMEOUT_SECONDS', 300)
+    ),
+}
+
+USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+    'ALIAS': None,
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=100),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=100),
@@ -171,3 +314,8 @@ SIMPLE_JWT = {
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 EMAIL_YAMDB = 'yamdb@ya.ru'
+
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_POLL_INTERVAL = 1
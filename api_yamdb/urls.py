@@ -16,6 +16,8 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
 
+from api.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path(
@@ -24,4 +26,5 @@ urlpatterns = [
         name='redoc',
     ),
     path('api/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,192 @@
+"""
+Нагрузочный тест чтения: WSGI с синхронными воркерами (каждый запрос
+в работе занимает воркер-процесс, здесь моделируется пулом из --workers
+потоков) против ReadApplication под ASGI (каждый запрос — корутина,
+обращения к БД в пуле из ASYNC_DB_THREADS потоков).
+Задержка БД имитируется паузой перед каждым SQL-запросом, кэш ответов
+отключен. Для каждого числа одновременных клиентов выводятся
+пропускная способность, задержки с учетом ожидания в очереди
+и память Python (tracemalloc) на один запрос в работе; у WSGI в работе
+не больше --workers запросов, и каждый еще стоит RSS воркер-процесса.
+
+    python -m benchmarks.asgi_load --concurrency 8 64 256 --db-latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup, summary
+
+PATHS = [
+    '/api/v1/titles/',
+    '/api/v1/titles/{title}/',
+    '/api/v1/titles/{title}/reviews/',
+    '/api/v1/categories/',
+    '/api/v1/genres/',
+]
+
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def add_db_latency(seconds):
+    """
+    Пауза перед каждым SQL-запросом, как при сетевой БД
+    """
+    from django.db.backends import utils
+
+    execute = utils.CursorWrapper.execute
+
+    def slow_execute(self, *args, **kwargs):
+        time.sleep(seconds)
+        return execute(self, *args, **kwargs)
+
+    utils.CursorWrapper.execute = slow_execute
+
+
+def run_wsgi(paths, concurrency, requests, workers):
+    from django.test import Client
+
+    def get(path, queued):
+        response = Client().get(path)
+        assert response.status_code == 200, path
+        return time.perf_counter() - queued
+
+    jobs = [paths[i % len(paths)] for i in range(concurrency * requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(get, path, time.perf_counter())
+                   for path in jobs]
+        samples = [future.result() for future in futures]
+    return time.perf_counter() - started, samples
+
+
+def run_asgi(paths, concurrency, requests):
+    from django.core.asgi import get_asgi_application
+
+    from api.aio import ReadApplication
+
+    application = ReadApplication(get_asgi_application())
+
+    async def get(path):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'root_path': '', 'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        await application(scope, receive, send)
+        assert messages[0]['status'] == 200, path
+
+    async def client(number, samples):
+        for i in range(requests):
+            path = paths[(number + i * concurrency) % len(paths)]
+            started = time.perf_counter()
+            await get(path)
+            samples.append(time.perf_counter() - started)
+
+    async def main():
+        samples = []
+        await asyncio.gather(*(
+            client(number, samples) for number in range(concurrency)
+        ))
+        return samples
+
+    started = time.perf_counter()
+    samples = asyncio.run(main())
+    return time.perf_counter() - started, samples
+
+
+def measure(mode, run, concurrency, in_flight):
+    """
+    Прогон для замера времени и отдельный прогон под tracemalloc
+    (он сильно замедляет выполнение)
+    """
+    elapsed, samples = run()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'in_flight': in_flight,
+        'requests': len(samples),
+        'rps': len(samples) / elapsed,
+        'latency': summary(samples),
+        'python_kb_per_in_flight': peak / 1024 / in_flight,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[8, 64, 256])
+    parser.add_argument('--requests', type=int, default=10,
+                        help='Requests per client')
+    parser.add_argument('--workers', type=int, default=3,
+                        help='WSGI sync workers')
+    parser.add_argument('--db-latency-ms', type=float, default=5)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault(
+        'RESPONSE_CACHE_BACKEND',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
+    setup()
+    warnings.simplefilter('ignore')
+    from django.conf import settings
+
+    from benchmarks.serialization import create_data
+
+    title, _ = create_data(20)
+    paths = [path.format(title=title.pk) for path in PATHS]
+    add_db_latency(args.db_latency_ms / 1000)
+    worker_rss = rss_mb()
+
+    results = []
+    for concurrency in args.concurrency:
+        result = measure(
+            'wsgi', lambda: run_wsgi(
+                paths, concurrency, args.requests, args.workers,
+            ),
+            concurrency, min(concurrency, args.workers),
+        )
+        result['workers'] = args.workers
+        result['worker_rss_mb'] = worker_rss
+        results.append(result)
+        result = measure(
+            'asgi', lambda: run_asgi(paths, concurrency, args.requests),
+            concurrency, concurrency,
+        )
+        result['db_threads'] = settings.ASYNC_DB_THREADS
+        results.append(result)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
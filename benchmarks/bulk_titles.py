@@ -0,0 +1,92 @@
+"""
+Загрузка тайтлов по одному (POST /titles/) против массовой загрузки
+(POST /titles/bulk/ пачками по --batch): тайтлов в секунду и запросов
+к БД на тайтл.
+
+    python -m benchmarks.bulk_titles --titles 1000 --batch 500
+"""
+import argparse
+import json
+import warnings
+
+from benchmarks.common import setup, timed
+
+
+def items(start, count, genres):
+    return [
+        {
+            'name': f'Тайтл {number}',
+            'year': 2000,
+            'description': 'Описание',
+            'genre': genres[number % 3:number % 3 + 3],
+            'category': 'movie',
+        }
+        for number in range(start, start + count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    setup()
+    warnings.simplefilter('ignore')
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    from api.models import Category, Genre, User
+
+    Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}').slug
+        for i in range(6)
+    ]
+    client = APIClient()
+    client.force_authenticate(User.objects.create(
+        username='admin', email='admin@yamdb.fake', is_staff=True,
+    ))
+
+    def sequential():
+        for item in items(0, args.titles, genres):
+            response = client.post('/api/v1/titles/', item, format='json')
+            assert response.status_code == 201, response.content
+
+    def bulk():
+        for start in range(0, args.titles, args.batch):
+            response = client.post(
+                '/api/v1/titles/bulk/',
+                items(args.titles + start,
+                      min(args.batch, args.titles - start), genres),
+                format='json',
+            )
+            assert response.status_code == 201, response.content
+
+    results = {}
+    for name, run in (('sequential', sequential), ('bulk', bulk)):
+        # журнал запросов ограничен 9000 записями
+        reset_queries()
+        with CaptureQueriesContext(connection) as context:
+            elapsed, _ = timed(run)
+        results[name] = {
+            'titles': args.titles,
+            'seconds': elapsed,
+            'titles_per_second': args.titles / elapsed,
+            'queries_per_title': len(context.captured_queries) / args.titles,
+        }
+    results['speedup'] = (
+        results['bulk']['titles_per_second']
+        / results['sequential']['titles_per_second']
+    )
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
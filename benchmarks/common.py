@@ -0,0 +1,53 @@
+"""
+Общие функции бенчмарков: Django на тестовых настройках
+с отдельной тестовой БД и подсчет перцентилей задержки.
+"""
+import os
+import statistics
+import time
+
+
+def setup(settings_module='tests.settings_qa', database=None):
+    """
+    Настраивает Django и создает тестовую БД (для SQLite в памяти);
+    database дополняет настройки DATABASES['default']
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    if database:
+        from django.conf import settings
+        settings.DATABASES['default'].update(database)
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def percentile(samples, share):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(samples):
+    """
+    Сводка по задержкам в секундах, результат в миллисекундах
+    """
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p90_ms': percentile(samples, 0.90) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'max_ms': max(samples) * 1000,
+    }
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
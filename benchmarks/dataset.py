@@ -0,0 +1,205 @@
+"""
+Генератор синтетических данных для набора бенчмарков (benchmarks.suite).
+Данные детерминированы (--seed) и вставляются пачками с явными
+первичными ключами; рейтинги и поисковый индекс строятся командами
+rebuild_ratings и rebuild_search_index. Схема создается через
+migrate --run-syncdb, существующие данные удаляются.
+
+Пользователи userN пишут ревью и комментарии датасета, writerN
+ничего не писали — под ними набор бенчмарков создает новые ревью.
+
+    python -m benchmarks.dataset --scale small
+    python -m benchmarks.dataset --scale large --reviews 3000000
+"""
+import argparse
+import io
+import json
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from benchmarks.common import timed
+
+SCALES = {
+    'tiny': {
+        'categories': 3, 'genres': 10, 'titles': 100, 'users': 200,
+        'writers': 100, 'reviews': 2000, 'comments': 4000,
+    },
+    'small': {
+        'categories': 5, 'genres': 20, 'titles': 1000, 'users': 2000,
+        'writers': 1000, 'reviews': 50000, 'comments': 100000,
+    },
+    'medium': {
+        'categories': 10, 'genres': 50, 'titles': 10000, 'users': 20000,
+        'writers': 2000, 'reviews': 500000, 'comments': 1000000,
+    },
+    'large': {
+        'categories': 10, 'genres': 100, 'titles': 50000, 'users': 100000,
+        'writers': 5000, 'reviews': 2000000, 'comments': 5000000,
+    },
+}
+
+WORDS = (
+    'звезда', 'ночь', 'город', 'река', 'война', 'мир', 'тень', 'песня',
+    'дорога', 'море', 'огонь', 'сон', 'ветер', 'дом', 'время', 'небо',
+    'star', 'night', 'city', 'river', 'shadow', 'song', 'road', 'fire',
+)
+CATEGORIES = ('Фильм', 'Книга', 'Музыка', 'Сериал', 'Игра', 'Комикс')
+
+BATCH_SIZE = 5000
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def insert(model, count, build):
+    """
+    Вставляет count строк пачками, build(номер) возвращает объект
+    """
+    for start in range(0, count, BATCH_SIZE):
+        model.objects.bulk_create(
+            [build(number)
+             for number in range(start, min(start + BATCH_SIZE, count))],
+        )
+
+
+def review_author(number, counts):
+    """
+    Автор ревью number: у одного тайтла авторы не повторяются
+    """
+    title_index = number % counts['titles']
+    return (number // counts['titles'] + title_index * 7) % counts['users']
+
+
+@contextmanager
+def publication_dates(*models):
+    """
+    Разрешает задать pub_date при вставке вместо текущего времени
+    """
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def generate(counts, seed=0):
+    from django.core.management import call_command
+    from django.core.management.color import no_style
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from api.models import Category, Comment, Genre, Review, Title, User
+
+    if counts['reviews'] > counts['titles'] * counts['users']:
+        raise ValueError(
+            'Not enough users for unique reviews: '
+            'reviews must not exceed titles * users'
+        )
+    rng = random.Random(seed)
+    now = timezone.now()
+    timings = {}
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    call_command('flush', interactive=False, verbosity=0)
+
+    with transaction.atomic(), publication_dates(Review, Comment):
+        timings['taxonomy'], _ = timed(lambda: (
+            insert(Category, counts['categories'], lambda n: Category(
+                id=n + 1,
+                name=f'{CATEGORIES[n % len(CATEGORIES)]} {n + 1}',
+                slug=f'category-{n + 1}',
+            )),
+            insert(Genre, counts['genres'], lambda n: Genre(
+                id=n + 1, name=f'{text(rng, 1)} {n + 1}',
+                slug=f'genre-{n + 1}',
+            )),
+        ))
+        timings['users'], _ = timed(lambda: (
+            insert(User, counts['users'], lambda n: User(
+                id=n + 1, username=f'user{n}',
+                email=f'user{n}@yamdb.fake',
+            )),
+            insert(User, counts['writers'], lambda n: User(
+                id=counts['users'] + n + 1, username=f'writer{n}',
+                email=f'writer{n}@yamdb.fake',
+            )),
+        ))
+        through = Title.genre.through
+        timings['titles'], _ = timed(lambda: (
+            insert(Title, counts['titles'], lambda n: Title(
+                id=n + 1, name=f'{text(rng, 2)} {n + 1}',
+                year=rng.randint(1950, 2020),
+                category_id=rng.randint(1, counts['categories']),
+                description=text(rng, 20),
+            )),
+            insert(through, counts['titles'] * 2, lambda n: through(
+                id=n + 1, title_id=n // 2 + 1,
+                genre_id=(n // 2 + n % 2 * (counts['genres'] // 2))
+                % counts['genres'] + 1,
+            )),
+        ))
+        timings['reviews'], _ = timed(lambda: insert(
+            Review, counts['reviews'], lambda n: Review(
+                id=n + 1, title_id=n % counts['titles'] + 1,
+                author_id=review_author(n, counts) + 1,
+                score=rng.randint(1, 10), text=text(rng, 30),
+                pub_date=now - timedelta(minutes=counts['reviews'] - n),
+            ),
+        ))
+        timings['comments'], _ = timed(lambda: insert(
+            Comment, counts['comments'], lambda n: Comment(
+                id=n + 1, review_id=rng.randint(1, counts['reviews']),
+                author_id=rng.randint(1, counts['users']),
+                text=text(rng, 12),
+                pub_date=now - timedelta(seconds=counts['comments'] - n),
+            ),
+        ))
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Category, Genre, User, Title, through,
+                                 Review, Comment]):
+                cursor.execute(sql)
+
+    timings['ratings'], _ = timed(
+        call_command, 'rebuild_ratings', stdout=io.StringIO(),
+    )
+    timings['search_index'], _ = timed(
+        call_command, 'rebuild_search_index', stdout=io.StringIO(),
+    )
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    for name in SCALES['tiny']:
+        parser.add_argument(f'--{name}', type=int,
+                            help='Override the scale preset')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--settings', default='benchmarks.settings')
+    args = parser.parse_args()
+
+    counts = {
+        name: getattr(args, name) or value
+        for name, value in SCALES[args.scale].items()
+    }
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', args.settings)
+    import django
+    django.setup()
+
+    elapsed, timings = timed(generate, counts, args.seed)
+    print(json.dumps({
+        'counts': counts,
+        'seed': args.seed,
+        'seconds': elapsed,
+        'stages': timings,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Запросы в секунду к дешевому эндпоинту (categories/) при новом
+соединении с БД на каждый запрос, постоянных соединениях (CONN_MAX_AGE)
+и пуле соединений (api.db). Между запросами вызывается
+close_old_connections, как в обработчике запросов Django.
+
+По умолчанию используется SQLite в файле с пулом (api.db.sqlite3_pool),
+открытие соединения с сетевой БД имитируется --connect-latency-ms;
+для PostgreSQL: --settings api_yamdb.settings (переменные DB_*).
+
+    python -m benchmarks.db_pool --connect-latency-ms 3 --threads 1 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup, summary
+
+MODES = {
+    'per_request': {'CONN_MAX_AGE': 0, 'POOL': {'MAX_SIZE': 0}},
+    'persistent': {'CONN_MAX_AGE': 600, 'POOL': {'MAX_SIZE': 0}},
+    'pooled': {'CONN_MAX_AGE': 0, 'POOL': {}},
+}
+
+
+def count_connections(connection, latency):
+    """
+    Считает открытые соединения и добавляет задержку их открытия
+    """
+    backend = next(
+        cls for cls in type(connection).__mro__
+        if cls.__module__.startswith('django.db.backends.')
+    )
+    connect = backend.get_new_connection
+    opened = []
+
+    def get_new_connection(self, conn_params):
+        opened.append(1)
+        time.sleep(latency)
+        return connect(self, conn_params)
+
+    backend.get_new_connection = get_new_connection
+    return opened
+
+
+def run(path, threads, requests):
+    from django.db import close_old_connections
+    from django.test import Client
+
+    def client(_):
+        samples = []
+        browser = Client()
+        for _ in range(requests):
+            started = time.perf_counter()
+            close_old_connections()
+            response = browser.get(path)
+            close_old_connections()
+            assert response.status_code == 200
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = sum(pool.map(client, range(threads)), [])
+    return time.perf_counter() - started, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--settings', default='tests.settings_qa')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='Requests per thread')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--connect-latency-ms', type=float, default=0)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault(
+        'RESPONSE_CACHE_BACKEND',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
+    database = None
+    if args.settings == 'tests.settings_qa':
+        directory = tempfile.mkdtemp()
+        database = {
+            'ENGINE': 'api.db.sqlite3_pool',
+            'TEST': {'NAME': os.path.join(directory, 'pool.sqlite3')},
+        }
+    setup(args.settings, database)
+    warnings.simplefilter('ignore')
+    from django.db import close_old_connections, connections
+
+    from api.db import pool
+    from api.models import Category
+
+    connection = connections['default']
+    for i in range(10):
+        Category.objects.create(name=f'Категория {i}', slug=f'category-{i}')
+    close_old_connections()
+    connection.close()
+    opened = count_connections(connection, args.connect_latency_ms / 1000)
+
+    results = []
+    for threads in args.threads:
+        for mode, options in MODES.items():
+            connection.settings_dict.update(options)
+            opened.clear()
+            elapsed, samples = run('/api/v1/categories/', threads,
+                                   args.requests)
+            results.append({
+                'mode': mode,
+                'threads': threads,
+                'requests': len(samples),
+                'rps': len(samples) / elapsed,
+                'latency': summary(samples),
+                'connections_opened': len(opened),
+                'pool': pool.get_stats().get('default'),
+            })
+    connection.creation.destroy_test_db(
+        connection.settings_dict['NAME'], verbosity=0,
+    )
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Задержка POST /api/v1/auth/email/ при разной задержке почтового сервера:
+с очередью EmailOutbox (по умолчанию) и с отправкой письма прямо
+в запросе (inline), а также пропускная способность send_outbox.
+
+    python -m benchmarks.email_outbox --requests 200 --latency-ms 0 50 200
+"""
+import argparse
+import json
+import time
+from unittest import mock
+
+from benchmarks.common import setup, summary, timed
+
+LATENCY = {'seconds': 0}
+
+
+class SlowBackend:
+    """
+    Почтовый бэкенд с задержкой на соединение и на каждое письмо
+    """
+    def __init__(self, *args, **kwargs):
+        self.opened = False
+
+    def open(self):
+        if not self.opened:
+            time.sleep(LATENCY['seconds'])
+            self.opened = True
+        return True
+
+    def close(self):
+        self.opened = False
+
+    def send_messages(self, messages):
+        self.open()
+        time.sleep(LATENCY['seconds'] * len(messages))
+        return len(messages)
+
+
+def send_inline(to, subject, body):
+    from django.conf import settings
+    from django.core.mail import send_mail
+
+    send_mail(subject, body, settings.EMAIL_YAMDB, [to])
+
+
+def measure_requests(client, email, count, inline):
+    samples = []
+    patch = mock.patch('api.views.send_mail_to_email', send_inline)
+    if inline:
+        patch.start()
+    try:
+        for _ in range(count):
+            elapsed, response = timed(
+                client.post, '/api/v1/auth/email/', {'email': email},
+            )
+            assert response.status_code == 200, response.content
+            samples.append(elapsed)
+    finally:
+        if inline:
+            patch.stop()
+    return summary(samples)
+
+
+def measure_worker(batch_size):
+    from django.core.mail import get_connection
+
+    from api import mail
+    from api.models import EmailOutbox
+
+    pending = EmailOutbox.objects.filter(sent_at=None).count()
+    connection = get_connection()
+    started = time.perf_counter()
+    while mail.deliver_batch(connection, batch_size):
+        pass
+    elapsed = time.perf_counter() - started
+    return {
+        'emails': pending,
+        'seconds': elapsed,
+        'emails_per_second': pending / elapsed if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument(
+        '--latency-ms', type=float, nargs='+', default=[0, 50, 200],
+    )
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.test import Client
+
+    from api.models import EmailOutbox, User
+
+    settings.EMAIL_BACKEND = f'{__name__}.SlowBackend'
+    user = User.objects.create(username='bench', email='bench@yamdb.fake')
+    client = Client()
+    measure_requests(client, user.email, 10, inline=False)
+    results = []
+    for latency in args.latency_ms:
+        LATENCY['seconds'] = latency / 1000
+        EmailOutbox.objects.all().delete()
+        results.append({
+            'mail_latency_ms': latency,
+            'outbox': measure_requests(
+                client, user.email, args.requests, inline=False,
+            ),
+            'worker': measure_worker(args.batch_size),
+            'inline': measure_requests(
+                client, user.email, args.requests, inline=True,
+            ),
+        })
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
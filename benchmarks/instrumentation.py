@@ -0,0 +1,166 @@
+"""
+Накладные расходы инструментирования запросов (api.instrumentation).
+
+Бюджет: не больше BUDGET_REQUEST_US микросекунд на запрос (гистограммы,
+Server-Timing) плюс BUDGET_QUERY_US на каждый запрос к БД, и не больше
+BUDGET_SHARE медианы времени самого дешевого эндпоинта.
+Замеряются отдельно постоянная часть и обертка запросов к БД,
+затем эндпоинты целиком с TimingMiddleware и без (поочередно, чтобы
+уравнять дрейф). Код возврата 1, если бюджет превышен.
+
+    python -m benchmarks.instrumentation --requests 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+from benchmarks.common import setup, summary
+
+BUDGET_REQUEST_US = 30
+BUDGET_QUERY_US = 2
+BUDGET_SHARE = 0.05
+
+PATHS = ['/api/v1/categories/', '/api/v1/titles/']
+
+
+def per_call_us(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def fixed_cost(repeat):
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from api import instrumentation
+
+    request = RequestFactory().get('/api/v1/categories/')
+    response = HttpResponse()
+
+    def request_cycle():
+        timing, token = instrumentation.start()
+        timing.endpoint, timing.action = 'category-list', 'list'
+        instrumentation.finish(timing, token, request, response)
+
+    return per_call_us(request_cycle, repeat)
+
+
+def query_cost(repeat):
+    from api import instrumentation
+
+    def execute(sql, params, many, context):
+        return None
+
+    def wrapped():
+        instrumentation.record_query(execute, 'SELECT 1', (), False, {})
+
+    def plain():
+        execute('SELECT 1', (), False, {})
+
+    timing, token = instrumentation.start()
+    timing.max_queries = 0
+    try:
+        return per_call_us(wrapped, repeat) - per_call_us(plain, repeat)
+    finally:
+        instrumentation.current.reset(token)
+
+
+def endpoints(requests):
+    from django.conf import settings
+    from django.test import Client, override_settings
+
+    without = [
+        middleware for middleware in settings.MIDDLEWARE
+        if middleware != 'api.instrumentation.TimingMiddleware'
+    ]
+    clients = {'on': Client()}
+    with override_settings(MIDDLEWARE=without):
+        clients['off'] = Client()
+        clients['off'].get(PATHS[0])
+    clients['on'].get(PATHS[0])
+
+    results = []
+    for path in PATHS:
+        samples = {'on': [], 'off': []}
+        queries = int(
+            clients['on'].get(path)['Server-Timing']
+            .split('desc="')[1].split()[0]
+        )
+        for _ in range(requests):
+            for mode in ('off', 'on'):
+                if mode == 'off':
+                    context = override_settings(MIDDLEWARE=without)
+                    context.enable()
+                started = time.perf_counter()
+                clients[mode].get(path)
+                samples[mode].append(time.perf_counter() - started)
+                if mode == 'off':
+                    context.disable()
+        on, off = summary(samples['on']), summary(samples['off'])
+        results.append({
+            'path': path,
+            'db_queries': queries,
+            'off': off,
+            'on': on,
+            'overhead_us': (on['p50_ms'] - off['p50_ms']) * 1000,
+            'overhead_share': on['p50_ms'] / off['p50_ms'] - 1,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=100000)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault(
+        'RESPONSE_CACHE_BACKEND',
+        'django.core.cache.backends.dummy.DummyCache',
+    )
+    # число запросов к БД берется из заголовка Server-Timing
+    os.environ.setdefault('SERVER_TIMING', '1')
+    setup()
+    warnings.simplefilter('ignore')
+    from benchmarks.serialization import create_data
+
+    create_data(5)
+
+    request_us = fixed_cost(args.repeat)
+    query_us = query_cost(args.repeat)
+    results = endpoints(args.requests)
+    cheapest = min(results, key=lambda result: result['off']['p50_ms'])
+    budget_us = min(
+        BUDGET_REQUEST_US + BUDGET_QUERY_US * cheapest['db_queries'],
+        BUDGET_SHARE * cheapest['off']['p50_ms'] * 1000,
+    )
+    measured_us = request_us + query_us * cheapest['db_queries']
+    report = {
+        'request_us': request_us,
+        'query_us': query_us,
+        'endpoints': results,
+        'budget_us': budget_us,
+        'measured_us': measured_us,
+        'within_budget': (
+            request_us <= BUDGET_REQUEST_US
+            and query_us <= BUDGET_QUERY_US
+            and measured_us <= budget_us
+        ),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text)
+    print(text)
+    if not report['within_budget']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Сериализаторы DRF против RowSerializer на списках тайтлов, ревью
+и комментариев из 5, 100 и 1000 строк: время построения данных
+и рендеринга JSON, вывод обоих путей сравнивается побайтно.
+
+    python -m benchmarks.serialization --repeat 20
+"""
+import argparse
+import json
+
+from benchmarks.common import setup, summary, timed
+
+
+def create_data(rows):
+    from api.models import Category, Comment, Genre, Review, Title, User
+
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(rows)
+    )
+    users = list(User.objects.all())
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000, category=category,
+              description='Описание ' * 10)
+        for i in range(rows)
+    )
+    titles = list(Title.objects.all())
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title=title, genre=genre)
+        for title in titles for genre in genres
+    )
+    Review.objects.bulk_create(
+        Review(title=titles[0], author=user, text='Текст ревью ' * 20,
+               score=i % 10 + 1)
+        for i, user in enumerate(users)
+    )
+    review = Review.objects.first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=user, text='Комментарий ' * 10)
+        for user in users
+    )
+    return titles[0], review
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[5, 100, 1000])
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    setup()
+    from django.db.models import Prefetch
+
+    from api.models import Genre, Title
+    from api.renderers import FastJSONRenderer
+    from api.row_serializers import get_row_serializer
+    from api.serializers import (CommentSerializer, ReviewSerializer,
+                                 TitleSerializer_get)
+    from rest_framework.renderers import JSONRenderer
+
+    title, review = create_data(max(args.sizes))
+    endpoints = {
+        'titles': (
+            TitleSerializer_get,
+            Title.objects.select_related('category').prefetch_related(
+                Prefetch('genre', queryset=Genre.objects.order_by('pk')),
+            ).order_by('pk'),
+        ),
+        'reviews': (
+            ReviewSerializer,
+            title.reviews.select_related('author').order_by('pk'),
+        ),
+        'comments': (
+            CommentSerializer,
+            review.comments.select_related('author').order_by('pk'),
+        ),
+    }
+
+    def drf(serializer_class, queryset):
+        data = serializer_class(queryset, many=True).data
+        return JSONRenderer().render(data)
+
+    def fast(serializer_class, queryset):
+        row_serializer = get_row_serializer(serializer_class)
+        data = row_serializer.to_representation(
+            row_serializer.values(queryset),
+        )
+        return FastJSONRenderer().render(data)
+
+    results = []
+    for name, (serializer_class, queryset) in endpoints.items():
+        for size in args.sizes:
+            page = queryset.all()[:size]
+            result = {'endpoint': name, 'rows': size}
+            outputs = {}
+            for path, function in (('drf', drf), ('fast', fast)):
+                samples = []
+                for _ in range(args.repeat):
+                    elapsed, outputs[path] = timed(
+                        function, serializer_class, page.all(),
+                    )
+                    samples.append(elapsed)
+                result[path] = summary(samples)
+            result['identical'] = outputs['drf'] == outputs['fast']
+            result['speedup'] = (
+                result['drf']['p50_ms'] / result['fast']['p50_ms']
+            )
+            results.append(result)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""
+Настройки набора бенчмарков: тестовые настройки с постоянной базой
+SQLite в файле BENCHMARK_DB, общей для генератора данных, прогона
+в процессе и воркеров gunicorn. Для PostgreSQL используйте
+api_yamdb.settings (--settings).
+"""
+from tests.settings_qa import *  # noqa: F401,F403
+from tests.settings_qa import DATABASES, REPLICAS, os
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'NAME': os.environ.get(
+            'BENCHMARK_DB', '/tmp/yamdb-benchmark.sqlite3',
+        ),
+        # писатели из нескольких потоков и воркеров ждут блокировку
+        'OPTIONS': {'timeout': 30},
+    },
+}
+
+REPLICAS = {**REPLICAS, 'ALIASES': []}
@@ -0,0 +1,532 @@
+"""
+Набор нагрузочных бенчмарков YaMDb на данных benchmarks.dataset.
+Воспроизводимая (--seed) смесь запросов: списки и фильтры тайтлов,
+страницы ревью и комментариев (в том числе глубокие и по курсору),
+выдача кода подтверждения и токенов, создание ревью и комментариев.
+Запросы выполняются в процессе (django.test.Client) или по HTTP через
+gunicorn, запущенный на те же настройки и базу (--mode gunicorn), или
+на уже работающем сервере (--url). По каждой операции и в целом
+выводятся пропускная способность, перцентили задержки и число
+запросов к БД на запрос (из заголовка Server-Timing).
+Кэш ответов по умолчанию отключен, чтобы число запросов к БД
+не зависело от попаданий в кэш (--response-cache включает его).
+
+--compare сравнивает прогон с сохраненным JSON: регрессия — рост p50
+или p90 операции больше --threshold, рост числа запросов к БД
+на запрос или падение общей пропускной способности; код возврата 1.
+
+    python -m benchmarks.dataset --scale small
+    python -m benchmarks.suite --requests 2000 --output base.json
+    python -m benchmarks.suite --mode gunicorn --workers 4 \\
+        --concurrency 16 --compare base.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from collections import Counter, namedtuple
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmarks.common import summary
+from benchmarks.dataset import WORDS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# операция: относительный вес в смеси
+MIX = {
+    'titles': 15,
+    'titles_filtered': 15,
+    'title': 10,
+    'categories': 3,
+    'genres': 2,
+    'reviews': 15,
+    'reviews_deep': 5,
+    'reviews_cursor': 5,
+    'comments': 10,
+    'confirmation_code': 2,
+    'token': 3,
+    'review_create': 5,
+    'comment_create': 10,
+}
+
+# условия прогона, которые должны совпадать у сравниваемых прогонов
+COMPARABLE = (
+    'mode', 'workers', 'threads', 'concurrency', 'mix', 'settings',
+    'database', 'response_cache',
+)
+
+Job = namedtuple('Job', 'operation method path body token expected')
+
+
+class Workload:
+    """
+    Образцы идентификаторов из базы и генератор запросов смеси
+    """
+    sample_size = 1000
+
+    def __init__(self, seed):
+        from django.db.models import Max
+        from rest_framework.settings import api_settings
+        from rest_framework_simplejwt.backends import TokenBackend
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from api.models import Category, Genre, Review, Title, User
+        from api_yamdb.settings import SIMPLE_JWT
+
+        self.rng = random.Random(seed)
+        self.title_ids = list(Title.objects.values_list('pk', flat=True))
+        if not self.title_ids:
+            raise SystemExit(
+                'The database is empty, run benchmarks.dataset first'
+            )
+        self.categories = list(Category.objects.values_list('slug', flat=True))
+        self.genres = list(Genre.objects.values_list('slug', flat=True))
+        # только ревью датасета, чтобы ревью прошлых прогонов
+        # не меняли последовательность запросов
+        last_review = Review.objects.filter(
+            author__username__startswith='user',
+        ).aggregate(last=Max('pk'))['last'] or 0
+        self.reviews = list(Review.objects.filter(pk__in={
+            self.rng.randint(1, last_review)
+            for _ in range(self.sample_size)
+        }).values_list('title_id', 'pk', 'title__rating_count'))
+        self.page_size = api_settings.PAGE_SIZE
+
+        backend = TokenBackend(
+            SIMPLE_JWT['ALGORITHM'], signing_key=SIMPLE_JWT['SIGNING_KEY'],
+        )
+        readers = User.objects.filter(username__startswith='user')
+        last_user = readers.aggregate(last=Max('pk'))['last'] or 0
+        self.readers = [
+            (user.email, backend.encode(user.get_payload()))
+            for user in readers.filter(pk__in={
+                self.rng.randint(1, last_user)
+                for _ in range(self.sample_size)
+            })
+        ]
+        writers = list(
+            User.objects.filter(username__startswith='writer').order_by('pk')
+        )
+        if not writers:
+            raise SystemExit('No writerN users, run benchmarks.dataset')
+        self.writers = [str(AccessToken.for_user(user)) for user in writers]
+        reviewed = set(Review.objects.filter(
+            author__in=writers,
+        ).values_list('author_id', 'title_id'))
+        # свободные пары (писатель, тайтл) для новых ревью
+        self.review_slots = (
+            (self.writers[number], title_id)
+            for number, writer in enumerate(writers)
+            for title_id in self.title_ids
+            if (writer.pk, title_id) not in reviewed
+        )
+
+    def text(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def job(self, operation):
+        rng = self.rng
+        title_id = rng.choice(self.title_ids)
+        review_title_id, review_id, review_count = rng.choice(self.reviews)
+        reviews = f'/api/v1/titles/{review_title_id}/reviews/'
+        comments = f'{reviews}{review_id}/comments/'
+        if operation == 'titles':
+            return Job(operation, 'GET', '/api/v1/titles/', None, None, 200)
+        if operation == 'titles_filtered':
+            filters = [
+                f'genre={rng.choice(self.genres)}',
+                f'category={rng.choice(self.categories)}',
+                f'year={rng.randint(1950, 2020)}',
+                f'name={rng.choice(WORDS[16:])}',
+            ]
+            query = '&'.join(rng.sample(filters, rng.randint(1, 2)))
+            return Job(operation, 'GET', f'/api/v1/titles/?{query}',
+                       None, None, 200)
+        if operation == 'title':
+            return Job(operation, 'GET', f'/api/v1/titles/{title_id}/',
+                       None, None, 200)
+        if operation in ('categories', 'genres'):
+            return Job(operation, 'GET', f'/api/v1/{operation}/',
+                       None, None, 200)
+        if operation == 'reviews':
+            return Job(operation, 'GET', reviews, None, None, 200)
+        if operation == 'reviews_deep':
+            pages = max(1, -(-review_count // self.page_size))
+            page = rng.randint(-(-pages // 2), pages)
+            return Job(operation, 'GET', f'{reviews}?page={page}',
+                       None, None, 200)
+        if operation == 'reviews_cursor':
+            return Job(operation, 'GET', f'{reviews}?cursor=',
+                       None, None, 200)
+        if operation == 'comments':
+            return Job(operation, 'GET', comments, None, None, 200)
+        if operation == 'confirmation_code':
+            email, _ = rng.choice(self.readers)
+            return Job(operation, 'POST', '/api/v1/auth/email/',
+                       {'email': email}, None, 200)
+        if operation == 'token':
+            email, code = rng.choice(self.readers)
+            return Job(operation, 'POST', '/api/v1/auth/token/',
+                       {'email': email, 'confirmation_code': code},
+                       None, 200)
+        if operation == 'review_create':
+            token, slot_title_id = next(self.review_slots)
+            return Job(operation, 'POST',
+                       f'/api/v1/titles/{slot_title_id}/reviews/',
+                       {'text': self.text(30), 'score': rng.randint(1, 10)},
+                       token, 201)
+        if operation == 'comment_create':
+            return Job(operation, 'POST', comments,
+                       {'text': self.text(12)},
+                       rng.choice(self.writers), 201)
+        raise ValueError(f'Unknown operation {operation}')
+
+    def jobs(self, count, mix):
+        operations = list(mix)
+        weights = [mix[operation] for operation in operations]
+        return [
+            self.job(operation)
+            for operation in self.rng.choices(operations, weights, k=count)
+        ]
+
+
+class InProcessTransport:
+    """
+    Запросы через django.test.Client, по клиенту на поток
+    """
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, job):
+        from django.test import Client
+
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+        extra = {}
+        if job.token:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {job.token}'
+        response = self.local.client.generic(
+            job.method, job.path,
+            json.dumps(job.body) if job.body is not None else '',
+            content_type='application/json', **extra,
+        )
+        return response.status_code, response.get('Server-Timing')
+
+
+class HTTPTransport:
+    """
+    Запросы по HTTP/1.1 с keep-alive, по соединению на поток
+    """
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, job):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=60,
+            )
+        headers = {'Content-Type': 'application/json'}
+        if job.token:
+            headers['Authorization'] = f'Bearer {job.token}'
+        try:
+            connection.request(
+                job.method, self.prefix + job.path,
+                json.dumps(job.body) if job.body is not None else None,
+                headers,
+            )
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            raise
+        return response.status, response.getheader('Server-Timing')
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@contextmanager
+def gunicorn(settings_module, workers, threads):
+    """
+    gunicorn с api_yamdb.wsgi на свободном порту, пока открыт контекст
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn.app.wsgiapp', 'api_yamdb.wsgi',
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--threads', str(threads),
+            '--log-level', 'warning',
+        ],
+        cwd=BASE_DIR,
+        env={
+            'PYTHONWARNINGS': 'ignore',
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': settings_module,
+        },
+    )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if process.poll() is not None:
+                raise SystemExit('gunicorn exited on startup')
+            try:
+                with socket.create_connection(('127.0.0.1', port), 1):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise SystemExit('gunicorn did not start in 30 s')
+                time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def queries(server_timing):
+    if not server_timing or 'desc="' not in server_timing:
+        return None
+    return int(server_timing.split('desc="')[1].split()[0])
+
+
+def run(transport, jobs, concurrency):
+    """
+    Выполняет задания в concurrency потоках по порядку очереди,
+    возвращает время прогона и (статус, секунды, запросы к БД)
+    по каждому заданию
+    """
+    results = [None] * len(jobs)
+    positions = itertools.count()
+
+    def worker():
+        from django.db import connections
+
+        for position in positions:
+            if position >= len(jobs):
+                break
+            started = time.perf_counter()
+            try:
+                status, server_timing = transport.request(jobs[position])
+            except Exception:
+                status, server_timing = 0, None
+            results[position] = (
+                status, time.perf_counter() - started, queries(server_timing),
+            )
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, results
+
+
+def aggregate(items, elapsed):
+    counts = [count for _, _, _, count in items if count is not None]
+    return {
+        'requests': len(items),
+        'errors': sum(
+            status != expected for expected, status, _, _ in items
+        ),
+        'statuses': dict(Counter(str(status) for _, status, _, _ in items)),
+        'rps': len(items) / elapsed,
+        'latency': summary([seconds for _, _, seconds, _ in items]),
+        'queries_per_request': (
+            sum(counts) / len(counts) if counts else None
+        ),
+        'queries_max': max(counts) if counts else None,
+    }
+
+
+def build_report(jobs, results, elapsed):
+    items = [
+        (job.expected, *result) for job, result in zip(jobs, results)
+    ]
+    operations = {}
+    for job, item in zip(jobs, items):
+        operations.setdefault(job.operation, []).append(item)
+    return {
+        'total': aggregate(items, elapsed),
+        'operations': {
+            operation: aggregate(operation_items, elapsed)
+            for operation, operation_items in sorted(operations.items())
+        },
+    }
+
+
+def compare(report, baseline, threshold):
+    """
+    Регрессии прогона report относительно baseline
+    """
+    regressions = []
+    for operation, current in report['operations'].items():
+        previous = baseline['operations'].get(operation)
+        if previous is None:
+            continue
+        for key in ('p50_ms', 'p90_ms'):
+            before, after = previous['latency'][key], current['latency'][key]
+            if after > before * (1 + threshold):
+                regressions.append(
+                    f'{operation} {key}: {before:.2f} -> {after:.2f}'
+                )
+        before = previous['queries_per_request']
+        after = current['queries_per_request']
+        if before is not None and after is not None and after > before + .01:
+            regressions.append(
+                f'{operation} queries per request: '
+                f'{before:.2f} -> {after:.2f}'
+            )
+    before, after = baseline['total']['rps'], report['total']['rps']
+    if after < before * (1 - threshold):
+        regressions.append(f'total rps: {before:.1f} -> {after:.1f}')
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_counts():
+    from api.models import Category, Comment, Genre, Review, Title, User
+
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (Category, Genre, Title, User, Review, Comment)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--mode', choices=['inprocess', 'gunicorn'],
+                        default='inprocess')
+    parser.add_argument('--url', help='Benchmark a running server instead')
+    parser.add_argument('--settings', default='benchmarks.settings')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=3,
+                        help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='gunicorn threads per worker')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mix', nargs='+', metavar='OPERATION=WEIGHT',
+                        default=[], help='Override operation weights')
+    parser.add_argument('--response-cache', action='store_true')
+    parser.add_argument('--compare', help='Baseline JSON to compare with')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    mix = dict(MIX)
+    for item in args.mix:
+        operation, _, weight = item.partition('=')
+        if operation not in MIX:
+            parser.error(f'unknown operation {operation}')
+        mix[operation] = float(weight)
+    if not args.response_cache:
+        os.environ['RESPONSE_CACHE_BACKEND'] = (
+            'django.core.cache.backends.dummy.DummyCache'
+        )
+    # число запросов к БД берется из заголовка Server-Timing
+    os.environ.setdefault('SERVER_TIMING', '1')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', args.settings)
+    import django
+    django.setup()
+    warnings.simplefilter('ignore')
+    from django.conf import settings
+    from django.db import connection
+
+    workload = Workload(args.seed)
+    warmup = workload.jobs(args.warmup, mix)
+    jobs = workload.jobs(args.requests, mix)
+    connection.close()
+
+    if args.url:
+        server = nullcontext(args.url)
+    elif args.mode == 'gunicorn':
+        server = gunicorn(settings.SETTINGS_MODULE, args.workers,
+                          args.threads)
+    else:
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        server = nullcontext()
+    with server as url:
+        transport = HTTPTransport(url) if url else InProcessTransport()
+        run(transport, warmup, args.concurrency)
+        elapsed, results = run(transport, jobs, args.concurrency)
+
+    report = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'mode': 'url' if args.url else args.mode,
+            'url': args.url,
+            'workers': args.workers if args.mode == 'gunicorn' else None,
+            'threads': args.threads if args.mode == 'gunicorn' else None,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'mix': mix,
+            'settings': settings.SETTINGS_MODULE,
+            'database': connection.vendor,
+            'response_cache': args.response_cache,
+            'dataset': dataset_counts(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'elapsed_s': elapsed,
+        **build_report(jobs, results, elapsed),
+    }
+    if args.compare:
+        with open(args.compare) as baseline:
+            baseline = json.load(baseline)
+        report['regressions'] = compare(report, baseline, args.threshold)
+        # прогоны с разными условиями сравнивать бессмысленно
+        report['baseline_differs'] = [
+            key for key in COMPARABLE
+            if report['meta'][key] != baseline['meta'].get(key)
+        ]
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text)
+    print(text)
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,67 @@ import sys
 from os.path import abspath
 from os.path import dirname
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from django.core.cache import caches
+
+    from api.authentication import user_cache
+    from api.throttling import buckets
+
+    for cache in caches.all():
+        cache.clear()
+    user_cache.clear()
+    buckets.clear()
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create(
+        username='admin',
+        email='admin@yamdb.fake',
+        role='admin',
+        is_staff=True,
+    )
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create(
+        username='user',
+        email='user@yamdb.fake',
+    )
+
+
+@pytest.fixture
+def client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
+
+
+@pytest.fixture
+def admin_client(admin):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+
+@pytest.fixture
+def user_client(user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
@@ -4,5 +4,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # отдельная база, чтобы тесты видели, откуда читались данные;
+    # маршрутизация на нее включается в тестах реплик
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+    },
 }
+
+REPLICAS = {**REPLICAS, 'ALIASES': []}
+
+# тесты ограничений включают их сами
+THROTTLES = {**THROTTLES, 'ENABLED': False}
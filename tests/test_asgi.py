@@ -0,0 +1,188 @@
+import asyncio
+import json
+import re
+from unittest import mock
+from urllib.parse import urlencode
+
+import pytest
+from django.core.cache import caches
+from django.db import OperationalError, connections
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import aio
+from api.db import replicas
+from api.models import Category, Comment, Genre, Review, Title
+from api_yamdb.asgi import application
+
+
+def asgi_request(method, path, query='', headers=()):
+    """
+    Запрос к ASGI-приложению, возвращает статус, заголовки и тело
+    """
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'root_path': '',
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 1),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return messages[0]['status'], dict(messages[0]['headers']), body
+
+
+class PlainMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+
+@pytest.fixture
+def catalogue(user):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Побег из Шоушенка', year=1994,
+                                 category=category)
+    title.genre.set([genre])
+    review = Review.objects.create(title=title, author=user, text='Текст',
+                                   score=9)
+    Comment.objects.create(review=review, author=user, text='Ок')
+    return title, review
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReadApplication:
+
+    def test_same_as_sync(self, client, catalogue):
+        title, review = catalogue
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        urls = [
+            ('/api/v1/titles/', 'year=1994'),
+            (f'/api/v1/titles/{title.id}/', ''),
+            (reviews, ''),
+            (f'{reviews}{review.id}/', ''),
+            (f'{reviews}{review.id}/comments/', 'cursor='),
+            ('/api/v1/categories/', ''),
+            ('/api/v1/genres/', urlencode({'search': 'драма'})),
+        ]
+        for path, query in urls:
+            with mock.patch.object(
+                aio, 'database', wraps=aio.database,
+            ) as database:
+                status, headers, body = asgi_request('GET', path, query)
+            assert database.called, \
+                f'Проверьте, что GET {path} обслуживается асинхронно'
+            caches['responses'].clear()
+            sync = client.get(path, QUERY_STRING=query)
+            assert status == sync.status_code
+            assert json.loads(body) == sync.json(), \
+                f'Проверьте, что ответ GET {path} совпадает с синхронным'
+
+    def test_same_headers_as_sync(self, client, catalogue):
+        title, _ = catalogue
+        path = f'/api/v1/titles/{title.id}/'
+        status, headers, body = asgi_request('GET', path)
+        caches['responses'].clear()
+        sync = client.get(path)
+        headers = {
+            name.decode().lower(): value.decode()
+            for name, value in headers.items()
+        }
+        sync_headers = {name.lower(): value for name, value in sync.items()}
+        # значения зависят от времени: версия области кэша и замеры
+        for volatile in ('etag', 'server-timing'):
+            assert (volatile in headers) == (volatile in sync_headers)
+            headers.pop(volatile, None)
+            sync_headers.pop(volatile, None)
+        assert headers == sync_headers, \
+            'Проверьте, что middleware выставляют те же заголовки, ' \
+            'что и на синхронном пути'
+        assert headers['x-frame-options'] == 'DENY'
+
+    def test_middleware_short_circuit(self, client, settings):
+        settings.DISALLOWED_USER_AGENTS = [re.compile('bot')]
+        status, headers, body = asgi_request(
+            'GET', '/api/v1/titles/', headers=[(b'user-agent', b'bot')],
+        )
+        assert status == client.get(
+            '/api/v1/titles/', HTTP_USER_AGENT='bot',
+        ).status_code == 403, \
+            'Проверьте, что process_request middleware выполняется ' \
+            'на асинхронном пути'
+
+    def test_custom_middleware_goes_to_django(self, settings):
+        settings.MIDDLEWARE = [
+            *settings.MIDDLEWARE, 'tests.test_asgi.PlainMiddleware',
+        ]
+        assert aio.load_middleware() is None, \
+            'Проверьте, что middleware без хуков отключает асинхронный путь'
+
+    def test_not_found(self):
+        status, headers, body = asgi_request('GET', '/api/v1/titles/0/')
+        assert status == 404
+
+    def test_authentication(self, user, catalogue):
+        token = str(AccessToken.for_user(user))
+        status, headers, body = asgi_request(
+            'GET', '/api/v1/titles/',
+            headers=[(b'authorization', f'Bearer {token}'.encode())],
+        )
+        assert status == 200
+        status, headers, body = asgi_request(
+            'GET', '/api/v1/titles/',
+            headers=[(b'authorization', b'Bearer invalid')],
+        )
+        assert status == 401, \
+            'Проверьте, что неверный токен отклоняется на асинхронном пути'
+
+    def test_other_requests_go_to_django(self, catalogue):
+        with mock.patch.object(aio, 'database') as database:
+            status, headers, body = asgi_request('POST', '/api/v1/titles/')
+            asgi_request('GET', '/api/v1/users/')
+        assert status == 401
+        assert not database.called, \
+            'Проверьте, что запись и другие эндпоинты обслуживает Django'
+
+    @pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+    def test_reads_from_replica(self, settings):
+        settings.REPLICAS = {**settings.REPLICAS, 'ALIASES': ['replica']}
+        Title.objects.using('replica').create(name='С реплики', year=2000)
+        status, headers, body = asgi_request('GET', '/api/v1/titles/')
+        assert json.loads(body)['count'] == 1, \
+            'Проверьте, что асинхронный путь читает с реплики'
+
+    @pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+    def test_retry_on_primary(self, settings):
+        settings.REPLICAS = {**settings.REPLICAS, 'ALIASES': ['replica']}
+        replicas._down_until.clear()
+        Title.objects.create(name='С primary', year=2000)
+        create_cursor = type(connections['replica']).create_cursor
+
+        def failing_replica(connection, name=None):
+            if connection.alias == 'replica':
+                raise OperationalError
+            return create_cursor(connection, name)
+
+        with mock.patch.object(
+            type(connections['replica']), 'create_cursor',
+            autospec=True, side_effect=failing_replica,
+        ):
+            status, headers, body = asgi_request('GET', '/api/v1/titles/')
+        replicas._down_until.clear()
+        assert status == 200, \
+            'Проверьте, что асинхронный путь повторяет чтение с primary'
+        assert json.loads(body)['count'] == 1
@@ -0,0 +1,72 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.authentication import UserCache, user_cache
+
+
+def token_client(user):
+    client = APIClient()
+    token = RefreshToken.for_user(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+
+    def test_user_lookup_is_cached(self, admin, django_assert_num_queries):
+        client = token_client(admin)
+        assert client.get('/api/v1/users/').status_code == 200
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/users/')
+        assert response.data['results'][0]['username'] == 'admin'
+
+    def test_role_change_invalidates(self, admin):
+        client = token_client(admin)
+        assert client.get('/api/v1/users/').status_code == 200
+
+        admin.role = 'user'
+        admin.save()
+        assert client.get('/api/v1/users/').status_code == 403, \
+            'Проверьте, что смена роли сбрасывает кэш пользователя'
+
+        admin.is_active = False
+        admin.save()
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_password_not_cached(self, admin):
+        cache = UserCache(max_size=10, timeout=60, alias='default')
+        cache.set(admin)
+        row = caches['default'].get(cache.key(admin.pk))
+        assert admin.password not in row, \
+            'Проверьте, что хэш пароля не попадает в кэш'
+        assert 'password' in cache.get(admin.pk).get_deferred_fields()
+
+    def test_me_full_row(self, user):
+        client = token_client(user)
+        client.get('/api/v1/users/me/')
+        response = client.patch('/api/v1/users/me/', {'bio': 'О себе'})
+        assert response.status_code == 200
+        assert (response.data['bio'], response.data['email']) == (
+            'О себе', user.email,
+        ), 'Проверьте, что users/me/ работает с пользователем из кэша'
+
+    def test_shared_alias_invalidates_all_workers(self, admin):
+        first, second = (
+            UserCache(max_size=10, timeout=60, alias='default')
+            for _ in range(2)
+        )
+        first.set(admin)
+        assert first.get(admin.pk) is not None
+        second.delete(admin.pk)
+        assert first.get(admin.pk) is None, \
+            'Проверьте, что сброс в одном воркере виден остальным'
+
+    def test_cached_inactive_user(self, user):
+        client = token_client(user)
+        user.is_active = False
+        user_cache.set(user)
+        assert client.get('/api/v1/users/me/').status_code == 401, \
+            'Проверьте, что is_active проверяется и для кэшированной записи'
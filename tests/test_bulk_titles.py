@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Category, Genre, Title
+
+URL = '/api/v1/titles/bulk/'
+
+
+@pytest.fixture
+def taxonomy():
+    Category.objects.create(name='Фильм', slug='movie')
+    for slug in ('drama', 'comedy'):
+        Genre.objects.create(name=slug, slug=slug)
+
+
+def items(count):
+    return [
+        {
+            'name': f'Тайтл {i}',
+            'year': 2000,
+            'genre': ['drama', 'comedy'],
+            'category': 'movie',
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestBulkTitles:
+
+    def test_per_item_results(self, admin_client, client, taxonomy):
+        assert client.get('/api/v1/titles/').json()['count'] == 0
+        response = admin_client.post(URL, [
+            {'name': 'Первый', 'year': 2001, 'genre': ['drama'],
+             'category': 'movie', 'description': 'Описание'},
+            {'name': 'Второй', 'year': 2002, 'genre': ['horror'],
+             'category': 'movie'},
+            {'year': 2003, 'genre': [], 'category': 'movie'},
+        ], format='json')
+        assert response.status_code == 207
+        data = response.json()
+        assert (data['created'], data['failed']) == (1, 2)
+        first, unknown, invalid = data['results']
+        assert unknown == {'errors': {
+            'genre': ['Object with slug=horror does not exist.'],
+        }}, 'Проверьте, что неизвестный жанр возвращается ошибкой элемента'
+        assert 'name' in invalid['errors']
+
+        title = Title.objects.get(pk=first['id'])
+        assert (title.name, title.description) == ('Первый', 'Описание')
+        assert [genre.slug for genre in title.genre.all()] == ['drama']
+        titles = client.get('/api/v1/titles/?name=Перв').json()
+        assert [item['id'] for item in titles['results']] == [title.id], \
+            'Проверьте, что новые тайтлы попадают в список и поиск'
+
+    def test_constant_queries(self, admin_client, taxonomy):
+        counts = []
+        for size in (5, 50):
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.post(URL, items(size), format='json')
+            assert response.status_code == 201
+            counts.append(len(context.captured_queries))
+        assert counts[0] == counts[1], \
+            'Проверьте, что число запросов не зависит от числа тайтлов'
+        assert Title.objects.count() == 55
+        assert Title.genre.through.objects.count() == 110
+
+    def test_all_failed(self, admin_client, taxonomy):
+        response = admin_client.post(URL, [
+            {'name': 'Тайтл', 'year': 2000, 'genre': [], 'category': 'x'},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.json()['results'][0]['errors'] == {
+            'category': ['Object with slug=x does not exist.'],
+        }
+
+    def test_limits(self, admin_client, settings, taxonomy):
+        settings.BULK_MAX_ITEMS = 2
+        assert admin_client.post(
+            URL, items(3), format='json',
+        ).status_code == 400
+        assert admin_client.post(
+            URL, {'name': 'Тайтл'}, format='json',
+        ).status_code == 400
+
+    def test_admin_only(self, client, user_client, taxonomy):
+        assert client.post(URL, items(1), format='json').status_code == 401
+        assert user_client.post(
+            URL, items(1), format='json',
+        ).status_code == 403
@@ -0,0 +1,161 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Category, ChangeLog, Comment, Review, Title, User
+
+URL = '/api/v1/changes/'
+
+
+def entries(response):
+    assert response.status_code == 200
+    return [
+        (item['kind'], item['id'], item['action'])
+        for item in response.json()['changes']
+    ]
+
+
+@pytest.mark.django_db
+class TestChangeFeed:
+
+    def test_saves_and_deletes(self, admin_client, user):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        review = Review.objects.create(
+            title=title, author=user, text='Текст', score=5,
+        )
+        comment = Comment.objects.create(
+            review=review, author=user, text='Ок',
+        )
+        review.text = 'Новый текст'
+        review.save()
+        ids = title.id, review.id, comment.id
+        title.delete()
+        title_id, review_id, comment_id = ids
+        logged = entries(admin_client.get(URL))
+        assert logged[:4] == [
+            ('title', title_id, 'created'),
+            ('review', review_id, 'created'),
+            ('comment', comment_id, 'created'),
+            ('review', review_id, 'updated'),
+        ], 'Проверьте, что журнал пишется при сохранении'
+        assert sorted(logged[4:]) == [
+            ('comment', comment_id, 'deleted'),
+            ('review', review_id, 'deleted'),
+            ('title', title_id, 'deleted'),
+        ], 'Проверьте, что журнал пишется при удалении, в том числе каскадном'
+
+    def test_since_and_limit(self, admin_client):
+        for number in range(5):
+            Title.objects.create(name=f'Тайтл {number}', year=2000)
+        first = admin_client.get(URL, {'limit': 2}).json()
+        assert [item['seq'] for item in first['changes']] \
+            == list(ChangeLog.objects.values_list('pk', flat=True)[:2])
+        assert first['has_more']
+        seen = [item['seq'] for item in first['changes']]
+        since = first['next']
+        while True:
+            with CaptureQueriesContext(connection) as context:
+                page = admin_client.get(
+                    URL, {'since': since, 'limit': 2},
+                ).json()
+            assert len(context.captured_queries) == 1
+            seen += [item['seq'] for item in page['changes']]
+            since = page['next']
+            if not page['has_more']:
+                break
+        assert seen == list(
+            ChangeLog.objects.order_by('pk').values_list('pk', flat=True)
+        ), 'Проверьте, что пачки по since читают журнал без пропусков'
+        assert admin_client.get(URL, {'since': since}).json() == {
+            'changes': [], 'next': since, 'has_more': False,
+        }
+
+    def test_gap_waits_for_transaction(self, admin_client, settings):
+        titles = [
+            Title.objects.create(name=f'Тайтл {number}', year=2000)
+            for number in range(3)
+        ]
+        first, in_flight, last = ChangeLog.objects.order_by('pk')
+        # пропуск в номерах: изменение незавершенной транзакции
+        in_flight.delete()
+        page = admin_client.get(URL).json()
+        assert [item['id'] for item in page['changes']] == [titles[0].id], \
+            'Проверьте, что чтение останавливается перед пропуском в номерах'
+        assert (page['next'], page['has_more']) == (first.pk, False)
+
+        settings.CHANGE_FEED = {
+            **settings.CHANGE_FEED, 'GAP_TIMEOUT_SECONDS': 0,
+        }
+        page = admin_client.get(URL, {'since': first.pk}).json()
+        assert [item['seq'] for item in page['changes']] == [last.pk], \
+            'Проверьте, что давний пропуск (откат) не останавливает чтение'
+
+    def test_cascade_is_one_insert(self, admin_client, user):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        authors = [user] + [
+            User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+            for i in range(3)
+        ]
+        for author in authors:
+            review = Review.objects.create(
+                title=title, author=author, text='Текст', score=5,
+            )
+            Comment.objects.create(review=review, author=user, text='Ок')
+        logged = ChangeLog.objects.count()
+        for delete in (
+            lambda: authors[3].delete(),
+            lambda: Review.objects.filter(author=authors[2]).delete(),
+            title.delete,
+        ):
+            with CaptureQueriesContext(connection) as context:
+                delete()
+            inserts = [
+                query for query in context.captured_queries
+                if query['sql'].startswith('INSERT INTO "api_changelog"')
+            ]
+            assert len(inserts) == 1, \
+                'Проверьте, что каскадное удаление пишет журнал одной вставкой'
+        # ревью с комментарием у пользователя, то же через QuerySet,
+        # тайтл с двумя оставшимися ревью и их комментариями
+        assert ChangeLog.objects.count() - logged == 2 + 2 + 5, \
+            'Проверьте, что в журнал попадают все удаленные объекты'
+
+    def test_bulk_titles(self, admin_client):
+        Category.objects.create(name='Фильм', slug='movie')
+        response = admin_client.post('/api/v1/titles/bulk/', [
+            {'name': f'Тайтл {number}', 'year': 2000, 'genre': [],
+             'category': 'movie'}
+            for number in range(3)
+        ], format='json')
+        ids = [item['id'] for item in response.json()['results']]
+        assert entries(admin_client.get(URL)) == [
+            ('title', pk, 'created') for pk in ids
+        ]
+
+    def test_permissions_and_params(self, client, user_client, admin_client):
+        assert client.get(URL).status_code == 401
+        assert user_client.get(URL).status_code == 403
+        for params in ({'since': '-1'}, {'since': 'x'}, {'limit': '0'},
+                       {'limit': '5001'}):
+            assert admin_client.get(URL, params).status_code == 400
+
+
+@pytest.mark.django_db(databases=['default', 'replica'])
+class TestChangeFeedClock:
+
+    def test_database_clock(self):
+        with CaptureQueriesContext(connection) as context:
+            Title.objects.create(name='Тайтл', year=2000)
+        insert, = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('INSERT INTO "api_changelog"')
+        ]
+        assert 'CURRENT_TIMESTAMP' in insert, \
+            'Проверьте, что changed_at ставится по часам БД'
+
+    def test_reads_primary(self, admin_client, settings):
+        settings.REPLICAS = {**settings.REPLICAS, 'ALIASES': ['replica']}
+        title = Title.objects.create(name='Тайтл', year=2000)
+        assert entries(admin_client.get(URL)) == [
+            ('title', title.id, 'created'),
+        ], 'Проверьте, что журнал читается с primary, а не с реплики'
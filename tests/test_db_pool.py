@@ -0,0 +1,134 @@
+import pytest
+from django.db.utils import load_backend
+
+from api.db import pool
+from api.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    closed = False
+    healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**options):
+    options = {
+        'max_size': 2, 'max_overflow': 1, 'timeout': 0.05,
+        'check_interval': 0, **options,
+    }
+    return ConnectionPool(
+        FakeConnection, lambda connection: connection.healthy, **options,
+    )
+
+
+class TestConnectionPool:
+
+    def test_reuse(self):
+        connections = make_pool()
+        first = connections.acquire()
+        connections.release(first)
+        assert connections.acquire() is first, \
+            'Проверьте, что возвращенное соединение выдается повторно'
+        stats = connections.get_stats()
+        assert stats['created'] == 1
+        assert stats['reused'] == 1
+        assert stats['in_use'] == 1
+
+    def test_overflow_and_timeout(self):
+        connections = make_pool()
+        taken = [connections.acquire() for _ in range(3)]
+        assert connections.get_stats()['overflow'] == 1
+        with pytest.raises(PoolTimeout):
+            connections.acquire()
+        assert connections.get_stats()['timeouts'] == 1
+        for connection in taken:
+            connections.release(connection)
+        stats = connections.get_stats()
+        assert stats['size'] == 2 and stats['idle'] == 2, \
+            'Проверьте, что соединения сверх max_size закрываются'
+        assert sum(connection.closed for connection in taken) == 1
+
+    def test_failed_check(self):
+        connections = make_pool()
+        broken = connections.acquire()
+        connections.release(broken)
+        broken.healthy = False
+        connection = connections.acquire()
+        assert connection is not broken and broken.closed, \
+            'Проверьте, что соединение, не прошедшее проверку, заменяется'
+        assert connections.get_stats()['failed_checks'] == 1
+
+    def test_not_reusable(self):
+        connections = make_pool()
+        connection = connections.acquire()
+        connections.release(connection, reusable=False)
+        assert connection.closed
+        assert connections.get_stats()['size'] == 0
+
+    def test_recycle(self):
+        connections = make_pool(recycle=0)
+        old = connections.acquire()
+        connections.release(old)
+        assert connections.acquire() is not old
+        assert connections.get_stats()['recycled'] == 1
+
+
+@pytest.fixture
+def pooled_sqlite(tmp_path, django_db_blocker):
+    alias = 'pool_test'
+    wrapper = load_backend('api.db.sqlite3_pool').DatabaseWrapper({
+        'ENGINE': 'api.db.sqlite3_pool',
+        'NAME': str(tmp_path / 'pool.sqlite3'),
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+        'TIME_ZONE': None,
+        'AUTOCOMMIT': True,
+        'ATOMIC_REQUESTS': False,
+        'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+        'TEST': {},
+        'POOL': {'MAX_SIZE': 1, 'CHECK_INTERVAL': 0},
+    }, alias)
+    with django_db_blocker.unblock():
+        yield wrapper
+        wrapper.close()
+    pool._pools.pop(alias, None)
+
+
+class TestPooledBackend:
+
+    def test_close_returns_to_pool(self, pooled_sqlite):
+        pooled_sqlite.ensure_connection()
+        raw = pooled_sqlite.connection
+        pooled_sqlite.close()
+        assert pooled_sqlite.connection is None
+        with pooled_sqlite.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert pooled_sqlite.connection is raw, \
+            'Проверьте, что после close() соединение берется из пула'
+        stats = pool.get_stats()['pool_test']
+        assert stats['created'] == 1
+        assert stats['reused'] == 1
+        assert stats['checks'] == 1
+
+    def test_transaction_rolled_back(self, pooled_sqlite):
+        with pooled_sqlite.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer)')
+        pooled_sqlite.set_autocommit(False)
+        with pooled_sqlite.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (1)')
+        pooled_sqlite.close()
+        with pooled_sqlite.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM item')
+            assert cursor.fetchone() == (0,), \
+                'Проверьте, что незавершенная транзакция откатывается'
+
+
+@pytest.mark.django_db
+class TestPoolStatsView:
+
+    def test_admin_only(self, admin_client, user_client):
+        url = '/api/v1/db/pool/stats/'
+        assert admin_client.get(url).status_code == 200
+        assert user_client.get(url).status_code == 403
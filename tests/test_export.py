@@ -0,0 +1,36 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from api.models import Review, Title
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_stream_reviews(self, admin_client, user, client):
+        title = Title.objects.create(name='Title', year=2000)
+        Review.objects.create(title=title, author=user, text='Текст', score=3)
+
+        response = admin_client.get('/api/v1/export/reviews.ndjson')
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        row = json.loads(lines[0])
+        assert row['author__username'] == 'user'
+        assert row['text'] == 'Текст'
+
+        response = admin_client.get('/api/v1/export/titles.csv')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        assert rows[0]['rating_sum'] == '3'
+
+        assert client.get('/api/v1/export/titles.csv').status_code == 401
+
+    def test_command(self, user):
+        Title.objects.create(name='Title', year=2000)
+        out = io.StringIO()
+        call_command('export_data', 'titles', stdout=out)
+        assert json.loads(out.getvalue())['name'] == 'Title'
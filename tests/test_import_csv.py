@@ -0,0 +1,38 @@
+import csv
+import io
+import os
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from api.models import Comment, Review, Title, User
+
+
+@pytest.mark.django_db
+class TestImportCsv:
+
+    def test_import_data_directory(self, client):
+        call_command('import_csv', batch_size=10, stdout=io.StringIO())
+
+        with open(os.path.join(settings.BASE_DIR, 'data', 'review.csv'),
+                  encoding='utf-8') as review_file:
+            reviews = {
+                (row['title_id'], row['author'])
+                for row in csv.DictReader(review_file)
+            }
+        assert Review.objects.count() == len(reviews), \
+            'Проверьте, что загружено по одному ревью автора на тайтл'
+        assert User.objects.filter(username='bingobongo').exists()
+        assert Comment.objects.exists()
+
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, \
+            'Проверьте, что дата публикации берется из файла'
+
+        title = Title.objects.get(pk=1)
+        scores = list(title.reviews.values_list('score', flat=True))
+        assert title.rating == sum(scores) / len(scores), \
+            'Проверьте, что после импорта пересчитываются рейтинги'
+        response = client.get('/api/v1/titles/?name=Шоушенк')
+        assert response.data['count'] == 1
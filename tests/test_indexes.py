@@ -0,0 +1,124 @@
+import io
+import random
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+
+from api.models import Category, Comment, Genre, Review, Title, User
+from api.search import search
+
+TITLES = 2000
+USERS = 200
+REVIEWS = 10000
+COMMENTS = 10000
+
+
+def uses_index(plan):
+    """
+    План выполнения использует индекс (SQLite или PostgreSQL),
+    а не полный просмотр таблицы
+    """
+    if connection.vendor == 'sqlite':
+        return 'SCAN' not in plan.replace('SCAN CONSTANT ROW', '')
+    return 'Seq Scan' not in plan
+
+
+@pytest.fixture
+def catalogue():
+    rnd = random.Random(1)
+    Category.objects.bulk_create(
+        Category(name=f'category {i}', slug=f'category-{i}')
+        for i in range(20)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f'genre {i}', slug=f'genre-{i}') for i in range(50)
+    )
+    User.objects.bulk_create(
+        User(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(USERS)
+    )
+    categories = list(Category.objects.all())
+    Title.objects.bulk_create(
+        Title(name=f'title {i}', year=1900 + i % 120,
+              category=rnd.choice(categories))
+        for i in range(TITLES)
+    )
+    titles = list(Title.objects.all())
+    genres = list(Genre.objects.all())
+    users = list(User.objects.all())
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title=title, genre=genre)
+        for title in titles
+        for genre in rnd.sample(genres, 2)
+    )
+    pairs = rnd.sample(
+        [(title, user) for title in titles[:REVIEWS // USERS]
+         for user in users],
+        REVIEWS,
+    )
+    Review.objects.bulk_create(
+        Review(title=title, author=user, text='text', score=5)
+        for title, user in pairs
+    )
+    reviews = list(Review.objects.only('id'))
+    Comment.objects.bulk_create(
+        Comment(review=rnd.choice(reviews), author=rnd.choice(users),
+                text='text')
+        for _ in range(COMMENTS)
+    )
+    call_command('rebuild_ratings', stdout=io.StringIO())
+    call_command('rebuild_search_index', stdout=io.StringIO())
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return titles[0], reviews[0], users[0], categories[0], genres[0]
+
+
+@pytest.mark.django_db
+class TestIndexes:
+
+    def test_main_queries_use_indexes(self, catalogue):
+        title, review, user, category, genre = catalogue
+        queries = {
+            'review exists': Review.objects.filter(
+                title=title, author=user,
+            ),
+            'reviews of title': Review.objects.filter(
+                title=title,
+            ).order_by('-pub_date', '-id'),
+            'comments of review': Comment.objects.filter(
+                review=review,
+            ).order_by('-pub_date', '-id'),
+            'titles by year': Title.objects.filter(year=1990),
+            'titles by category': Title.objects.filter(
+                category__slug=category.slug,
+            ),
+            'titles by genre': Title.objects.filter(genre__slug=genre.slug),
+            'titles by name': search(Title.objects.all(), 'title 123'),
+        }
+        for name, queryset in queries.items():
+            plan = queryset.explain()
+            assert uses_index(plan), \
+                f'Проверьте, что запрос «{name}» использует индекс:\n{plan}'
+
+    def test_top_titles_read_index_in_order(self, catalogue):
+        category = catalogue[3]
+        for queryset in (
+            Title.objects.all(),
+            Title.objects.filter(category__slug=category.slug),
+        ):
+            plan = queryset.filter(
+                rating_avg__isnull=False,
+            ).order_by('-rating_avg', '-id')[:10].explain()
+            sorted_in_memory = 'TEMP B-TREE' in plan or 'Sort' in plan
+            assert uses_index(plan) and not sorted_in_memory, \
+                f'Проверьте, что топ читается из индекса по порядку:\n{plan}'
+
+    def test_review_is_unique_per_author(self, catalogue):
+        title, _, user, _, _ = catalogue
+        Review.objects.filter(title=title, author=user).delete()
+        Review.objects.create(title=title, author=user, text='text', score=1)
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Review.objects.create(
+                title=title, author=user, text='text', score=1,
+            )
@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+from api.metrics import Histogram
+from api.models import Title
+
+
+@pytest.mark.django_db
+class TestTimingMiddleware:
+
+    def test_server_timing(self, client, settings):
+        settings.INSTRUMENTATION = {'SERVER_TIMING': True}
+        Title.objects.create(name='Тайтл', year=2000)
+        response = client.get('/api/v1/titles/')
+        header = response['Server-Timing']
+        for name in ('total', 'db', 'serializer', 'render'):
+            assert re.search(rf'\b{name};dur=\d+\.\d+', header), \
+                f'Проверьте, что в Server-Timing есть {name}'
+        queries = int(re.search(r'desc="(\d+) queries"', header).group(1))
+        assert queries > 0, 'Проверьте, что учитываются запросы к БД'
+
+    def test_no_server_timing_by_default(self, client, settings):
+        settings.INSTRUMENTATION = {}
+        assert 'Server-Timing' not in client.get('/api/v1/titles/'), \
+            'Проверьте, что Server-Timing по умолчанию не отдается'
+
+    def test_metrics(self, client, settings):
+        settings.METRICS_TOKEN = 'secret'
+        client.get('/api/v1/categories/')
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
+        text = response.content.decode()
+        assert (
+            'yamdb_request_duration_seconds_bucket{endpoint="category-list"'
+            ',action="list",le="+Inf"}'
+        ) in text, 'Проверьте, что время запроса пишется в гистограмму'
+        assert 'yamdb_request_db_queries_count{' in text
+
+    def test_metrics_token(self, client, settings):
+        settings.METRICS_TOKEN = 'secret'
+        assert client.get('/metrics').status_code == 403
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
+
+    def test_metrics_without_token(self, client, settings):
+        settings.METRICS_TOKEN = None
+        assert client.get('/metrics').status_code == 403, \
+            'Проверьте, что без METRICS_TOKEN метрики закрыты'
+
+    def test_slow_request_sql(self, client, settings, caplog):
+        settings.INSTRUMENTATION = {'SLOW_REQUEST_MS': 0}
+        client.get('/api/v1/titles/')
+        records = [
+            record for record in caplog.records
+            if record.name == 'api.slow_requests'
+        ]
+        assert records, 'Проверьте, что медленные запросы пишутся в лог'
+        assert 'SELECT' in records[0].getMessage(), \
+            'Проверьте, что в лог медленного запроса попадает SQL'
+
+
+class TestHistogram:
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram('test', 'Test.', ('endpoint',), (1, 5))
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(('a',), value)
+        lines = list(histogram.collect())
+        assert 'test_bucket{endpoint="a",le="1"} 2' in lines
+        assert 'test_bucket{endpoint="a",le="5"} 3' in lines
+        assert 'test_bucket{endpoint="a",le="+Inf"} 4' in lines
+        assert 'test_sum{endpoint="a"} 11.5' in lines
+        assert 'test_count{endpoint="a"} 4' in lines
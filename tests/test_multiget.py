@@ -0,0 +1,80 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Category, Genre, Review, Title, User
+
+URL = '/api/v1/titles/'
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=slug, slug=slug)
+        for slug in ('drama', 'comedy')
+    ]
+    titles = []
+    for number in range(3):
+        title = Title.objects.create(
+            name=f'Тайтл {number}', year=2000, category=category,
+        )
+        title.genre.set(genres[:number])
+        titles.append(title)
+    return titles
+
+
+@pytest.mark.django_db
+class TestMultiGet:
+
+    def test_titles(self, client, titles):
+        ids = [titles[2].id, 999, titles[0].id, titles[2].id]
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(URL, {'ids': ','.join(map(str, ids))})
+        assert response.status_code == 200
+        # тайтлы с категориями и жанры выбранных тайтлов
+        assert len(context.captured_queries) == 2, \
+            'Проверьте, что тайтлы загружаются одним запросом'
+        data = response.json()
+        assert (data['count'], data['not_found']) == (4, 1)
+        assert [item['id'] for item in data['results']] == ids, \
+            'Проверьте, что результаты идут в порядке ids'
+        assert data['results'][1] == {'id': 999, 'detail': 'Not found.'}
+        assert data['results'][0] == client.get(
+            f'{URL}{titles[2].id}/',
+        ).json(), 'Проверьте, что элемент совпадает с ответом retrieve'
+
+    def test_reviews_of_title(self, client, titles):
+        title, other = titles[:2]
+        reviews = [
+            Review.objects.create(
+                title=title_, author=User.objects.create(
+                    username=f'user{number}', email=f'user{number}@ya.ru',
+                ), text='Текст', score=5,
+            )
+            for number, title_ in enumerate((title, title, other))
+        ]
+        response = client.get(
+            f'{URL}{title.id}/reviews/',
+            {'ids': f'{reviews[1].id},{reviews[2].id},{reviews[0].id}'},
+        )
+        results = response.json()['results']
+        assert [item['id'] for item in results] == [
+            reviews[1].id, reviews[2].id, reviews[0].id,
+        ]
+        assert results[0]['author'] == 'user1'
+        assert results[1] == {'id': reviews[2].id, 'detail': 'Not found.'}, \
+            'Проверьте, что ревью другого тайтла не находится'
+
+    def test_serializer_fallback(self, client, settings, titles):
+        params = {'ids': f'{titles[1].id},{titles[0].id}'}
+        fast = client.get(URL, params).json()
+        settings.FAST_READ_SERIALIZATION = False
+        assert client.get(URL, {**params, 'year': 2000}).json() == fast
+
+    def test_invalid(self, client, settings, titles):
+        settings.MULTI_GET_MAX_IDS = 2
+        for ids in ('', '1,x', '0', '1,2,3'):
+            response = client.get(URL, {'ids': ids})
+            assert response.status_code == 400, ids
+            assert 'ids' in response.json()
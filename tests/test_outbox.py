@@ -0,0 +1,44 @@
+import io
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.models import EmailOutbox
+
+
+class BrokenBackend(BaseEmailBackend):
+
+    def open(self):
+        raise ConnectionError('mail server is down')
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def test_signup_enqueues_email(self, client, user):
+        response = client.post('/api/v1/auth/email/', {'email': user.email})
+        assert response.status_code == 200
+        assert not mail.outbox, \
+            'Проверьте, что письмо не отправляется во время запроса'
+        assert EmailOutbox.objects.filter(to=user.email).exists()
+
+        call_command('send_outbox', once=True, stdout=io.StringIO())
+        assert len(mail.outbox) == 1
+        assert 'Confirmation code' in mail.outbox[0].subject
+        assert EmailOutbox.objects.get().sent_at is not None
+
+    def test_failed_delivery_is_retried_later(self, settings):
+        letter = EmailOutbox.objects.create(
+            to='user@yamdb.fake', subject='subject', body='body',
+        )
+        settings.EMAIL_BACKEND = 'tests.test_outbox.BrokenBackend'
+        call_command('send_outbox', once=True, stdout=io.StringIO())
+
+        letter.refresh_from_db()
+        assert letter.sent_at is None
+        assert letter.attempts == 1
+        assert letter.next_attempt_at > timezone.now()
+        assert 'mail server is down' in letter.last_error
@@ -0,0 +1,53 @@
+import pytest
+
+from api.models import Review, Title, User
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_reviews_cursor_walk(self, client):
+        title = Title.objects.create(name='Title', year=2000)
+        for i in range(7):
+            author = User.objects.create(
+                username=f'author{i}', email=f'a{i}@yamdb.fake',
+            )
+            Review.objects.create(
+                title=title, author=author, text='text', score=5,
+            )
+        expected = list(
+            title.reviews.order_by('-pub_date', '-id').values_list(
+                'id', flat=True,
+            )
+        )
+
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor=&page_size=3'
+        seen = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            assert 'count' not in response.data
+            seen += [review['id'] for review in response.data['results']]
+            url = response.data['next']
+        assert seen == expected, \
+            'Проверьте, что курсор обходит все ревью по одному разу по порядку'
+
+    def test_page_number_and_size_cap(self, client):
+        for i in range(3):
+            Title.objects.create(name=f'title {i}', year=2000)
+
+        response = client.get('/api/v1/titles/?page=2&page_size=2')
+        assert response.data['count'] == 3
+        assert len(response.data['results']) == 1
+
+        Title.objects.bulk_create(
+            Title(name=f'title {i}', year=2000) for i in range(3, 101)
+        )
+        response = client.get('/api/v1/titles/?page_size=1000')
+        assert response.data['count'] == 101
+        assert len(response.data['results']) == 100, \
+            'Проверьте, что размер страницы ограничен max_page_size'
+
+    def test_invalid_cursor(self, client):
+        response = client.get('/api/v1/titles/?cursor=broken')
+        assert response.status_code == 404
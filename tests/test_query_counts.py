@@ -0,0 +1,70 @@
+import pytest
+
+from api.models import Category, Comment, Genre, Review, Title, User
+
+
+def create_catalogue(size, genres_per_title):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'genre {i}', slug=f'genre-{i}')
+        for i in range(genres_per_title)
+    ]
+    authors = [
+        User.objects.create(username=f'author{i}', email=f'a{i}@yamdb.fake')
+        for i in range(size)
+    ]
+    title = None
+    for i in range(size):
+        title = Title.objects.create(name=f'title {i}', year=2000,
+                                     category=category)
+        title.genre.set(genres)
+    reviews = [
+        Review.objects.create(title=title, author=author, text='text', score=5)
+        for author in authors
+    ]
+    for author in authors:
+        Comment.objects.create(review=reviews[0], author=author, text='text')
+    return title, reviews[0]
+
+
+@pytest.mark.django_db
+class TestQueryCounts:
+
+    @pytest.mark.parametrize('size,genres', [(1, 1), (5, 4)])
+    def test_titles(self, client, django_assert_num_queries, size, genres):
+        title, _ = create_catalogue(size, genres)
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert len(response.data['results']) == size
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title.id}/')
+        assert len(response.data['genre']) == genres
+
+    @pytest.mark.parametrize('size', [1, 5])
+    def test_reviews(self, client, django_assert_num_queries, size):
+        title, review = create_catalogue(size, 1)
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert len(response.data['results']) == size
+        with django_assert_num_queries(2):
+            client.get(f'/api/v1/titles/{title.id}/reviews/{review.id}/')
+
+    @pytest.mark.parametrize('size', [1, 5])
+    def test_comments(self, client, django_assert_num_queries, size):
+        title, review = create_catalogue(size, 1)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert len(response.data['results']) == size
+        comment = review.comments.first()
+        with django_assert_num_queries(2):
+            client.get(f'{url}{comment.id}/')
+
+    @pytest.mark.parametrize('size', [1, 5])
+    def test_users(self, admin_client, django_assert_num_queries, size):
+        create_catalogue(size, 1)
+        with django_assert_num_queries(2):
+            response = admin_client.get('/api/v1/users/')
+        assert len(response.data['results']) == min(size + 1, 5)
+        with django_assert_num_queries(1):
+            admin_client.get('/api/v1/users/author0/')
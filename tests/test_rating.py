@@ -0,0 +1,151 @@
+import pytest
+from django.core.management import call_command
+
+from api.models import Comment, Review, Title, User
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_reviews(self):
+        title = Title.objects.create(name='Title', year=2000)
+        first = User.objects.create(username='first', email='first@ya.ru')
+        second = User.objects.create(username='second', email='second@ya.ru')
+
+        review = Review.objects.create(
+            title=title, author=first, text='text', score=4,
+        )
+        Review.objects.create(
+            title=title, author=second, text='text', score=10,
+        )
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (14, 2), \
+            'Проверьте, что новая оценка добавляется к рейтингу тайтла'
+        assert title.rating == 7
+
+        review = Review.objects.get(pk=review.pk)
+        review.score = 8
+        review.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (18, 2), \
+            'Проверьте, что при изменении оценки учитывается только разница'
+        assert title.rating_avg == 9, \
+            'Проверьте, что средняя оценка хранится вместе с рейтингом'
+
+        second.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (8, 1), \
+            'Проверьте, что удаленная оценка вычитается из рейтинга'
+        assert title.rating_avg == 8
+
+    def test_rebuild_ratings(self):
+        title = Title.objects.create(name='Title', year=2000)
+        empty = Title.objects.create(name='Empty', year=2000)
+        user = User.objects.create(username='user', email='user@ya.ru')
+        Review.objects.create(title=title, author=user, text='text', score=6)
+        Title.objects.update(rating_sum=100, rating_count=100, rating_avg=1)
+
+        call_command('rebuild_ratings')
+
+        title.refresh_from_db()
+        empty.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (6, 1)
+        assert title.rating_avg == 6
+        assert empty.rating is None
+        assert empty.rating_avg is None
+
+
+@pytest.mark.django_db
+class TestCommentsCount:
+
+    def test_count_follows_comments(self, user):
+        title = Title.objects.create(name='Title', year=2000)
+        first = Review.objects.create(
+            title=title, author=user, text='text', score=5,
+        )
+        other = User.objects.create(username='other', email='other@ya.ru')
+        second = Review.objects.create(
+            title=title, author=other, text='text', score=5,
+        )
+        comment = Comment.objects.create(review=first, author=user, text='a')
+        Comment.objects.create(review=first, author=other, text='b')
+        first.refresh_from_db()
+        assert first.comments_count == 2, \
+            'Проверьте, что новый комментарий увеличивает comments_count'
+
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.review = second
+        comment.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.comments_count, second.comments_count) == (1, 1), \
+            'Проверьте, что перенос комментария меняет оба счетчика'
+
+        other.delete()
+        first.refresh_from_db()
+        assert first.comments_count == 0, \
+            'Проверьте, что удаленный комментарий вычитается из счетчика'
+
+    def test_rebuild_ratings(self, user):
+        title = Title.objects.create(name='Title', year=2000)
+        review = Review.objects.create(
+            title=title, author=user, text='text', score=5,
+        )
+        Comment.objects.create(review=review, author=user, text='text')
+        Review.objects.update(comments_count=100)
+
+        call_command('rebuild_ratings')
+
+        review.refresh_from_db()
+        assert review.comments_count == 1
+
+    def test_counts_in_payload(self, user, user_client, client):
+        title = Title.objects.create(name='Title', year=2000)
+        review = Review.objects.create(
+            title=title, author=user, text='text', score=5,
+        )
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.get(reviews).json()['results'][0][
+            'comments_count'] == 0
+        response = user_client.post(
+            f'{reviews}{review.id}/comments/', {'text': 'text'},
+        )
+        assert response.status_code == 201
+        assert client.get(reviews).json()['results'][0][
+            'comments_count'] == 1, \
+            'Проверьте, что comments_count в списке ревью не берется из кэша'
+        assert client.get(f'{reviews}{review.id}/').json()[
+            'comments_count'] == 1
+        assert client.get('/api/v1/titles/').json()['results'][0][
+            'reviews_count'] == 1, \
+            'Проверьте, что у тайтлов выводится reviews_count'
+
+
+@pytest.mark.django_db
+class TestStaleInstances:
+
+    def test_save_keeps_counters(self, user):
+        title = Title.objects.create(name='Title', year=2000)
+        other = User.objects.create(username='other', email='other@ya.ru')
+        review = Review.objects.create(
+            title=title, author=other, text='text', score=4,
+        )
+        stale_title = Title.objects.get(pk=title.pk)
+        stale_review = Review.objects.get(pk=review.pk)
+        Review.objects.create(title=title, author=user, text='text', score=8)
+        Comment.objects.create(review=review, author=user, text='text')
+
+        stale_title.name = 'New name'
+        stale_title.save()
+        stale_review.text = 'new text'
+        stale_review.save()
+
+        title.refresh_from_db()
+        review.refresh_from_db()
+        assert title.name == 'New name'
+        assert (title.rating_sum, title.rating_count, title.rating_avg) \
+            == (12, 2, 6), \
+            'Проверьте, что сохранение устаревшего тайтла не затирает рейтинг'
+        assert (title.score_4, title.score_8) == (1, 1)
+        assert (review.text, review.comments_count) == ('new text', 1), \
+            'Проверьте, что сохранение ревью не затирает comments_count'
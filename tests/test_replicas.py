@@ -0,0 +1,142 @@
+from unittest import mock
+
+import pytest
+from django.db import OperationalError, connections
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.db import replicas
+from api.db.replicas import ReplicaRouter
+from api.models import Title, User
+
+DATABASES = ['default', 'replica']
+
+
+@pytest.fixture
+def routing(settings):
+    settings.REPLICAS = {**settings.REPLICAS, 'ALIASES': ['replica']}
+    replicas._down_until.clear()
+    replicas._up_until.clear()
+    replicas._in_flight.clear()
+    yield
+    replicas._down_until.clear()
+    replicas._up_until.clear()
+
+
+def both(model, **fields):
+    """
+    Одинаковая строка на primary и реплике
+    """
+    obj = model.objects.create(**fields)
+    model.objects.using('replica').create(pk=obj.pk, **fields)
+    return obj
+
+
+@pytest.mark.django_db(databases=DATABASES)
+class TestReplicaRouting:
+
+    def test_reads_from_replica(self, client, routing):
+        Title.objects.using('replica').create(name='С реплики', year=2000)
+        response = client.get('/api/v1/titles/')
+        assert [title['name'] for title in response.json()['results']] == [
+            'С реплики'
+        ], 'Проверьте, что GET-запросы читают с реплики'
+
+    def test_read_your_writes(self, client, routing):
+        author = both(User, username='author', email='author@yamdb.fake')
+        title = both(Title, name='Тайтл', year=2000)
+        author_client = APIClient()
+        author_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(author)}',
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = author_client.post(url, {'text': 'Текст', 'score': 8})
+        assert response.status_code == 201
+        assert author_client.get(url).json()['count'] == 1, \
+            'Проверьте, что автор сразу видит свое ревью (читает с primary)'
+        assert client.get(url).json()['count'] == 0, \
+            'Проверьте, что остальные читают с реплики'
+
+    def test_cache_keeps_read_your_writes(self, routing):
+        author = both(User, username='author', email='author@yamdb.fake')
+        reader = both(User, username='reader', email='reader@yamdb.fake')
+        title = both(Title, name='Тайтл', year=2000)
+        author_client, reader_client = APIClient(), APIClient()
+        for client, user in ((author_client, author), (reader_client, reader)):
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}',
+            )
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert author_client.post(
+            url, {'text': 'Текст', 'score': 8},
+        ).status_code == 201
+        assert reader_client.get(url).json()['count'] == 0
+        assert author_client.get(url).json()['count'] == 1, \
+            'Проверьте, что закрепленный за primary пользователь ' \
+            'не получает из кэша ответ, прочитанный с реплики'
+
+    def test_fallback_to_primary(self, client, routing):
+        Title.objects.create(name='С primary', year=2000)
+        with mock.patch.object(
+            connections['replica'], 'ensure_connection',
+            side_effect=OperationalError,
+        ):
+            response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == 1, \
+            'Проверьте, что при недоступной реплике чтение идет с primary'
+        assert replicas.get_stats()['replica']['down']
+        assert client.get('/api/v1/titles/').json()['count'] == 1, \
+            'Проверьте, что недоступная реплика какое-то время не выбирается'
+
+    def test_health_check_cached(self, routing):
+        options = replicas.get_options()
+        with mock.patch.object(
+            connections['replica'], 'ensure_connection',
+        ) as ensure_connection:
+            for _ in range(3):
+                assert replicas.available('replica', options)
+        assert ensure_connection.call_count == 1, \
+            'Проверьте, что доступность реплики не проверяется ' \
+            'на каждом запросе'
+
+    def test_retry_on_primary(self, client, routing):
+        Title.objects.create(name='С primary', year=2000)
+        with mock.patch.object(
+            connections['replica'], 'create_cursor',
+            side_effect=OperationalError,
+        ):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200, \
+            'Проверьте, что ошибка БД на реплике посреди запроса ' \
+            'приводит к повтору с primary, а не к 500'
+        assert response.json()['count'] == 1
+        assert replicas.get_stats()['replica']['down']
+
+    def test_writes_go_to_primary(self, routing):
+        title = Title.objects.using('replica').create(name='Тайтл', year=2000)
+        assert ReplicaRouter().db_for_write(Title, instance=title) == \
+            'default'
+
+
+class TestSelection:
+
+    def test_round_robin(self):
+        options = {**replicas.REPLICAS, 'ALIASES': ['a', 'b']}
+        first = replicas.candidates(options)[0]
+        second = replicas.candidates(options)[0]
+        assert {first, second} == {'a', 'b'}, \
+            'Проверьте, что реплики выбираются по очереди'
+
+    def test_least_loaded(self):
+        options = {
+            **replicas.REPLICAS,
+            'ALIASES': ['a', 'b'],
+            'SELECTION': 'least_loaded',
+        }
+        token = replicas.activate('a')
+        try:
+            assert replicas.candidates(options)[0] == 'b'
+            assert replicas.candidates(options)[0] == 'b', \
+                'Проверьте, что выбирается наименее загруженная реплика'
+        finally:
+            replicas.deactivate(token)
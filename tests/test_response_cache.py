@@ -0,0 +1,71 @@
+import pytest
+
+from api.models import Category, Review, Title
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_hit_skips_database(self, client, django_assert_num_queries):
+        Title.objects.create(name='Title', year=2000)
+        assert client.get('/api/v1/titles/')['X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'HIT'
+        assert response.data['count'] == 1
+
+    def test_writes_invalidate(self, client, user):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        title = Title.objects.create(name='Title', year=2000,
+                                     category=category)
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{title.id}/')
+        client.get(reviews_url)
+
+        Review.objects.create(title=title, author=user, text='text', score=9)
+        response = client.get(reviews_url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['count'] == 1
+        response = client.get('/api/v1/titles/')
+        assert response.data['results'][0]['rating'] == 9, \
+            'Проверьте, что новое ревью сбрасывает кэш списка тайтлов'
+
+        category.name = 'Кино'
+        category.save()
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['category']['name'] == 'Кино'
+
+    def test_other_scopes_stay_cached(self, client, user):
+        first = Title.objects.create(name='First', year=2000)
+        second = Title.objects.create(name='Second', year=2000)
+        client.get(f'/api/v1/titles/{first.id}/reviews/')
+
+        Review.objects.create(title=second, author=user, text='text', score=1)
+        response = client.get(f'/api/v1/titles/{first.id}/reviews/')
+        assert response['X-Cache'] == 'HIT'
+
+    def test_stats(self, client, admin_client):
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/genres/')
+        response = admin_client.get('/api/v1/cache/stats/')
+        assert response.data['genre-list']['hit'] >= 1
+        assert client.get('/api/v1/cache/stats/').status_code == 401
+
+    def test_conditional_get(self, client, user, django_assert_num_queries):
+        title = Title.objects.create(name='Title', year=2000)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert not response.content
+
+        Review.objects.create(title=title, author=user, text='text', score=1)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что после изменения ревью ETag меняется'
+        assert response['ETag'] != etag
@@ -0,0 +1,110 @@
+import sys
+import threading
+import time
+
+import pytest
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Review, Title
+
+THREADS = 8
+
+
+@pytest.mark.django_db
+class TestReviewCreate:
+
+    def test_duplicate(self, user, user_client):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, {'text': 'Текст', 'score': 5})
+        assert response.status_code == 201
+        assert not any(
+            query['sql'].startswith('SELECT')
+            and 'FROM "api_review"' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что перед вставкой ревью нет проверки на дубликат'
+
+        response = user_client.post(url, {'text': 'Текст', 'score': 7})
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': ['Assessment exists!']}
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (5, 1), \
+            'Проверьте, что отклоненная оценка не меняет рейтинг'
+
+    def test_move_to_reviewed_title(self, user, user_client):
+        first = Title.objects.create(name='Первый', year=2000)
+        second = Title.objects.create(name='Второй', year=2000)
+        review = Review.objects.create(
+            title=first, author=user, text='Текст', score=5,
+        )
+        Review.objects.create(title=second, author=user, text='Текст', score=7)
+        response = user_client.patch(
+            f'/api/v1/titles/{first.id}/reviews/{review.id}/',
+            {'title': second.id},
+        )
+        assert response.status_code == 400, \
+            'Проверьте, что ревью нельзя перенести на уже оцененный тайтл'
+        assert response.json() == {'non_field_errors': ['Assessment exists!']}
+        review.refresh_from_db()
+        assert review.title_id == first.id
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentReviewCreate:
+
+    def test_parallel_posts(self, user):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        barrier = threading.Barrier(THREADS)
+        statuses = []
+        # исключения запросов по потокам: сигнал получают все клиенты,
+        # поэтому клиент не должен сам поднимать исключение запроса
+        errors = {}
+
+        def remember_error(sender, **kwargs):
+            errors[threading.get_ident()] = sys.exc_info()[1]
+
+        def post():
+            client = APIClient()
+            client.raise_request_exception = False
+            client.force_authenticate(user=user)
+            barrier.wait()
+            try:
+                # SQLite в памяти не ждет блокировку таблицы,
+                # а сразу отвечает ошибкой: запрос повторяется
+                for _ in range(100):
+                    errors.pop(threading.get_ident(), None)
+                    response = client.post(
+                        url, {'text': 'Текст', 'score': 5},
+                    )
+                    error = errors.get(threading.get_ident())
+                    if not (
+                        isinstance(error, OperationalError)
+                            and 'locked' in str(error)):
+                        statuses.append(response.status_code)
+                        return
+                    time.sleep(0.01)
+            finally:
+                connections.close_all()
+
+        got_request_exception.connect(remember_error)
+        try:
+            threads = [
+                threading.Thread(target=post) for _ in range(THREADS)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            got_request_exception.disconnect(remember_error)
+
+        assert sorted(statuses) == [201] + [400] * (THREADS - 1), \
+            'Проверьте, что из параллельных запросов создается одно ревью'
+        assert Review.objects.filter(title=title, author=user).count() == 1
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (5, 1)
@@ -0,0 +1,93 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import caches
+
+from api import renderers
+from api.models import Category, Comment, Genre, Review, Title, User
+
+
+@pytest.fixture
+def catalogue():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр «{i}»', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    title = Title.objects.create(
+        name='Побег из Шоушенка', year=1994, category=category,
+        description='Описание\n"в кавычках"\u2028',
+    )
+    title.genre.set(genres[::-1])
+    Title.objects.create(name='Без категории', year=2000)
+    authors = [
+        User.objects.create(username=f'author{i}', email=f'a{i}@yamdb.fake')
+        for i in range(3)
+    ]
+    reviews = [
+        Review.objects.create(title=title, author=author, text='Текст',
+                              score=score)
+        for author, score in zip(authors, (10, 7, 8))
+    ]
+    for author in authors:
+        Comment.objects.create(review=reviews[0], author=author, text='Ок')
+    return title, reviews[0], reviews[0].comments.first()
+
+
+@pytest.mark.django_db
+class TestRowSerializers:
+
+    def get_both(self, client, settings, url):
+        responses = []
+        for fast in (False, True):
+            settings.FAST_READ_SERIALIZATION = fast
+            caches['responses'].clear()
+            response = client.get(url)
+            assert response.status_code == 200
+            responses.append(response.content)
+        return responses
+
+    def test_same_bytes(self, client, settings, catalogue):
+        title, review, comment = catalogue
+        comments = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        urls = [
+            '/api/v1/titles/',
+            '/api/v1/titles/?cursor=',
+            f'/api/v1/titles/{title.id}/',
+            f'/api/v1/titles/{title.id}/reviews/',
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/',
+            comments,
+            f'{comments}{comment.id}/',
+        ]
+        for url in urls:
+            slow, fast = self.get_both(client, settings, url)
+            assert slow == fast, \
+                f'Проверьте, что быстрый путь {url} совпадает побайтно'
+
+    def test_orjson_renderer(self, client, settings, catalogue):
+        assert renderers.orjson is not None, \
+            'Проверьте, что orjson установлен (requirements.txt)'
+        settings.FAST_READ_SERIALIZATION = True
+        with mock.patch.object(
+            renderers.orjson, 'dumps', wraps=renderers.orjson.dumps,
+        ) as dumps:
+            assert client.get('/api/v1/titles/').status_code == 200
+        assert dumps.called, \
+            'Проверьте, что ответ рендерится FastJSONRenderer на orjson'
+
+    def test_not_found(self, client, settings, catalogue):
+        settings.FAST_READ_SERIALIZATION = True
+        assert client.get('/api/v1/titles/0/').status_code == 404
+
+    def test_malformed_pk(self, client, settings, catalogue):
+        title, review, _ = catalogue
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        for fast in (False, True):
+            settings.FAST_READ_SERIALIZATION = fast
+            for url in (
+                '/api/v1/titles/abc/',
+                f'{reviews}abc/',
+                f'{reviews}{review.id}/comments/abc/',
+            ):
+                assert client.get(url).status_code == 404, \
+                    f'Проверьте, что {url} отвечает 404, а не 500'
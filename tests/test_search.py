@@ -0,0 +1,45 @@
+import pytest
+
+from api.models import Category, SearchTrigram, Title
+
+
+@pytest.mark.django_db
+class TestSearch:
+
+    def test_title_name_search(self, client):
+        for name in ('The Matrix Reloaded', 'Matrix', 'Animatrix', 'Alien'):
+            Title.objects.create(name=name, year=2000)
+
+        response = client.get('/api/v1/titles/?name=matrix')
+        names = [title['name'] for title in response.data['results']]
+        assert names == ['Matrix', 'Animatrix', 'The Matrix Reloaded'], \
+            'Проверьте, что поиск находит подстроку ' \
+            'и сортирует по релевантности'
+
+        response = client.get('/api/v1/titles/?name=trix rel')
+        assert [t['name'] for t in response.data['results']] == [
+            'The Matrix Reloaded',
+        ]
+
+    def test_cyrillic_case(self, client):
+        for name in ('Война и мир', 'МИРНАЯ ЖИЗНЬ', 'Антимир'):
+            Title.objects.create(name=name, year=2000)
+        response = client.get('/api/v1/titles/?name=Мир')
+        names = [title['name'] for title in response.data['results']]
+        assert names == ['МИРНАЯ ЖИЗНЬ', 'Антимир', 'Война и мир'], \
+            'Проверьте, что поиск по кириллице не зависит от регистра'
+        response = client.get('/api/v1/titles/?name=Ми')
+        assert response.data['count'] == 3, \
+            'Проверьте короткие запросы (без индекса) по кириллице'
+
+    def test_index_follows_changes(self, client):
+        category = Category.objects.create(name='Movies', slug='movie')
+        assert client.get('/api/v1/categories/?search=movi').data['count'] == 1
+
+        category.name = 'Books'
+        category.save()
+        assert client.get('/api/v1/categories/?search=movi').data['count'] == 0
+        assert client.get('/api/v1/categories/?search=book').data['count'] == 1
+
+        category.delete()
+        assert not SearchTrigram.objects.exists()
@@ -0,0 +1,137 @@
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Title
+from api.throttling import LocalBucketStore
+from tests.test_asgi import asgi_request
+
+EMAIL_URL = '/api/v1/auth/email/'
+
+
+def enable(settings, **rules):
+    settings.THROTTLES = {
+        **settings.THROTTLES,
+        'ENABLED': True,
+        'IP_HEADER': 'HTTP_X_REAL_IP',
+        'RULES': rules,
+    }
+
+
+def bearer(user):
+    return f'Bearer {AccessToken.for_user(user)}'
+
+
+@pytest.mark.django_db
+class TestThrottleMiddleware:
+
+    def test_auth_per_ip(self, client, settings, user):
+        enable(settings, auth={
+            'VIEWS': ('confirmation_code',), 'KEY': 'ip', 'RATE': '2/min',
+        })
+        data = {'email': user.email}
+        statuses = [
+            client.post(EMAIL_URL, data, HTTP_X_REAL_IP='10.0.0.1')
+            .status_code
+            for _ in range(2)
+        ]
+        assert 429 not in statuses
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(EMAIL_URL, data, HTTP_X_REAL_IP='10.0.0.1')
+        assert response.status_code == 429, \
+            'Проверьте, что запросы сверх лимита отклоняются'
+        assert int(response['Retry-After']) > 0
+        assert 'throttled' in response.json()['detail']
+        assert not context.captured_queries, \
+            'Проверьте, что отклоненный запрос не обращается к БД'
+        assert client.post(
+            EMAIL_URL, data, HTTP_X_REAL_IP='10.0.0.2',
+        ).status_code != 429, 'Проверьте, что лимит считается по адресу'
+
+    def test_per_user(self, client, settings, user, admin):
+        enable(settings, reads={
+            'METHODS': ('GET',), 'KEY': 'user', 'RATE': '1/min',
+        })
+        url = '/api/v1/titles/'
+        assert client.get(url, HTTP_AUTHORIZATION=bearer(user)) \
+            .status_code == 200
+        assert client.get(url, HTTP_AUTHORIZATION=bearer(user)) \
+            .status_code == 429
+        assert client.get(url, HTTP_AUTHORIZATION=bearer(admin)) \
+            .status_code == 200, 'Проверьте, что лимит считается по user'
+        assert client.get(url).status_code == 200, \
+            'Проверьте, что правило KEY=user не ограничивает анонимов'
+
+    def test_per_action(self, client, settings):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        enable(settings, retrieve={
+            'ACTIONS': ('retrieve',), 'KEY': 'ip', 'RATE': '1/min',
+        })
+        url = f'/api/v1/titles/{title.id}/'
+        assert client.get(url).status_code == 200
+        assert client.get(url).status_code == 429
+        assert client.get('/api/v1/titles/').status_code == 200, \
+            'Проверьте, что правило ограничивает только свое действие'
+
+    def test_rejected_request_keeps_other_tokens(self, client, settings):
+        enable(
+            settings,
+            reads={'METHODS': ('GET',), 'KEY': 'ip', 'RATE': '2/min'},
+            titles={'VIEWS': ('title-list',), 'KEY': 'ip', 'RATE': '1/min'},
+        )
+        assert client.get('/api/v1/titles/').status_code == 200
+        assert client.get('/api/v1/titles/').status_code == 429
+        assert client.get('/api/v1/categories/').status_code == 200, \
+            'Проверьте, что отклоненный запрос не тратит токены ' \
+            'других правил'
+
+    def test_disabled(self, client, settings):
+        enable(settings, all={'KEY': 'ip', 'RATE': '1/min'})
+        settings.THROTTLES = {**settings.THROTTLES, 'ENABLED': False}
+        for _ in range(3):
+            assert client.get('/api/v1/titles/').status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncThrottling:
+
+    def test_read_application(self, settings):
+        enable(settings, reads={'KEY': 'ip', 'RATE': '1/min'})
+        assert asgi_request('GET', '/api/v1/titles/')[0] == 200
+        status, headers, _ = asgi_request('GET', '/api/v1/titles/')
+        assert status == 429, \
+            'Проверьте, что лимит действует и на асинхронном пути'
+        assert b'retry-after' in {name.lower() for name in headers}
+
+
+class TestLocalBucketStore:
+
+    def test_refill(self):
+        store = LocalBucketStore(max_keys=10)
+        with mock.patch('api.throttling.time.monotonic', return_value=100):
+            assert [store.consume('a', 0.5, 2) for _ in range(3)] \
+                == [0, 0, 2]
+        with mock.patch('api.throttling.time.monotonic', return_value=101):
+            assert store.consume('a', 0.5, 2) == 1
+        with mock.patch('api.throttling.time.monotonic', return_value=102):
+            assert store.consume('a', 0.5, 2) == 0, \
+                'Проверьте, что ведро пополняется со временем'
+
+    def test_consume_all(self):
+        store = LocalBucketStore(max_keys=10)
+        with mock.patch('api.throttling.time.monotonic', return_value=100):
+            assert store.consume_all([('a', 1, 2), ('b', 1, 1)]) == (0, None)
+            assert store.consume_all([('a', 1, 2), ('b', 1, 1)]) == (1, 1)
+            assert store.consume('a', 1, 2) == 0, \
+                'Проверьте, что при отказе токены не забираются ни из ' \
+                'одного ведра'
+
+    def test_max_keys(self):
+        store = LocalBucketStore(max_keys=2)
+        for key in ('a', 'b', 'c'):
+            store.consume(key, 1, 1)
+        assert list(store.buckets) == ['b', 'c'], \
+            'Проверьте, что вытесняются давно не использованные ведра'
@@ -0,0 +1,107 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import SCORE_FIELDS, Review, Title, User, score_stats
+
+
+def url(title):
+    return f'/api/v1/titles/{title.id}/stats/'
+
+
+@pytest.fixture
+def users():
+    return [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(4)
+    ]
+
+
+def histogram(title):
+    title.refresh_from_db()
+    return [getattr(title, name) for name in SCORE_FIELDS]
+
+
+@pytest.mark.django_db
+class TestTitleStats:
+
+    def test_follows_reviews(self, users):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        other = Title.objects.create(name='Другой', year=2000)
+        for user, score in zip(users, (2, 2, 9)):
+            Review.objects.create(
+                title=title, author=user, text='Текст', score=score,
+            )
+        assert histogram(title) == [0, 2, 0, 0, 0, 0, 0, 0, 1, 0], \
+            'Проверьте, что новая оценка попадает в гистограмму'
+
+        review = Review.objects.get(title=title, author=users[2])
+        review.score = 10
+        review.save()
+        assert histogram(title) == [0, 2, 0, 0, 0, 0, 0, 0, 0, 1], \
+            'Проверьте, что измененная оценка переносится в гистограмме'
+
+        review.title = other
+        review.save()
+        assert histogram(title) == [0, 2, 0, 0, 0, 0, 0, 0, 0, 0]
+        assert histogram(other) == [0, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+
+        users[0].delete()
+        assert histogram(title) == [0, 1, 0, 0, 0, 0, 0, 0, 0, 0], \
+            'Проверьте, что удаленная оценка вычитается из гистограммы'
+
+    def test_rebuild(self, users):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        for user, score in zip(users, (1, 5, 5)):
+            Review.objects.create(
+                title=title, author=user, text='Текст', score=score,
+            )
+        Title.objects.update(score_1=7, score_5=0, rating_count=0)
+
+        call_command('rebuild_ratings')
+
+        assert histogram(title) == [1, 0, 0, 0, 2, 0, 0, 0, 0, 0]
+        assert (title.rating_sum, title.rating_count) == (11, 3)
+        assert title.rating_avg == pytest.approx(11 / 3)
+
+    def test_endpoint(self, client, users):
+        title = Title.objects.create(name='Тайтл', year=2000)
+        for user, score in zip(users, (1, 4, 6, 10)):
+            Review.objects.create(
+                title=title, author=user, text='Текст', score=score,
+            )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url(title))
+        assert response.status_code == 200
+        assert len(context.captured_queries) == 1, \
+            'Проверьте, что статистика читается одним запросом'
+        data = response.json()
+        assert data['id'] == title.id
+        assert (data['reviews_count'], data['rating'], data['median']) \
+            == (4, 5.25, 5)
+        assert data['stddev'] == pytest.approx(3.269, abs=1e-3)
+        assert data['histogram'] == {
+            str(score): int(score in (1, 4, 6, 10)) for score in range(1, 11)
+        }
+
+        Review.objects.filter(score=10).delete()
+        assert client.get(url(title)).json()['reviews_count'] == 3, \
+            'Проверьте, что статистика обновляется при изменении ревью'
+
+    def test_not_found(self, client):
+        assert client.get('/api/v1/titles/1/stats/').status_code == 404
+        assert client.get('/api/v1/titles/x/stats/').status_code == 404
+
+
+class TestScoreStats:
+
+    def test_empty(self):
+        stats = score_stats([0] * 10)
+        assert stats['reviews_count'] == 0
+        assert stats['rating'] is stats['median'] is stats['stddev'] is None
+
+    def test_median(self):
+        assert score_stats([1, 0, 0, 0, 0, 0, 0, 0, 0, 0])['median'] == 1
+        assert score_stats([0, 0, 1, 0, 0, 0, 0, 0, 0, 2])['median'] == 10
+        assert score_stats([0, 1, 0, 0, 0, 0, 0, 1, 0, 0])['median'] == 5
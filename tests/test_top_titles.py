@@ -0,0 +1,95 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Category, Genre, Review, Title, User
+
+URL = '/api/v1/titles/top/'
+
+
+@pytest.fixture
+def rated():
+    """
+    Тайтлы со средними оценками 9, 7, 5 и 3 и тайтл без отзывов
+    """
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    book = Category.objects.create(name='Книга', slug='book')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(2)
+    ]
+    titles = {}
+    for name, year, category, scores in (
+        ('nine', 2000, movie, (10, 8)),
+        ('seven', 2001, book, (7,)),
+        ('five', 2000, movie, (4, 6)),
+        ('three', 2001, book, (3,)),
+        ('unrated', 2000, movie, ()),
+    ):
+        title = Title.objects.create(name=name, year=year, category=category)
+        for user, score in zip(users, scores):
+            Review.objects.create(
+                title=title, author=user, text='Текст', score=score,
+            )
+        titles[name] = title
+    titles['seven'].genre.set([drama])
+    titles['three'].genre.set([drama])
+    return titles, users
+
+
+def names(response):
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()]
+
+
+@pytest.mark.django_db
+class TestTopTitles:
+
+    def test_order_and_limit(self, client, rated):
+        response = client.get(URL)
+        assert names(response) == ['nine', 'seven', 'five', 'three'], \
+            'Проверьте, что тайтлы без отзывов не попадают в топ'
+        first = response.json()[0]
+        assert (first['rating'], first['reviews_count']) == (9, 2)
+        assert first['category'] == {'name': 'Фильм', 'slug': 'movie'}
+        assert names(client.get(URL, {'limit': 2})) == ['nine', 'seven']
+
+    def test_filters(self, client, rated):
+        assert names(client.get(URL, {'category': 'book'})) \
+            == ['seven', 'three']
+        assert names(client.get(URL, {'genre': 'drama', 'limit': 1})) \
+            == ['seven']
+        assert names(client.get(URL, {'year': 2000})) == ['nine', 'five']
+
+    def test_follows_reviews(self, client, rated):
+        titles, users = rated
+        assert names(client.get(URL, {'limit': 1})) == ['nine']
+        Review.objects.create(
+            title=titles['unrated'], author=users[0], text='Текст', score=10,
+        )
+        review = Review.objects.get(title=titles['nine'], author=users[1])
+        review.score = 1
+        review.save()
+        assert names(client.get(URL, {'limit': 3})) \
+            == ['unrated', 'seven', 'nine'], \
+            'Проверьте, что топ обновляется при изменении ревью'
+        Review.objects.filter(title=titles['unrated']).delete()
+        assert 'unrated' not in names(client.get(URL))
+
+    def test_query_count(self, client, rated):
+        with CaptureQueriesContext(connection) as context:
+            client.get(URL, {'category': 'movie', 'limit': 1})
+        # тайтлы и жанры выбранных тайтлов
+        assert len(context.captured_queries) == 2
+
+    def test_invalid_limit(self, client, rated):
+        for limit in ('0', '101', 'x'):
+            response = client.get(URL, {'limit': limit})
+            assert response.status_code == 400
+            assert 'limit' in response.json()
+
+    def test_serializer_fallback(self, client, settings, rated):
+        fast = client.get(URL).json()
+        settings.FAST_READ_SERIALIZATION = False
+        assert client.get(URL, {'limit': 10}).json() == fast